@@ -0,0 +1,116 @@
+"""Synthetic French legal documents and questions for benchmarks (deterministic for a given seed)."""
+from __future__ import annotations
+
+import random
+from typing import Iterator
+
+CLIENTS = [
+    "Dupont SARL",
+    "Martin Industries",
+    "Société Lefèvre",
+    "Garnier & Fils",
+    "Boulanger SAS",
+    "Rousseau Logistique",
+    "Fontaine Conseil",
+    "Mercier Bâtiment",
+]
+COURTS = [
+    "Cour de cassation, chambre commerciale",
+    "Cour d'appel de Paris",
+    "Tribunal de commerce de Lyon",
+]
+TOPICS = [
+    ("délai de paiement", "Les factures sont payables à {days} jours fin de mois à compter de leur émission."),
+    ("pénalités de retard", "Tout retard entraîne des pénalités égales à trois fois le taux d'intérêt légal."),
+    ("indemnité forfaitaire", "Une indemnité forfaitaire pour frais de recouvrement de 40 euros est due."),
+    ("clause pénale", "En cas d'inexécution, une clause pénale de {pct} % du montant HT s'applique."),
+    ("résiliation", "Le contrat peut être résilié par lettre recommandée avec un préavis de {days} jours."),
+    ("responsabilité", "La responsabilité du prestataire est plafonnée à {amount} euros HT par sinistre."),
+    ("juridiction", "Tout litige relève de la compétence exclusive du {court}."),
+    ("confidentialité", "Les parties restent tenues à la confidentialité {years} ans après la fin du contrat."),
+]
+QUESTIONS = [
+    "Quel est le délai de paiement prévu au contrat {client} ?",
+    "Quelles pénalités de retard s'appliquent aux factures impayées de {client} ?",
+    "Que prévoit l'Article {article} du contrat {client} ?",
+    "Quel est le montant total réclamé dans la mise en demeure adressée à {client} ?",
+    "Quelle juridiction est compétente en cas de litige avec {client} ?",
+    "Quel est le plafond de responsabilité convenu avec {client} ?",
+    "Pourvoi n° {case}",
+    "Facture FAC-{invoice}",
+]
+FOLLOW_UPS = [
+    "Et pour la facture suivante ?",
+    "Quelle est la date limite ?",
+    "Peux-tu préciser le montant HT ?",
+    "Ce délai est-il conforme au Code de commerce ?",
+]
+
+
+def _fill(template: str, rng: random.Random) -> str:
+    return template.format(
+        days=rng.choice([30, 45, 60]),
+        pct=rng.choice([5, 10, 15]),
+        amount=rng.randint(1, 90) * 1000,
+        court=rng.choice(COURTS),
+        years=rng.choice([2, 3, 5]),
+    )
+
+
+def synthetic_contract(rng: random.Random, idx: int, articles: int = 8) -> str:
+    client = rng.choice(CLIENTS)
+    lines = [f"CONTRAT DE PRESTATION N° {idx:05d}", f"Entre le Cabinet Emilia Parenti et {client}.", ""]
+    for article in range(1, articles + 1):
+        title, template = rng.choice(TOPICS)
+        lines.append(f"Article {article} – {title.capitalize()}")
+        invoice = f"FAC-{rng.randint(1000, 9999)}"
+        lines.append(f"{_fill(template, rng)} Référence client : {client}, facture {invoice}.")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def synthetic_notice(rng: random.Random, idx: int) -> str:
+    client = rng.choice(CLIENTS)
+    invoices = [f"FAC-{rng.randint(1000, 9999)}" for _ in range(rng.randint(1, 4))]
+    total = sum(rng.randint(5, 120) * 100 for _ in invoices)
+    return (
+        f"MISE EN DEMEURE N° {idx:05d}\n\n"
+        f"Madame, Monsieur,\n\nNous vous mettons en demeure, pour le compte de notre client, de régler "
+        f"à {client} les factures {', '.join(invoices)} pour un montant total de {total} euros TTC "
+        f"dans un délai de {rng.choice([8, 15, 30])} jours. À défaut, une procédure d'injonction de payer "
+        f"sera engagée et les pénalités de retard prévues à l'Article L.441-10 du Code de commerce "
+        f"seront réclamées.\n"
+    )
+
+
+def synthetic_ruling(rng: random.Random, idx: int) -> str:
+    case = f"{rng.randint(10, 24)}-{rng.randint(10000, 99999)}"
+    return (
+        f"{rng.choice(COURTS)}, pourvoi n° {case}\n\n"
+        f"Faits : la société {rng.choice(CLIENTS)} reprochait à son cocontractant des retards de paiement "
+        f"répétés. Solution : la cour rappelle que les pénalités de retard sont exigibles de plein droit, "
+        f"sans rappel préalable, et que l'indemnité forfaitaire de 40 euros s'ajoute à ces pénalités. "
+        f"Décision n° {idx:05d}.\n"
+    )
+
+
+def synthetic_documents(count: int, seed: int = 7) -> Iterator[tuple[str, str]]:
+    """`count` (file name, text) pairs mixing contracts, formal notices and case law."""
+    rng = random.Random(seed)
+    for idx in range(count):
+        kind = rng.random()
+        if kind < 0.6:
+            yield f"contrat_{idx:05d}.txt", synthetic_contract(rng, idx)
+        elif kind < 0.85:
+            yield f"mise_en_demeure_{idx:05d}.txt", synthetic_notice(rng, idx)
+        else:
+            yield f"jurisprudence_{idx:05d}.txt", synthetic_ruling(rng, idx)
+
+
+def synthetic_question(rng: random.Random) -> str:
+    return rng.choice(QUESTIONS).format(
+        client=rng.choice(CLIENTS),
+        article=rng.randint(1, 8),
+        case=f"{rng.randint(10, 24)}-{rng.randint(10000, 99999)}",
+        invoice=rng.randint(1000, 9999),
+    )
@@ -0,0 +1,210 @@
+"""
+Per-rerun SQLite overhead of the Chat page, legacy connections vs the pooled layer.
+
+    python -m benchmarks.db_overhead --conversations 200 --messages 40 --documents 300 --reruns 500
+    python -m benchmarks.db_overhead --threads 16 --output data/benchmarks/db_overhead.json
+
+A "rerun" issues the queries the Chat page makes on every Streamlit rerun:
+list_conversations, get_conversation, list_messages and the registry listing.
+The legacy variant opens a new `sqlite3.connect` per call with the default
+rollback journal (the behaviour before rag.db); the pooled variant uses the
+stores as shipped. A concurrent phase runs reruns plus message writes from
+several threads and counts "database is locked" failures. A write phase compares
+storing a turn as two add_message calls plus TelemetryStore.record (three
+commits) with a single add_exchange, reporting time and WAL bytes per turn.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+import numpy as np
+
+from rag.conversations import ConversationStore
+from rag.db import get_pool
+from rag.registry import DocumentRecord, DocumentRegistry
+from rag.telemetry import StageRecord, TelemetryStore, Trace
+
+
+@contextmanager
+def _legacy_connection(path: Path) -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(path)
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+class LegacyConversationStore(ConversationStore):
+    def _connect(self):
+        return _legacy_connection(self.path)
+
+
+class LegacyDocumentRegistry(DocumentRegistry):
+    def _connect(self):
+        return _legacy_connection(self.path)
+
+
+def _populate(
+    conversations: ConversationStore, registry: DocumentRegistry, args: argparse.Namespace
+) -> list[str]:
+    ids = []
+    for idx in range(args.conversations):
+        conv = conversations.create_conversation(f"Conversation {idx}")
+        ids.append(conv.conversation_id)
+        for turn in range(args.messages):
+            role = "user" if turn % 2 == 0 else "assistant"
+            conversations.add_message(conv.conversation_id, role, f"Message {turn} " * 20, sources=[])
+    for idx in range(args.documents):
+        chunk_ids = [f"doc{idx}_chunk_{chunk:04d}" for chunk in range(20)]
+        registry.add(DocumentRecord(f"doc{idx}", f"doc{idx}.txt", f"/uploads/doc{idx}.txt", "txt", chunk_ids))
+    return ids
+
+
+def _rerun(conversations: ConversationStore, registry: DocumentRegistry, conversation_id: str) -> None:
+    conversations.list_conversations()
+    conversations.get_conversation(conversation_id)
+    conversations.list_messages(conversation_id)
+    registry.list()
+
+
+def _ms(values: list[float], q: float) -> float:
+    return round(float(np.percentile(np.asarray(values) * 1000, q)), 3) if values else 0.0
+
+
+def _measure(
+    variant: str, store_cls, registry_cls, args: argparse.Namespace, directory: Path
+) -> dict[str, Any]:
+    conversations = store_cls(directory / f"{variant}-conversations.sqlite3")
+    registry = registry_cls(directory / f"{variant}-registry.sqlite3")
+    ids = _populate(conversations, registry, args)
+
+    latencies = []
+    for idx in range(args.reruns):
+        started = time.perf_counter()
+        _rerun(conversations, registry, ids[idx % len(ids)])
+        latencies.append(time.perf_counter() - started)
+
+    locked = 0
+    other_errors = 0
+    lock = threading.Lock()
+    concurrent_latencies: list[float] = []
+
+    def worker(worker_id: int) -> None:
+        nonlocal locked, other_errors
+        for turn in range(args.concurrent_reruns):
+            conversation_id = ids[(worker_id + turn) % len(ids)]
+            started = time.perf_counter()
+            try:
+                conversations.add_message(conversation_id, "user", f"Question {worker_id}-{turn}")
+                _rerun(conversations, registry, conversation_id)
+            except sqlite3.OperationalError as err:
+                with lock:
+                    if "locked" in str(err):
+                        locked += 1
+                    else:
+                        other_errors += 1
+                continue
+            with lock:
+                concurrent_latencies.append(time.perf_counter() - started)
+
+    threads = [threading.Thread(target=worker, args=(idx,)) for idx in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "rerun_p50_ms": _ms(latencies, 50),
+        "rerun_p95_ms": _ms(latencies, 95),
+        "concurrent_p50_ms": _ms(concurrent_latencies, 50),
+        "concurrent_p95_ms": _ms(concurrent_latencies, 95),
+        "concurrent_ops_per_s": round(len(concurrent_latencies) / wall, 1) if wall else 0.0,
+        "database_locked_errors": locked,
+        "other_errors": other_errors,
+    }
+
+
+SOURCES = [{"doc_id": "doc0", "original_name": "doc0.txt", "chunk_index": 0}]
+
+
+def _trace() -> Trace:
+    return Trace(stages=[StageRecord(name, 10.0) for name in ("sanitize", "rewrite", "dense", "generation")])
+
+
+def _measure_turn_writes(args: argparse.Namespace, directory: Path) -> dict[str, Any]:
+    report: dict[str, Any] = {}
+    for variant in ("separate", "exchange"):
+        path = directory / f"turns-{variant}.sqlite3"
+        store = ConversationStore(path)
+        telemetry = TelemetryStore(path)
+        conversation_id = store.create_conversation().conversation_id
+        wal = path.with_name(path.name + "-wal")
+        with get_pool(path).connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            conn.execute("PRAGMA wal_autocheckpoint=0;")  # let the WAL grow so its size counts writes
+        latencies = []
+        for turn in range(args.turns):
+            started = time.perf_counter()
+            question, answer = f"Question {turn}", f"Réponse {turn} [1]."
+            if variant == "separate":
+                store.add_message(conversation_id, "user", question)
+                stored = store.add_message(conversation_id, "assistant", answer, sources=SOURCES)
+                telemetry.record(_trace(), message_id=stored.message_id)
+            else:
+                store.add_exchange(conversation_id, question, answer, sources=SOURCES, trace=_trace())
+            latencies.append(time.perf_counter() - started)
+        report[variant] = {
+            "commits_per_turn": 3 if variant == "separate" else 1,
+            "turn_p50_ms": _ms(latencies, 50),
+            "turn_p95_ms": _ms(latencies, 95),
+            "wal_bytes_per_turn": round(wal.stat().st_size / args.turns) if wal.exists() else 0,
+        }
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=30, help="Messages per conversation.")
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--reruns", type=int, default=300)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--concurrent-reruns", type=int, default=50, help="Write + rerun cycles per thread.")
+    parser.add_argument("--turns", type=int, default=200, help="Chat turns stored in the write phase.")
+    parser.add_argument("--output", help="Write the JSON report to this path.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rag-db-") as tmp:
+        directory = Path(tmp)
+        report = {
+            "settings": vars(args),
+            "legacy": _measure("legacy", LegacyConversationStore, LegacyDocumentRegistry, args, directory),
+            "pooled": _measure("pooled", ConversationStore, DocumentRegistry, args, directory),
+            "turn_writes": _measure_turn_writes(args, directory),
+        }
+    legacy, pooled = report["legacy"], report["pooled"]
+    if pooled["rerun_p50_ms"]:
+        report["rerun_speedup_p50"] = round(legacy["rerun_p50_ms"] / pooled["rerun_p50_ms"], 2)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Sweep Chroma HNSW parameters on the current corpus.
+
+    python -m benchmarks.hnsw_sweep --m 8 16 32 --construction-ef 100 200 --search-ef 10 50 100
+    python -m benchmarks.hnsw_sweep --synthetic 20000 --dim 1536 --output data/hnsw_sweep.json
+
+For each combination a throwaway collection is built from the stored embeddings
+(no re-embedding) and queried with perturbed stored vectors. Reports build time,
+p50/p95 query latency, recall@k against brute-force cosine search and on-disk
+index size. Apply the chosen values through HNSW_* in .env, then run
+`python -m rag.vector_store rebuild`.
+"""
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from rag.quantized_index import exact_search
+from rag.vector_store import hnsw_settings
+
+
+def _dir_size(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.rglob("*") if item.is_file())
+
+
+def _load_embeddings(args: argparse.Namespace) -> tuple[list[str], np.ndarray]:
+    if args.synthetic:
+        rng = np.random.default_rng(args.seed)
+        centers = rng.normal(size=(64, args.dim)).astype(np.float32)
+        labels = rng.integers(0, len(centers), size=args.synthetic)
+        vectors = centers[labels] + 0.5 * rng.normal(size=(args.synthetic, args.dim)).astype(np.float32)
+        return [f"synthetic_{idx}" for idx in range(args.synthetic)], vectors
+
+    from rag.vector_store import init_vector_store
+
+    data = init_vector_store().get(include=["embeddings"])
+    return list(data.get("ids", []) or []), np.asarray(data.get("embeddings"), dtype=np.float32)
+
+
+def _run(
+    ids: list[str],
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    truth: np.ndarray,
+    settings: dict,
+    k: int,
+) -> dict:
+    import chromadb
+
+    with tempfile.TemporaryDirectory() as tmp:
+        client = chromadb.PersistentClient(path=tmp)
+        collection = client.create_collection("sweep", metadata=settings)
+        batch_size = client.get_max_batch_size()
+
+        start = time.perf_counter()
+        for offset in range(0, len(ids), batch_size):
+            collection.add(
+                ids=ids[offset : offset + batch_size],
+                embeddings=vectors[offset : offset + batch_size].tolist(),
+            )
+        build_seconds = time.perf_counter() - start
+
+        positions = {id_: row for row, id_ in enumerate(ids)}
+        latencies: list[float] = []
+        hits = 0
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            result = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+            latencies.append(time.perf_counter() - start)
+            found = {positions[id_] for id_ in result["ids"][0]}
+            hits += len(found.intersection(int(row) for row in expected))
+
+        index_bytes = _dir_size(Path(tmp))
+        client.delete_collection("sweep")
+
+    return {
+        **settings,
+        "k": k,
+        "build_seconds": round(build_seconds, 3),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)) * 1000, 3),
+        "recall_at_k": round(hits / max(truth.size, 1), 4),
+        "index_bytes": index_bytes,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--space", nargs="+", default=["l2"], choices=["l2", "cosine", "ip"])
+    parser.add_argument("--m", nargs="+", type=int, default=[8, 16, 32])
+    parser.add_argument("--construction-ef", nargs="+", type=int, default=[100, 200])
+    parser.add_argument("--search-ef", nargs="+", type=int, default=[10, 50, 100])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random clustered vectors.")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON.")
+    args = parser.parse_args()
+
+    ids, vectors = _load_embeddings(args)
+    if not ids:
+        raise SystemExit("No embeddings found in the vector store.")
+    # Normalized vectors make l2, cosine and inner product rank neighbours identically,
+    # so a single brute-force cosine ground truth serves every space.
+    vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    rng = np.random.default_rng(args.seed)
+    picks = rng.choice(len(ids), size=min(args.queries, len(ids)), replace=False)
+    queries = vectors[picks] + args.noise * rng.normal(size=(len(picks), vectors.shape[1]))
+    queries = (queries / np.linalg.norm(queries, axis=1, keepdims=True)).astype(np.float32)
+    truth = exact_search(vectors, queries, args.k)
+
+    results = []
+    for space, m, construction_ef, search_ef in itertools.product(
+        args.space, args.m, args.construction_ef, args.search_ef
+    ):
+        settings = hnsw_settings(space=space, construction_ef=construction_ef, search_ef=search_ef, m=m)
+        result = _run(ids, vectors, queries, truth, settings, args.k)
+        results.append(result)
+        print(
+            f"space={space:<6} M={m:<3} construction_ef={construction_ef:<4} search_ef={search_ef:<4} "
+            f"build={result['build_seconds']:>7.2f}s p50={result['p50_ms']:>7.2f}ms "
+            f"p95={result['p95_ms']:>7.2f}ms recall@{args.k}={result['recall_at_k']:.3f} "
+            f"size={result['index_bytes'] / 1024 / 1024:.1f}MB",
+            flush=True,
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Cold import time of the modules a Streamlit worker loads before rendering a page.
+
+    python -m benchmarks.import_time --runs 5 --budget-ms 500
+    python -m benchmarks.import_time --modules rag.pipeline rag.documents --output data/benchmarks/import.json
+
+Each run imports the modules in a fresh interpreter started with `python -X importtime`
+(empty RAG_DATA_DIR, placeholder OPENAI_API_KEY), so nothing is cached between runs.
+Reports the wall time of the import statement, the heaviest top-level imports from the
+importtime trace and which heavy dependencies (Chroma, LangChain, OpenAI SDK, rank_bm25)
+got loaded eagerly. Exits with status 1 when the median exceeds `--budget-ms`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+# What pages/1_Chat.py and pages/2_Documents.py import from rag before their first render.
+PAGE_MODULES = [
+    "rag.archive",
+    "rag.config",
+    "rag.conversations",
+    "rag.documents",
+    "rag.pipeline",
+    "rag.telemetry",
+]
+
+# Dependencies that should only load on first question, ingestion or vector store access.
+HEAVY_MODULES = [
+    "chromadb",
+    "langchain_chroma",
+    "langchain_community",
+    "langchain_core",
+    "langchain_openai",
+    "langchain_text_splitters",
+    "openai",
+    "rank_bm25",
+    "tiktoken",
+]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {modules}
+elapsed = time.perf_counter() - started
+print(json.dumps([elapsed, [name for name in {heavy!r} if name in sys.modules]]))
+"""
+
+
+def _parse_importtime(stderr: str) -> list[tuple[str, float, float]]:
+    """(module, self ms, cumulative ms) for the top-level entries of an `-X importtime` trace."""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_field, cumulative_us, name = line.split("|")
+        if name.startswith("   "):
+            continue  # nested import, already counted in its parent's cumulative time
+        self_us = self_field.removeprefix("import time:")
+        entries.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return entries
+
+
+def measure(modules: list[str], directory: Path) -> dict[str, Any]:
+    env = {
+        **os.environ,
+        "RAG_DATA_DIR": str(directory),
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "sk-import-time",
+    }
+    code = _PROBE.format(modules=", ".join(modules), heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    elapsed, heavy = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+        "wall_ms": round(elapsed * 1000, 1),
+        "heavy_loaded": heavy,
+        "trace": _parse_importtime(result.stderr),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", nargs="+", default=PAGE_MODULES)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Heaviest top-level imports to report.")
+    parser.add_argument("--budget-ms", type=float, default=500.0, help="Maximum median wall time.")
+    parser.add_argument("--output", help="Write the JSON report to this path.")
+    args = parser.parse_args()
+
+    runs = []
+    for _ in range(args.runs):
+        with tempfile.TemporaryDirectory(prefix="rag-import-") as tmp:
+            runs.append(measure(args.modules, Path(tmp)))
+
+    walls = [run["wall_ms"] for run in runs]
+    last_trace = sorted(runs[-1]["trace"], key=lambda entry: entry[2], reverse=True)
+    report = {
+        "settings": vars(args),
+        "wall_ms_min": min(walls),
+        "wall_ms_median": round(statistics.median(walls), 1),
+        "heavy_loaded": runs[-1]["heavy_loaded"],
+        "heaviest_imports_ms": {name: cumulative for name, _self, cumulative in last_trace[: args.top]},
+        "within_budget": statistics.median(walls) <= args.budget_ms,
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+    if not report["within_budget"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Load test of the chat and ingestion paths against the local OpenAI stand-in.
+
+    python -m benchmarks.load_test --sessions 16 --turns 5 --ingest-workers 2 --ingest-docs 10
+    python -m benchmarks.load_test --sessions 32 --fault-429 0.05 --output data/load_test.json
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8089/v1   # already running mock
+
+Each chat session is a thread asking `--turns` questions through `answer_question`
+with its growing history; ingest workers upload synthetic documents through
+`ingest_upload` at the same time. The run uses a throwaway data directory
+(RAG_DATA_DIR) unless `--data-dir` is given. Reports throughput, p50/p95/p99
+latency and error rates per operation, plus the mock server counters.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+from benchmarks.corpus import FOLLOW_UPS, synthetic_contract, synthetic_documents, synthetic_question
+from benchmarks.mock_openai import add_mock_arguments, settings_from_args, start_mock_server
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    array = np.asarray(values) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(array, 50)), 1),
+        "p95_ms": round(float(np.percentile(array, 95)), 1),
+        "p99_ms": round(float(np.percentile(array, 99)), 1),
+        "max_ms": round(float(array.max()), 1),
+    }
+
+
+class Recorder:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, Counter[str]] = {}
+
+    def timed(self, operation: str, fn: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        try:
+            result = fn()
+        except Exception as err:
+            with self._lock:
+                self.errors.setdefault(operation, Counter())[type(err).__name__] += 1
+                self.latencies.setdefault(operation, [])
+            return None
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies.setdefault(operation, []).append(elapsed)
+        return result
+
+    def report(self, wall_seconds: float) -> dict[str, Any]:
+        report: dict[str, Any] = {}
+        for operation in sorted(set(self.latencies) | set(self.errors)):
+            ok = self.latencies.get(operation, [])
+            errors = self.errors.get(operation, Counter())
+            total = len(ok) + sum(errors.values())
+            report[operation] = {
+                "requests": total,
+                "errors": sum(errors.values()),
+                "error_rate": round(sum(errors.values()) / total, 4) if total else 0.0,
+                "throughput_per_s": round(len(ok) / wall_seconds, 2) if wall_seconds else 0.0,
+                **_percentiles(ok),
+                "errors_by_type": dict(errors),
+            }
+        return report
+
+
+def _chat_session(session: int, args: argparse.Namespace, recorder: Recorder, answer_question) -> None:
+    rng = random.Random(args.seed + session)
+    history: list[dict[str, str]] = []
+    for turn in range(args.turns):
+        if turn and rng.random() < 0.5:
+            question = rng.choice(FOLLOW_UPS)
+        else:
+            question = synthetic_question(rng)
+        result = recorder.timed("chat", lambda: answer_question(question, history=list(history)))
+        history.append({"role": "user", "content": question})
+        if result is not None:
+            history.append({"role": "assistant", "content": result[0]})
+        time.sleep(rng.uniform(0, args.think_seconds))
+
+
+def _ingest_worker(worker: int, args: argparse.Namespace, recorder: Recorder, ingest_upload) -> None:
+    rng = random.Random(args.seed * 1000 + worker)
+    for idx in range(args.ingest_docs):
+        text = synthetic_contract(rng, worker * 10000 + idx)
+        recorder.timed("ingest", lambda: ingest_upload(f"load_{worker}_{idx}.txt", text.encode("utf-8")))
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    server = mock = None
+    base_url = args.base_url
+    if not base_url:
+        server, mock = start_mock_server(settings_from_args(args))
+        base_url = f"http://127.0.0.1:{server.server_port}/v1"
+
+    data_dir = Path(args.data_dir) if args.data_dir else Path(tempfile.mkdtemp(prefix="rag-load-"))
+    # rag.config reads the environment at import time, so this must happen before importing rag.
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["RAG_DATA_DIR"] = str(data_dir)
+    os.environ.setdefault("OPENAI_API_KEY", "sk-mock")
+    # The stand-in does not enforce context lengths; skip tiktoken so runs work offline.
+    os.environ.setdefault("USE_TIKTOKEN", "false")
+    os.environ.setdefault("EMBEDDINGS_CHECK_CTX_LENGTH", "false")
+
+    from rag.documents import ingest_upload
+    from rag.pipeline import answer_question
+
+    for name, text in synthetic_documents(args.seed_docs, seed=args.seed):
+        ingest_upload(name, text.encode("utf-8"))
+
+    recorder = Recorder()
+    threads = [
+        threading.Thread(target=_chat_session, args=(idx, args, recorder, answer_question))
+        for idx in range(args.sessions)
+    ] + [
+        threading.Thread(target=_ingest_worker, args=(idx, args, recorder, ingest_upload))
+        for idx in range(args.ingest_workers)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    result = {
+        "base_url": base_url,
+        "data_dir": str(data_dir),
+        "sessions": args.sessions,
+        "turns": args.turns,
+        "ingest_workers": args.ingest_workers,
+        "ingest_docs": args.ingest_docs,
+        "wall_seconds": round(wall, 2),
+        "operations": recorder.report(wall),
+    }
+    if mock is not None:
+        result["mock_counts"] = dict(mock.stats)
+        server.shutdown()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=8, help="Concurrent chat sessions.")
+    parser.add_argument("--turns", type=int, default=5, help="Questions per session.")
+    parser.add_argument("--think-seconds", type=float, default=0.5, help="Max pause between turns.")
+    parser.add_argument("--ingest-workers", type=int, default=1)
+    parser.add_argument("--ingest-docs", type=int, default=5, help="Documents uploaded per ingest worker.")
+    parser.add_argument("--seed-docs", type=int, default=20, help="Documents ingested before the run.")
+    parser.add_argument("--base-url", help="Use an already running OpenAI-compatible server.")
+    parser.add_argument("--data-dir", help="RAG_DATA_DIR for the run (default: temporary directory).")
+    parser.add_argument("--output", help="Write the JSON report to this path.")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    args.seed = args.seed if args.seed is not None else 7
+
+    result = run(args)
+    text = json.dumps(result, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
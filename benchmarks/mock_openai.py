@@ -0,0 +1,347 @@
+"""
+Local stand-in for the OpenAI chat-completions and embeddings endpoints.
+
+    python -m benchmarks.mock_openai --port 8089 --chat-latency-ms 600 --fault-429 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=sk-mock streamlit run main.py
+
+Latencies are drawn from a fixed, uniform or lognormal distribution per endpoint,
+embeddings come from `rag.local_embeddings.HashingEmbeddings` (same text, same vector),
+and a fraction of requests can be answered with 429 or left hanging to trigger
+client timeouts. Chat answers cite `[1]` when the prompt carries a context block,
+so the QA citation guard passes. GET /stats returns request and fault counters.
+"""
+from __future__ import annotations
+
+import argparse
+import base64
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from uuid import uuid4
+
+import numpy as np
+
+from rag.local_embeddings import HashingEmbeddings
+
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "lognormal")
+CACHE_BLOCK_TOKENS = 128  # provider prompt caching granularity
+CACHE_MIN_TOKENS = 1024
+
+
+@dataclass
+class MockSettings:
+    distribution: str = "lognormal"
+    chat_latency_ms: float = 500.0  # median time before the first byte of a chat answer
+    embeddings_latency_ms: float = 80.0
+    latency_sigma: float = 0.5  # lognormal shape, or +/- fraction of the median for "uniform"
+    stream_token_ms: float = 15.0  # delay between streamed chunks
+    fault_429: float = 0.0  # fraction of requests rejected with 429
+    fault_timeout: float = 0.0  # fraction of requests that hang for `hang_seconds`
+    hang_seconds: float = 90.0
+    retry_after: float = 1.0
+    dim: int = 1536
+    seed: int | None = None
+
+
+@lru_cache(maxsize=8)
+def _embedder(dim: int) -> HashingEmbeddings:
+    return HashingEmbeddings(dim=dim)
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(len(text) // 4, 1)
+
+
+class MockOpenAI:
+    """Request handling state shared by the server threads."""
+
+    def __init__(self, settings: MockSettings) -> None:
+        if settings.distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unsupported latency distribution: {settings.distribution}")
+        self.settings = settings
+        self._rng = random.Random(settings.seed)
+        self._lock = threading.Lock()
+        self._seen_prefixes: set[str] = set()
+        self.stats: Counter[str] = Counter()
+
+    def latency(self, median_ms: float) -> float:
+        settings = self.settings
+        with self._lock:
+            if settings.distribution == "fixed":
+                value = median_ms
+            elif settings.distribution == "uniform":
+                spread = median_ms * settings.latency_sigma
+                value = self._rng.uniform(median_ms - spread, median_ms + spread)
+            else:
+                value = median_ms * self._rng.lognormvariate(0.0, settings.latency_sigma)
+        return max(value, 0.0) / 1000
+
+    def fault(self) -> str | None:
+        with self._lock:
+            draw = self._rng.random()
+        if draw < self.settings.fault_429:
+            return "429"
+        if draw < self.settings.fault_429 + self.settings.fault_timeout:
+            return "timeout"
+        return None
+
+    def count(self, key: str) -> None:
+        with self._lock:
+            self.stats[key] += 1
+
+    def cached_tokens(self, messages: list[dict[str, Any]]) -> int:
+        """Simulate provider prompt caching of a repeated system prefix."""
+        system = "".join(str(m.get("content", "")) for m in messages if m.get("role") == "system")
+        tokens = _estimate_tokens(system) if system else 0
+        if tokens < CACHE_MIN_TOKENS:
+            return 0
+        key = hashlib.sha1(system.encode("utf-8")).hexdigest()
+        with self._lock:
+            seen = key in self._seen_prefixes
+            self._seen_prefixes.add(key)
+        return tokens // CACHE_BLOCK_TOKENS * CACHE_BLOCK_TOKENS if seen else 0
+
+    def chat_answer(self, messages: list[dict[str, Any]]) -> str:
+        last = str(messages[-1].get("content", "")) if messages else ""
+        if "Context:" in last:
+            question = last.rsplit("Question:", 1)[-1].strip()
+            return f"Réponse simulée à « {question[:80]} » d'après les documents [1]."
+        # Question rewriting and any other call: echo the user text back.
+        return last.strip() or "Réponse simulée."
+
+    def embeddings(self, inputs: list[Any]) -> list[np.ndarray]:
+        texts = [
+            item if isinstance(item, str) else " ".join(f"t{token}" for token in item)  # token-id arrays
+            for item in inputs
+        ]
+        return list(_embedder(self.settings.dim).embed_array(texts))
+
+
+def _make_handler(mock: MockOpenAI) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            pass
+
+        def _json(self, status: int, payload: dict[str, Any], headers: dict[str, str] | None = None) -> None:
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self) -> dict[str, Any]:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _apply_fault(self, endpoint: str) -> bool:
+            fault = mock.fault()
+            if fault == "429":
+                mock.count(f"{endpoint}.429")
+                self._json(
+                    429,
+                    {"error": {"message": "Rate limit reached (mock).", "type": "rate_limit_error", "code": None}},
+                    {"Retry-After": str(mock.settings.retry_after)},
+                )
+                return True
+            if fault == "timeout":
+                mock.count(f"{endpoint}.timeout")
+                time.sleep(mock.settings.hang_seconds)
+                self._json(504, {"error": {"message": "Gateway timeout (mock).", "type": "timeout"}})
+                return True
+            return False
+
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path.rstrip("/").endswith("/stats"):
+                self._json(200, {"settings": asdict(mock.settings), "counts": dict(mock.stats)})
+            elif self.path.rstrip("/").endswith("/models"):
+                self._json(200, {"object": "list", "data": [{"id": "mock", "object": "model"}]})
+            else:
+                self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def do_POST(self) -> None:  # noqa: N802
+            try:
+                body = self._read_body()
+            except json.JSONDecodeError:
+                self._json(400, {"error": {"message": "Invalid JSON body."}})
+                return
+            if self.path.endswith("/chat/completions"):
+                self._chat(body)
+            elif self.path.endswith("/embeddings"):
+                self._embeddings(body)
+            else:
+                self._json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def _chat(self, body: dict[str, Any]) -> None:
+            mock.count("chat")
+            if self._apply_fault("chat"):
+                return
+            messages = body.get("messages") or []
+            answer = mock.chat_answer(messages)
+            prompt_tokens = sum(_estimate_tokens(str(m.get("content", ""))) for m in messages)
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": _estimate_tokens(answer),
+                "total_tokens": prompt_tokens + _estimate_tokens(answer),
+                "prompt_tokens_details": {"cached_tokens": mock.cached_tokens(messages)},
+            }
+            completion_id = f"chatcmpl-{uuid4().hex}"
+            model = body.get("model", "mock")
+            time.sleep(mock.latency(mock.settings.chat_latency_ms))
+
+            if not body.get("stream"):
+                self._json(
+                    200,
+                    {
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": model,
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": answer},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": usage,
+                    },
+                )
+                return
+
+            mock.count("chat.stream")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            def send(payload: dict[str, Any] | str) -> None:
+                data = payload if isinstance(payload, str) else json.dumps(payload)
+                self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+                self.wfile.flush()
+
+            base = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+            }
+            pieces = re.findall(r"\S+\s*", answer) or [answer]
+            for idx, piece in enumerate(pieces):
+                delta = {"role": "assistant", "content": piece} if idx == 0 else {"content": piece}
+                send({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+                time.sleep(mock.settings.stream_token_ms / 1000)
+            send({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+            if (body.get("stream_options") or {}).get("include_usage"):
+                send({**base, "choices": [], "usage": usage})
+            send("[DONE]")
+            self.close_connection = True
+
+        def _embeddings(self, body: dict[str, Any]) -> None:
+            mock.count("embeddings")
+            if self._apply_fault("embeddings"):
+                return
+            inputs = body.get("input")
+            if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+                inputs = [inputs]
+            vectors = mock.embeddings(list(inputs or []))
+            time.sleep(mock.latency(mock.settings.embeddings_latency_ms))
+            as_base64 = body.get("encoding_format") == "base64"
+            data = [
+                {
+                    "object": "embedding",
+                    "index": idx,
+                    "embedding": (
+                        base64.b64encode(vector.astype("<f4").tobytes()).decode("ascii")
+                        if as_base64
+                        else vector.tolist()
+                    ),
+                }
+                for idx, vector in enumerate(vectors)
+            ]
+            tokens = sum(_estimate_tokens(str(item)) for item in inputs or [])
+            self._json(
+                200,
+                {
+                    "object": "list",
+                    "data": data,
+                    "model": body.get("model", "mock"),
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+                },
+            )
+
+    return Handler
+
+
+def start_mock_server(
+    settings: MockSettings | None = None, *, host: str = "127.0.0.1", port: int = 0
+) -> tuple[ThreadingHTTPServer, MockOpenAI]:
+    """Serve in a daemon thread; the OpenAI base URL is `http://host:<server.server_port>/v1`."""
+    mock = MockOpenAI(settings or MockSettings())
+    server = ThreadingHTTPServer((host, port), _make_handler(mock))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server, mock
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = MockSettings()
+    parser.add_argument("--distribution", choices=LATENCY_DISTRIBUTIONS, default=defaults.distribution)
+    parser.add_argument("--chat-latency-ms", type=float, default=defaults.chat_latency_ms)
+    parser.add_argument("--embeddings-latency-ms", type=float, default=defaults.embeddings_latency_ms)
+    parser.add_argument("--latency-sigma", type=float, default=defaults.latency_sigma)
+    parser.add_argument("--stream-token-ms", type=float, default=defaults.stream_token_ms)
+    parser.add_argument("--fault-429", type=float, default=defaults.fault_429)
+    parser.add_argument("--fault-timeout", type=float, default=defaults.fault_timeout)
+    parser.add_argument("--hang-seconds", type=float, default=defaults.hang_seconds)
+    parser.add_argument("--retry-after", type=float, default=defaults.retry_after)
+    parser.add_argument("--dim", type=int, default=defaults.dim)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def settings_from_args(args: argparse.Namespace) -> MockSettings:
+    return MockSettings(
+        distribution=args.distribution,
+        chat_latency_ms=args.chat_latency_ms,
+        embeddings_latency_ms=args.embeddings_latency_ms,
+        latency_sigma=args.latency_sigma,
+        stream_token_ms=args.stream_token_ms,
+        fault_429=args.fault_429,
+        fault_timeout=args.fault_timeout,
+        hang_seconds=args.hang_seconds,
+        retry_after=args.retry_after,
+        dim=args.dim,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    server, _mock = start_mock_server(settings_from_args(args), host=args.host, port=args.port)
+    print(f"Mock OpenAI listening on http://{args.host}:{server.server_port}/v1 (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
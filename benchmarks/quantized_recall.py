@@ -0,0 +1,151 @@
+"""
+Recall@k and latency of the quantized index against exact float32 search.
+
+    python -m benchmarks.quantized_recall --k 10 --queries 200
+    python -m benchmarks.quantized_recall --synthetic 50000 --dim 1536 --backend chroma
+
+Without --synthetic, embeddings are read from the configured vector store.
+Queries are stored vectors perturbed with small Gaussian noise.
+
+The `store_*` fields time the two dense paths of HybridRetriever through a vector store, documents
+included: the store's own nearest-neighbour search (HNSW for Chroma) and the quantized first pass
+with rescoring on float32 vectors read back from the store. That lookup is a store `get` per query,
+so check that the quantized path still beats plain dense search on your backend before enabling
+it. The store is the configured one, or with --synthetic a temporary store of --backend.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.quantized_index import QUANTIZATION_MODES, QuantizedIndex, array_lookup, recall_report
+
+
+def _load_embeddings(args: argparse.Namespace) -> tuple[list[str], np.ndarray]:
+    rng = np.random.default_rng(args.seed)
+    if args.synthetic:
+        centers = rng.normal(size=(64, args.dim)).astype(np.float32)
+        labels = rng.integers(0, len(centers), size=args.synthetic)
+        vectors = centers[labels] + 0.5 * rng.normal(size=(args.synthetic, args.dim)).astype(np.float32)
+        return [f"synthetic_{idx}" for idx in range(args.synthetic)], vectors
+
+    from rag.vector_store import init_vector_store
+
+    data = init_vector_store().get(include=["embeddings"])
+    return list(data.get("ids", []) or []), np.asarray(data.get("embeddings"), dtype=np.float32)
+
+
+class _PrecomputedEmbeddings(Embeddings):
+    """Embeds a vector id as its precomputed vector, so synthetic vectors enter a store unchanged."""
+
+    def __init__(self, ids: list[str], vectors: np.ndarray) -> None:
+        self._by_id = dict(zip(ids, vectors))
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._by_id[text].tolist() for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._by_id[text].tolist()
+
+
+def _temporary_store(backend: str, directory: Path, ids: list[str], vectors: np.ndarray) -> Any:
+    from rag.vector_store import create_vector_store
+
+    embedder = _PrecomputedEmbeddings(ids, vectors)
+    store = create_vector_store(backend, embedder=embedder, name="benchmark", directory=directory)
+    for start in range(0, len(ids), 1000):
+        batch = ids[start : start + 1000]
+        store.add_texts(batch, metadatas=[{"chunk_id": id_} for id_ in batch], ids=batch)
+    return store
+
+
+def store_latency_report(
+    vector_store: Any, index: QuantizedIndex, queries: np.ndarray, k: int
+) -> dict[str, float]:
+    """Per-query p50/p95 of plain dense search and of quantized search + rescoring, both via the store."""
+    from rag.vector_store import similarity_search_by_vectors
+
+    dense: list[float] = []
+    quantized: list[float] = []
+    for query in queries:
+        start = time.perf_counter()
+        similarity_search_by_vectors(vector_store, [query.tolist()], k)
+        dense.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        hits = index.search([query], k)[0]
+        vector_store.get(ids=[id_ for id_, _score in hits], include=["documents", "metadatas"])
+        quantized.append(time.perf_counter() - start)
+
+    def _ms(values: list[float], q: float) -> float:
+        return round(float(np.percentile(values, q)) * 1000, 3)
+
+    return {
+        "store_dense_p50_ms": _ms(dense, 50),
+        "store_dense_p95_ms": _ms(dense, 95),
+        "store_quantized_p50_ms": _ms(quantized, 50),
+        "store_quantized_p95_ms": _ms(quantized, 95),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", default=list(QUANTIZATION_MODES), choices=QUANTIZATION_MODES)
+    parser.add_argument("--rescore-multipliers", nargs="+", type=int, default=[2, 4, 8])
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N random clustered vectors.")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--backend",
+        default="chroma",
+        choices=["chroma", "numpy", "none"],
+        help="Store for the store_* latencies with --synthetic ('none' skips them).",
+    )
+    args = parser.parse_args()
+
+    ids, vectors = _load_embeddings(args)
+    if not ids:
+        raise SystemExit("No embeddings found in the vector store.")
+    rng = np.random.default_rng(args.seed)
+    picks = rng.choice(len(ids), size=min(args.queries, len(ids)), replace=False)
+    queries = vectors[picks] + args.noise * rng.normal(size=(len(picks), vectors.shape[1])).astype(np.float32)
+
+    reports = []
+    with tempfile.TemporaryDirectory() as tmp:
+        vector_store = None
+        if not args.synthetic:
+            from rag.vector_store import init_vector_store
+
+            vector_store = init_vector_store()
+        elif args.backend != "none":
+            vector_store = _temporary_store(args.backend, Path(tmp) / "store", ids, vectors)
+
+        for mode in args.modes:
+            index = QuantizedIndex(Path(tmp) / mode, mode=mode, lookup=array_lookup(ids, vectors))
+            index.build(ids, vectors)
+            for multiplier in args.rescore_multipliers:
+                index.rescore_multiplier = multiplier
+                report = recall_report(index, vectors, queries, k=args.k)
+                if vector_store is not None:
+                    from rag.vector_store import store_lookup
+
+                    index.lookup = store_lookup(vector_store)
+                    report["store_backend"] = type(vector_store).__name__
+                    report.update(store_latency_report(vector_store, index, queries, args.k))
+                    index.lookup = array_lookup(ids, vectors)
+                reports.append(report)
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+Per-request construction of retrievers and stores vs the shared resources of rag.resources.
+
+    python -m benchmarks.resource_reuse --documents 40 --questions 300
+    python -m benchmarks.resource_reuse --output data/benchmarks/resource_reuse.json
+
+Runs in a temporary RAG_DATA_DIR with the local embeddings (no API calls) and a stub chat
+model, so only retrieval and object construction are measured. Three comparisons:
+
+- acquire: obtaining a HybridRetriever, a ConversationStore and a DocumentRegistry by
+  constructing them (what `answer_question` did for the retriever on every question) vs
+  `ResourceManager.retriever` / `.conversations` / `.registry`;
+- answer: `answer_question` end to end, with a new retriever per question (the shared one
+  dropped with `reset("retrievers")` before each call, the previous behaviour) vs the shared one;
+- allocations: tracemalloc peak bytes per call for both of the above.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable
+
+import numpy as np
+
+
+class _StubLLM:
+    def invoke(self, prompt_value: Any, config: Any = None) -> Any:
+        return SimpleNamespace(content="Réponse [1].", response_metadata={})
+
+
+def _us(values: list[float], q: float) -> float:
+    return round(float(np.percentile(np.asarray(values) * 1e6, q)), 1) if values else 0.0
+
+
+def _time(fn: Callable[[], Any], runs: int) -> dict[str, float]:
+    fn()  # first call pays one-off imports and caches for both variants
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - started)
+    return {"p50_us": _us(latencies, 50), "p95_us": _us(latencies, 95)}
+
+
+def _peak_bytes(fn: Callable[[], Any], runs: int) -> int:
+    fn()
+    peaks = []
+    tracemalloc.start()
+    try:
+        for _ in range(runs):
+            current, _peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            fn()
+            peaks.append(tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+    return int(np.median(peaks))
+
+
+def _compare(variants: dict[str, Callable[[], Any]], runs: int) -> dict[str, Any]:
+    report = {}
+    for name, fn in variants.items():
+        report[name] = {**_time(fn, runs), "peak_bytes": _peak_bytes(fn, min(runs, 100))}
+    return report
+
+
+def _run(args: argparse.Namespace) -> dict[str, Any]:
+    # rag.config reads the environment at import, hence the imports after main() set it up.
+    from benchmarks.corpus import synthetic_documents, synthetic_question
+    from rag.config import CONVERSATIONS_DB_PATH, REGISTRY_DB_PATH
+    from rag.conversations import ConversationStore
+    from rag.documents import ingest_upload
+    from rag.pipeline import qa
+    from rag.pipeline.hybrid_retriever import HybridRetriever
+    from rag.registry import DocumentRegistry
+    from rag.resources import get_resource_manager
+
+    for name, text in synthetic_documents(args.documents):
+        ingest_upload(name, text.encode("utf-8"))
+    resources = get_resource_manager()
+    rng = random.Random(11)
+    questions = [synthetic_question(rng) for _ in range(args.questions)]
+    cursor = iter(range(10**9))
+
+    def ask() -> None:
+        qa.answer_question(questions[next(cursor) % len(questions)], top_k=args.top_k, llm=_StubLLM())
+
+    def ask_with_new_retriever() -> None:
+        resources.reset("retrievers")
+        ask()
+
+    report: dict[str, Any] = {
+        "acquire_retriever": _compare(
+            {
+                "per_request": lambda: HybridRetriever(dense_k=args.top_k, lexical_k=args.top_k),
+                "shared": lambda: resources.retriever(args.top_k),
+            },
+            args.questions,
+        ),
+        "acquire_conversation_store": _compare(
+            {
+                "per_request": lambda: ConversationStore(CONVERSATIONS_DB_PATH),
+                "shared": lambda: resources.conversations,
+            },
+            args.questions,
+        ),
+        "acquire_registry": _compare(
+            {"per_request": lambda: DocumentRegistry(REGISTRY_DB_PATH), "shared": lambda: resources.registry},
+            args.questions,
+        ),
+    }
+    report["answer_question"] = _compare(
+        {"per_request": ask_with_new_retriever, "shared": ask}, args.questions
+    )
+    report["retrievers_created"] = sorted(resources.get("retrievers"))
+    resources.close()
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=40)
+    parser.add_argument("--questions", type=int, default=300, help="Calls measured per variant.")
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--output", help="Write the JSON report to this path.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="rag-resources-") as tmp:
+        os.environ.update(
+            {
+                "RAG_DATA_DIR": tmp,
+                "EMBEDDINGS_PROVIDER": "local",
+                "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY") or "sk-resource-reuse",
+                "WARMUP_ENABLED": "false",
+            }
+        )
+        report = {"settings": vars(args), **_run(args)}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,222 @@
+"""
+Offline retrieval benchmark on a synthetic French legal corpus.
+
+    python -m benchmarks.retrieval_suite --sizes 200 1000 5000
+    python -m benchmarks.retrieval_suite --backend numpy --output data/benchmarks/numpy.json
+    python -m benchmarks.retrieval_suite --compare data/benchmarks/before.json
+
+Runs with EMBEDDINGS_PROVIDER=local (deterministic hashing embeddings, no API key)
+and USE_TIKTOKEN=false. Each corpus size runs in its own process with a throwaway
+RAG_DATA_DIR and reports ingest throughput, BM25 build time and peak allocation,
+HybridRetriever.invoke p50/p95, `_fuse` cost, peak RSS and on-disk size. Results
+are written as JSON together with the git revision so runs of different versions
+can be compared with `--compare`.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from benchmarks.corpus import synthetic_documents, synthetic_question
+
+BASE_DIR = Path(__file__).resolve().parents[1]
+# Metrics where a larger value is better; every other numeric metric is a cost.
+HIGHER_IS_BETTER = {"ingest_docs_per_s", "ingest_chunks_per_s"}
+
+
+def _ms(values: list[float], q: float, scale: float = 1000) -> float:
+    return round(float(np.percentile(np.asarray(values) * scale, q)), 3) if values else 0.0
+
+
+def _dir_size(path: Path) -> int:
+    return sum(item.stat().st_size for item in path.rglob("*") if item.is_file())
+
+
+def _worker(args: argparse.Namespace) -> dict[str, Any]:
+    """Runs inside the child process; rag is imported only after the parent set the environment."""
+    from rag.config import DATA_DIR
+    from rag.documents import ingest_upload
+    from rag.pipeline.hybrid_retriever import HybridRetriever, query_router
+
+    documents = list(synthetic_documents(args.size, seed=args.seed))
+    started = time.perf_counter()
+    chunks = 0
+    for name, text in documents:
+        _record, count = ingest_upload(name, text.encode("utf-8"))
+        chunks += count
+    ingest_seconds = time.perf_counter() - started
+
+    build_times = []
+    for _ in range(args.repeat):
+        HybridRetriever.notify_docs_changed()
+        started = time.perf_counter()
+        HybridRetriever._rebuild_bm25_index(args.top_k)
+        build_times.append(time.perf_counter() - started)
+    HybridRetriever.notify_docs_changed()
+    tracemalloc.start()
+    HybridRetriever._rebuild_bm25_index(args.top_k)
+    bm25_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    rng = random.Random(args.seed)
+    queries = [synthetic_question(rng) for _ in range(args.queries)]
+    retriever = HybridRetriever(dense_k=args.top_k, lexical_k=args.top_k)
+    for query in queries[:3]:
+        retriever.invoke(query, k=args.top_k)
+    query_router.reset()
+    invoke_times = []
+    for query in queries:
+        started = time.perf_counter()
+        retriever.invoke(query, k=args.top_k)
+        invoke_times.append(time.perf_counter() - started)
+
+    fuse_times = []
+    for query in queries[: min(len(queries), 20)]:
+        dense = retriever._dense_search(query)
+        lexical = retriever._lexical_search(query)
+        for _ in range(args.fuse_repeat):
+            started = time.perf_counter()
+            retriever._fuse(dense, lexical, args.top_k)
+            fuse_times.append(time.perf_counter() - started)
+
+    return {
+        "size": args.size,
+        "chunks": chunks,
+        "ingest_seconds": round(ingest_seconds, 3),
+        "ingest_docs_per_s": round(len(documents) / ingest_seconds, 2),
+        "ingest_chunks_per_s": round(chunks / ingest_seconds, 2),
+        "bm25_build_ms": _ms(build_times, 50),
+        "bm25_build_peak_bytes": bm25_peak,
+        "invoke_p50_ms": _ms(invoke_times, 50),
+        "invoke_p95_ms": _ms(invoke_times, 95),
+        "fuse_p50_us": _ms(fuse_times, 50, scale=1e6),
+        "fuse_p95_us": _ms(fuse_times, 95, scale=1e6),
+        "routes": {route: stats["count"] for route, stats in query_router.report().items()},
+        # ru_maxrss is in KiB on Linux.
+        "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+        "data_dir_bytes": _dir_size(DATA_DIR),
+    }
+
+
+def _run_size(size: int, args: argparse.Namespace) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as data_dir:
+        env = {
+            **os.environ,
+            "RAG_DATA_DIR": data_dir,
+            "EMBEDDINGS_PROVIDER": "local",
+            "LOCAL_EMBEDDINGS_DIM": str(args.dim),
+            "VECTOR_BACKEND": args.backend,
+            "USE_TIKTOKEN": "false",
+            "PROFILE_MODE": "off",
+        }
+        command = [
+            sys.executable, "-m", "benchmarks.retrieval_suite", "--worker",
+            "--size", str(size),
+            "--queries", str(args.queries),
+            "--top-k", str(args.top_k),
+            "--repeat", str(args.repeat),
+            "--fuse-repeat", str(args.fuse_repeat),
+            "--seed", str(args.seed),
+        ]
+        completed = subprocess.run(command, env=env, cwd=BASE_DIR, capture_output=True, text=True)
+        if completed.returncode != 0:
+            raise RuntimeError(f"Benchmark worker failed for size {size}:\n{completed.stderr[-4000:]}")
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> list[str]:
+    """One line per metric and size: baseline -> current with the relative change, flagged when worse."""
+    previous = {row["size"]: row for row in baseline.get("results", [])}
+    lines = []
+    for row in current.get("results", []):
+        old = previous.get(row["size"])
+        if old is None:
+            continue
+        for metric, value in row.items():
+            before = old.get(metric)
+            if metric == "size" or not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+                continue
+            change = (value - before) / before if before else 0.0
+            worse = change < -0.1 if metric in HIGHER_IS_BETTER else change > 0.1
+            flag = "  <-- regression" if worse else ""
+            lines.append(f"size={row['size']:>6} {metric:<24} {before:>14} -> {value:<14} ({change:+.1%}){flag}")
+    return lines
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 5000], help="Documents per corpus.")
+    parser.add_argument("--backend", default=os.getenv("VECTOR_BACKEND", "chroma"), choices=["chroma", "numpy"])
+    parser.add_argument("--dim", type=int, default=384, help="Local embedding dimension.")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3, help="BM25 builds per size.")
+    parser.add_argument("--fuse-repeat", type=int, default=50, help="_fuse calls per query.")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--output", help="JSON output (default: data/benchmarks/retrieval-<rev>-<time>.json).")
+    parser.add_argument("--compare", help="Previous JSON result to compare against.")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(_worker(args)))
+        return
+
+    revision = _git_revision()
+    results = []
+    for size in args.sizes:
+        print(f"Running size {size}...", file=sys.stderr)
+        results.append(_run_size(size, args))
+    report = {
+        "revision": revision,
+        "created_at": datetime.utcnow().isoformat() + "Z",
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.platform(),
+        "backend": args.backend,
+        "embeddings_dim": args.dim,
+        "queries": args.queries,
+        "top_k": args.top_k,
+        "results": results,
+    }
+
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    default_output = BASE_DIR / "data" / "benchmarks" / f"retrieval-{revision}-{stamp}.json"
+    output = Path(args.output) if args.output else default_output
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+    print(f"Saved to {output}", file=sys.stderr)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        print(f"\nCompared with {args.compare} (revision {baseline.get('revision')}):")
+        print("\n".join(compare(report, baseline)) or "No common corpus sizes.")
+
+
+if __name__ == "__main__":
+    main()
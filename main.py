@@ -3,6 +3,11 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+from rag.warmup import start_warmup  # noqa: E402 - after load_dotenv so rag.config sees .env
+
+# Open the indexes and clients in the background while the first page renders.
+start_warmup()
+
 st.set_page_config(
     page_title="Cabinet Emilia Parenti — RAG PoC",
     page_icon="📚",
@@ -4,9 +4,13 @@ from pathlib import Path
 
 import streamlit as st
 
-from rag.conversations import get_conversation_store
+from rag.config import CHAT_WINDOW_MESSAGES
+from rag.conversations import Message
 from rag.documents import list_documents
 from rag.pipeline import answer_question, sanitize_question
+from rag.resources import ResourceManager, get_resource_manager
+from rag.telemetry import Trace, stage, start_trace
+from rag.warmup import start_warmup
 
 logger = logging.getLogger(__name__)
 
@@ -39,10 +43,22 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-store = get_conversation_store()
+
+@st.cache_resource(show_spinner=False)
+def _resources() -> ResourceManager:
+    # Stores, vector store and retrievers are shared by every session of this server process.
+    return get_resource_manager()
+
+
+warmup = start_warmup()  # no-op after the first session of this process
+store = _resources().conversations
+archive = _resources().archive  # idle conversations are archived by the warm-up thread
 if "conversation_id" not in st.session_state:
     default_conv = store.ensure_default_conversation()
     st.session_state["conversation_id"] = default_conv.conversation_id
+elif archive.is_archived(st.session_state["conversation_id"]):
+    # Archived since this session opened it (e.g. by another process): bring it back on open.
+    archive.restore(st.session_state["conversation_id"])
 
 
 def _render_sources(sources: list[dict], doc_names: dict[str, str]) -> None:
@@ -97,6 +113,46 @@ def _select_cited_sources(answer: str, sources: list[dict]) -> list[dict]:
     return selected
 
 
+def _retryable_errors() -> tuple[type[BaseException], ...]:
+    # Imported when QA fails rather than with the page: rag.clients loads the OpenAI SDK,
+    # which answer_question has already pulled in by then.
+    from rag.clients import RETRYABLE_ERRORS
+    from rag.retrieval_service import RetrievalServiceError
+
+    return (*RETRYABLE_ERRORS, RetrievalServiceError)
+
+
+def _message_window(conversation_id: str) -> dict:
+    """
+    Messages shown for the active conversation, cached in the session across reruns.
+
+    The first render loads the latest `CHAT_WINDOW_MESSAGES`; later reruns only fetch messages
+    newer than the last one shown, and "load older" pages backwards on demand.
+    """
+    window = st.session_state.get("message_window")
+    if not window or window["conversation_id"] != conversation_id:
+        messages = store.list_messages(conversation_id, limit=CHAT_WINDOW_MESSAGES)
+        window = {"conversation_id": conversation_id, "messages": messages}
+    elif window["messages"]:
+        window["messages"] += store.list_messages(conversation_id, after=window["messages"][-1].message_id)
+    else:
+        window["messages"] = store.list_messages(conversation_id, limit=CHAT_WINDOW_MESSAGES)
+    messages: list[Message] = window["messages"]
+    window["has_older"] = bool(messages) and store.has_messages_before(
+        conversation_id, messages[0].message_id
+    )
+    st.session_state["message_window"] = window
+    return window
+
+
+def _load_older(window: dict) -> None:
+    messages: list[Message] = window["messages"]
+    older = store.list_messages(
+        window["conversation_id"], before=messages[0].message_id, limit=CHAT_WINDOW_MESSAGES
+    )
+    window["messages"] = older + messages
+
+
 # Sidebar: ChatGPT-style conversation list + new chat
 with st.sidebar:
     st.subheader("Conversations")
@@ -105,6 +161,19 @@ with st.sidebar:
         st.session_state["conversation_id"] = new_conv.conversation_id
         st.rerun()
 
+    search_query = st.text_input("🔎 Rechercher dans l’historique", placeholder="pénalités, Durand…")
+    if search_query.strip():
+        hits = store.search_messages(search_query, limit=10)
+        if not hits:
+            st.caption("Aucun message trouvé.")
+        for hit in hits:
+            role_label = "Vous" if hit.role == "user" else "Assistant"
+            st.markdown(f"**{hit.conversation_title}** · {role_label}  \n{hit.snippet}")
+            if st.button("Ouvrir", key=f"search_hit_{hit.message_id}"):
+                st.session_state["conversation_id"] = hit.conversation_id
+                st.rerun()
+        st.divider()
+
     conversations = store.list_conversations()
     if not conversations:
         default_conv = store.ensure_default_conversation()
@@ -135,6 +204,27 @@ with st.sidebar:
         st.session_state["conversation_id"] = next_conv.conversation_id
         st.rerun()
 
+    archived_count = archive.count_archived()
+    if archived_count:
+        with st.expander(f"🗄️ Archives ({archived_count})"):
+            for conv in archive.list_archived(limit=20):
+                if st.button(
+                    f"{conv.title} · {conv.updated_at.split('T')[0]}",
+                    key=f"archived_{conv.conversation_id}",
+                    use_container_width=True,
+                ):
+                    archive.restore(conv.conversation_id)
+                    st.session_state["conversation_id"] = conv.conversation_id
+                    st.rerun()
+
+    warmup_status = warmup.status()
+    if warmup_status.started and not warmup_status.ready:
+        st.progress(warmup_status.progress, text="⏳ Préchargement des index et du modèle…")
+    elif warmup_status.ready:
+        failed = [step.name for step in warmup_status.steps if step.state == "failed"]
+        label = f"⚠️ Préchargement incomplet ({', '.join(failed)})" if failed else "✅ Prêt"
+        st.caption(f"{label} · {warmup_status.total_ms / 1000:.1f} s")
+
 conversation_id = st.session_state["conversation_id"]
 
 # Conversation header
@@ -149,43 +239,53 @@ no_docs = len(documents) == 0
 if no_docs:
     st.warning("Aucun document indexé. Ajoutez-en via l’onglet Documents.")
 
-# Render history
-messages = store.list_messages(conversation_id)
+# Render history (latest window only)
+window = _message_window(conversation_id)
+messages = window["messages"]
+if window["has_older"]:
+    st.button("⬆️ Charger les messages précédents", on_click=_load_older, args=(window,))
 for message in messages:
     with st.chat_message(message.role):
         st.markdown(message.content)
         if message.role == "assistant":
             _render_sources(message.sources or [], doc_names_map)
 
-history_payload = [{"role": m.role, "content": m.content} for m in messages]
+# Only the latest window feeds the prompt, however many older pages were loaded.
+history_payload = [{"role": m.role, "content": m.content} for m in messages[-CHAT_WINDOW_MESSAGES:]]
 question = st.chat_input("Posez une question", disabled=no_docs)
 
 if question:
-    sanitized_question, refusal_reason = sanitize_question(
-        question, raise_on_refusal=False
-    )
+    trace = Trace()
+    with start_trace(trace), stage("sanitize"):
+        sanitized_question, refusal_reason = sanitize_question(
+            question, raise_on_refusal=False
+        )
     if refusal_reason or not sanitized_question:
         logger.warning("User input refused", extra={"reason": refusal_reason})
         with st.chat_message("assistant"):
             st.warning(refusal_reason or "La requête est invalide. Aucun message enregistré.")
         st.stop()
 
-    user_msg = store.add_message(
-        conversation_id, role="user", content=sanitized_question, sources=[]
-    )
+    history_summary = store.get_summary(conversation_id)
     st.chat_message("user").markdown(sanitized_question)
 
     with st.chat_message("assistant"):
         with st.spinner("Recherche des passages..."):
             try:
-                answer, sources = answer_question(
-                    sanitized_question,
-                    history=history_payload,
-                )
+                with start_trace(trace):
+                    answer, sources = answer_question(
+                        sanitized_question,
+                        history=history_payload,
+                        history_summary=history_summary,
+                    )
             except ValueError as err:
                 logger.warning("Handled ValueError during QA", exc_info=True)
                 st.error(str(err))
                 st.stop()
+            except (TimeoutError, *_retryable_errors()):
+                logger.warning("OpenAI or the retrieval service unavailable after retries", exc_info=True)
+                st.warning("Le service est momentanément saturé. Réessayez dans quelques instants.")
+                st.stop()
             except Exception as err:
                 logger.exception("Unexpected error during QA")
                 st.error("Une erreur est survenue lors de la génération de la réponse.")
@@ -196,7 +296,6 @@ if question:
         cited = _select_cited_sources(answer, sources)
         _render_sources(cited, doc_names_map)
 
-    assistant_msg = store.add_message(
-        conversation_id, role="assistant", content=answer, sources=cited
-    )
+    # Question, answer and stage timings are committed together once the answer exists.
+    store.add_exchange(conversation_id, sanitized_question, answer, sources=cited, trace=trace)
     st.rerun()
@@ -1,9 +1,14 @@
 import logging
-from pathlib import Path
 import streamlit as st
 
-from rag.config import DOC_PREVIEW_CHARS
-from rag.documents import delete_document, ingest_upload, list_documents, reset_document_store
+from rag.config import DOCUMENTS_PAGE_SIZE
+from rag.documents import (
+    count_documents,
+    delete_document,
+    ingest_upload,
+    list_documents,
+    reset_document_store,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -50,7 +55,19 @@ if st.button("Indexer", use_container_width=True, disabled=not uploaded):
 st.divider()
 st.subheader("Documents enregistrés")
 
-documents = list_documents()
+
+def _size_label(size_bytes: int | None) -> str:
+    if size_bytes is None:
+        return "taille inconnue"
+    return f"{size_bytes/1024:.1f} Ko" if size_bytes < 1024 * 1024 else f"{size_bytes/1024/1024:.2f} Mo"
+
+
+# Rendering reads registry rows only (stats and preview are stored at ingestion), one page at a time.
+total_documents = count_documents()
+page_count = max(1, -(-total_documents // DOCUMENTS_PAGE_SIZE))
+page = min(st.session_state.get("documents_page", 0), page_count - 1)
+st.session_state["documents_page"] = page
+documents = list_documents(limit=DOCUMENTS_PAGE_SIZE, offset=page * DOCUMENTS_PAGE_SIZE)
 if not documents:
     st.info("Aucun document pour le moment.")
 else:
@@ -67,25 +84,15 @@ else:
         col_left, col_right = st.columns([4, 1])
         with col_left:
             st.write(f"**{doc.original_name}**")
-            chunk_count = len(doc.chunk_ids or [])
-            stored_path = Path(doc.stored_path)
-            size_label = "inconnu"
-            if stored_path.exists():
-                size_bytes = stored_path.stat().st_size
-                size_label = f"{size_bytes/1024:.1f} Ko" if size_bytes < 1024 * 1024 else f"{size_bytes/1024/1024:.2f} Mo"
-            st.caption(f"{chunk_count} chunks · {size_label} · .{doc.ext}")
+            details = [f"{doc.chunk_count} chunks"]
+            if doc.token_count is not None:
+                details.append(f"{doc.token_count} tokens")
+            details += [_size_label(doc.size_bytes), f".{doc.ext}"]
+            if doc.ingested_at:
+                details.append(f"indexé le {doc.ingested_at[:10]}")
+            st.caption(" · ".join(details))
             with st.expander("Aperçu"):
-                if stored_path.exists():
-                    try:
-                        preview_text = stored_path.read_text(encoding="utf-8", errors="ignore").strip()
-                        if len(preview_text) > DOC_PREVIEW_CHARS:
-                            preview_text = preview_text[:DOC_PREVIEW_CHARS] + "..."
-                        st.text(preview_text or "(fichier vide)")
-                    except Exception as exc:
-                        logger.exception("Failed to read preview", extra={"path": str(stored_path)})
-                        st.error(f"Impossible de lire l'aperçu : {exc}")
-                else:
-                    st.warning("Fichier introuvable sur le disque.")
+                st.text(doc.preview or "(aperçu indisponible)")
         with col_right:
             if st.button("Supprimer", key=f"delete_{doc.doc_id}"):
                 try:
@@ -97,3 +104,16 @@ else:
                 except Exception as exc:
                     logger.exception("Failed to delete document", extra={"doc_id": doc.doc_id})
                     st.error(f"Impossible de supprimer ce document: {exc}")
+
+    if page_count > 1:
+        col_prev, col_info, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button("⬅️ Précédents", disabled=page == 0, use_container_width=True):
+                st.session_state["documents_page"] = page - 1
+                st.rerun()
+        with col_info:
+            st.caption(f"Page {page + 1} / {page_count} · {total_documents} documents")
+        with col_next:
+            if st.button("Suivants ➡️", disabled=page >= page_count - 1, use_container_width=True):
+                st.session_state["documents_page"] = page + 1
+                st.rerun()
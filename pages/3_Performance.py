@@ -0,0 +1,64 @@
+import pandas as pd
+import streamlit as st
+
+from rag.resources import ResourceManager, get_resource_manager
+from rag.warmup import get_warmup
+
+st.title("⏱️ Performance")
+st.info("Latence par étape du pipeline RAG (p50 / p95), calculée à partir des réponses enregistrées.")
+
+# Hide the default home page entry from the sidebar navigation.
+st.markdown(
+    """
+    <style>
+    section[data-testid="stSidebar"] ul li:first-child {display: none;}
+    </style>
+    """,
+    unsafe_allow_html=True,
+)
+
+
+
+@st.cache_resource(show_spinner=False)
+def _resources() -> ResourceManager:
+    return get_resource_manager()
+
+
+warmup_status = get_warmup().status()
+if warmup_status.started:
+    with st.expander(
+        f"Préchargement au démarrage · {'terminé' if warmup_status.ready else 'en cours'}"
+        + (f" en {warmup_status.total_ms:.0f} ms" if warmup_status.ready else "")
+    ):
+        st.dataframe(
+            pd.DataFrame([vars(step) for step in warmup_status.steps]),
+            use_container_width=True,
+            hide_index=True,
+        )
+
+with st.expander("Ressources partagées"):
+    st.dataframe(
+        pd.DataFrame([vars(check) for check in _resources().health()]),
+        use_container_width=True,
+        hide_index=True,
+    )
+
+days = st.slider("Période (jours)", min_value=1, max_value=90, value=7)
+telemetry = _resources().telemetry
+rows = telemetry.stage_percentiles(days=days)
+if not rows:
+    st.caption("Aucune mesure enregistrée sur la période.")
+    st.stop()
+
+frame = pd.DataFrame(rows)
+
+st.subheader("Par étape")
+overall = pd.DataFrame(telemetry.stage_percentiles(days=days, by_day=False)).drop(columns="day")
+st.dataframe(overall.sort_values("p95_ms", ascending=False), use_container_width=True, hide_index=True)
+
+metric = st.radio("Percentile", options=["p95_ms", "p50_ms"], horizontal=True)
+st.subheader("Évolution quotidienne")
+st.line_chart(frame.pivot(index="day", columns="stage", values=metric))
+
+st.subheader("Détail")
+st.dataframe(frame, use_container_width=True, hide_index=True)
@@ -0,0 +1,310 @@
+"""
+Move idle conversations out of the hot conversations database.
+
+    python -m rag.archive archive --older-than-days 90
+    python -m rag.archive list
+    python -m rag.archive restore <conversation_id>
+    python -m rag.archive vacuum
+
+Conversations not updated for `ARCHIVE_AFTER_DAYS` days are appended, with their
+messages and sources, to gzip-compressed JSON Lines files under `data/archive`
+(one file per month of last activity), then deleted from the hot tables and the
+freed pages returned with an incremental VACUUM. The `archived_conversations`
+table keeps their title, dates and archive file so the Chat sidebar can list them
+and restore one when it is opened.
+"""
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import ContextManager
+
+from rag.config import ARCHIVE_AFTER_DAYS, ARCHIVE_DIR
+from rag.conversations import Conversation, ConversationStore, get_conversation_store
+from rag.db import get_pool
+from rag.migrations import Migration, migrate
+
+logger = logging.getLogger(__name__)
+
+# Conversations moved per transaction, so archiving never holds the write lock for long.
+ARCHIVE_BATCH_SIZE = 200
+
+
+def _create_index(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archived_conversations (
+            conversation_id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL,
+            message_count INTEGER NOT NULL,
+            archive_file TEXT NOT NULL,
+            archived_at TEXT NOT NULL
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_archived_updated_at ON archived_conversations(updated_at);")
+
+
+ARCHIVE_MIGRATIONS = [Migration(1, "archived conversations index", _create_index)]
+
+
+class ConversationArchive:
+    def __init__(self, store: ConversationStore, directory: Path = ARCHIVE_DIR) -> None:
+        self.store = store
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._write_lock = threading.Lock()
+        self._init_db()
+
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        return get_pool(self.store.path).connection()
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            migrate(conn, "archive", ARCHIVE_MIGRATIONS)
+            conn.commit()
+
+    def _archive_path(self, updated_at: str) -> Path:
+        return self.directory / f"conversations-{updated_at[:7]}.jsonl.gz"
+
+    def archive_idle(self, older_than_days: int = ARCHIVE_AFTER_DAYS) -> int:
+        """Archive conversations idle for more than `older_than_days` days; returns how many moved."""
+        cutoff = (datetime.utcnow() - timedelta(days=older_than_days)).isoformat() + "Z"
+        moved = 0
+        with self._write_lock:
+            while True:
+                batch = self._archive_batch(cutoff)
+                moved += batch
+                if batch < ARCHIVE_BATCH_SIZE:
+                    break
+        if moved:
+            self.compact()
+            logger.info("Archived %d conversations idle since before %s.", moved, cutoff)
+        return moved
+
+    def _archive_batch(self, cutoff: str) -> int:
+        with self._connect() as conn:
+            conversations = conn.execute(
+                """
+                SELECT conversation_id, title, created_at, updated_at, summary
+                FROM conversations
+                WHERE updated_at < ?
+                ORDER BY updated_at ASC
+                LIMIT ?
+                """,
+                (cutoff, ARCHIVE_BATCH_SIZE),
+            ).fetchall()
+            if not conversations:
+                return 0
+            records: dict[Path, list[str]] = {}
+            index_rows = []
+            archived_at = datetime.utcnow().isoformat() + "Z"
+            for conversation_id, title, created_at, updated_at, summary in conversations:
+                messages = conn.execute(
+                    """
+                    SELECT message_id, role, content, created_at, sources
+                    FROM messages
+                    WHERE conversation_id = ?
+                    ORDER BY message_id ASC
+                    """,
+                    (conversation_id,),
+                ).fetchall()
+                record = {
+                    "conversation_id": conversation_id,
+                    "title": title,
+                    "created_at": created_at,
+                    "updated_at": updated_at,
+                    "summary": summary,
+                    "messages": [
+                        {
+                            "message_id": message_id,
+                            "role": role,
+                            "content": content,
+                            "created_at": msg_created_at,
+                            "sources": json.loads(sources) if sources else [],
+                        }
+                        for message_id, role, content, msg_created_at, sources in messages
+                    ],
+                }
+                path = self._archive_path(updated_at)
+                records.setdefault(path, []).append(json.dumps(record, ensure_ascii=False))
+                index_rows.append(
+                    (conversation_id, title, created_at, updated_at, len(messages), path.name, archived_at)
+                )
+            # Archive files are written and synced before the hot rows go away: a crash in between
+            # leaves a duplicate line, never a lost conversation.
+            for path, lines in records.items():
+                with gzip.open(path, "at", encoding="utf-8") as handle:
+                    handle.write("\n".join(lines) + "\n")
+                with open(path, "rb") as handle:
+                    os.fsync(handle.fileno())
+            ids = [(row[0],) for row in conversations]
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO archived_conversations (
+                    conversation_id, title, created_at, updated_at, message_count, archive_file, archived_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                index_rows,
+            )
+            conn.executemany("DELETE FROM messages WHERE conversation_id = ?", ids)
+            conn.executemany("DELETE FROM conversations WHERE conversation_id = ?", ids)
+        return len(conversations)
+
+    def compact(self, max_pages: int | None = None) -> None:
+        """Return free pages to the filesystem (needs auto_vacuum=INCREMENTAL, set by ConversationStore)."""
+        pragma = "PRAGMA incremental_vacuum;" if max_pages is None else f"PRAGMA incremental_vacuum({int(max_pages)});"
+        with self._connect() as conn:
+            # executescript steps the pragma to completion; execute() would free a single page.
+            conn.executescript(pragma)
+
+    def is_archived(self, conversation_id: str) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM archived_conversations WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+        return row is not None
+
+    def list_archived(self, limit: int = 50, offset: int = 0) -> list[Conversation]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT conversation_id, title, created_at, updated_at
+                FROM archived_conversations
+                ORDER BY updated_at DESC
+                LIMIT ? OFFSET ?
+                """,
+                (limit, offset),
+            ).fetchall()
+        return [Conversation(*row) for row in rows]
+
+    def count_archived(self) -> int:
+        with self._connect() as conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM archived_conversations;").fetchone()
+        return count or 0
+
+    def restore(self, conversation_id: str) -> Conversation | None:
+        """
+        Move an archived conversation back into the hot tables; None if it is not archived.
+        Reopening counts as activity, so `updated_at` is refreshed and it is not re-archived at once.
+        """
+        with self._write_lock:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT archive_file FROM archived_conversations WHERE conversation_id = ?",
+                    (conversation_id,),
+                ).fetchone()
+            if row is None:
+                return None
+            record = self._read_record(self.directory / row[0], conversation_id)
+            if record is None:
+                logger.error("Conversation %s is missing from archive %s.", conversation_id, row[0])
+                return None
+            updated_at = datetime.utcnow().isoformat() + "Z"
+            with self._connect() as conn:
+                conn.execute(
+                    """
+                    INSERT INTO conversations (conversation_id, title, created_at, updated_at, summary)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (
+                        record["conversation_id"],
+                        record["title"],
+                        record["created_at"],
+                        updated_at,
+                        record.get("summary") or "",
+                    ),
+                )
+                conn.executemany(
+                    """
+                    INSERT INTO messages (message_id, conversation_id, role, content, created_at, sources)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (
+                            msg["message_id"],
+                            conversation_id,
+                            msg["role"],
+                            msg["content"],
+                            msg["created_at"],
+                            json.dumps(msg.get("sources") or [], ensure_ascii=True),
+                        )
+                        for msg in record["messages"]
+                    ],
+                )
+                conn.execute(
+                    "DELETE FROM archived_conversations WHERE conversation_id = ?", (conversation_id,)
+                )
+        return Conversation(
+            conversation_id=record["conversation_id"],
+            title=record["title"],
+            created_at=record["created_at"],
+            updated_at=updated_at,
+        )
+
+    @staticmethod
+    def _read_record(path: Path, conversation_id: str) -> dict | None:
+        if not path.exists():
+            return None
+        found = None
+        needle = f'"conversation_id": "{conversation_id}"'
+        with gzip.open(path, "rt", encoding="utf-8") as handle:
+            for line in handle:
+                # Cheap substring test before parsing; the last copy wins if a conversation
+                # was archived, restored and archived again in the same month.
+                if needle in line:
+                    record = json.loads(line)
+                    if record.get("conversation_id") == conversation_id:
+                        found = record
+        return found
+
+
+def get_conversation_archive() -> ConversationArchive:
+    """Shared archive; idle conversations are moved by the warm-up `archive` step or the CLI."""
+    from rag.resources import get_resource_manager
+
+    return get_resource_manager().archive
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive_cmd = commands.add_parser("archive", help="Archive idle conversations now.")
+    archive_cmd.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    list_cmd = commands.add_parser("list", help="List archived conversations, most recent first.")
+    list_cmd.add_argument("--limit", type=int, default=50)
+    restore_cmd = commands.add_parser("restore", help="Move an archived conversation back.")
+    restore_cmd.add_argument("conversation_id")
+    commands.add_parser(
+        "vacuum", help="Enable incremental vacuum on an existing database (one full VACUUM), then compact."
+    )
+    args = parser.parse_args(argv)
+
+    archive = ConversationArchive(get_conversation_store())
+    if args.command == "archive":
+        moved = archive.archive_idle(args.older_than_days)
+        print(f"{moved} conversation(s) archived under {archive.directory}")
+    elif args.command == "list":
+        for conv in archive.list_archived(limit=args.limit):
+            print(f"{conv.conversation_id}  {conv.updated_at[:10]}  {conv.title}")
+    elif args.command == "vacuum":
+        changed = archive.store.enable_incremental_vacuum()
+        archive.compact()
+        print("Incremental vacuum enabled." if changed else "Incremental vacuum already enabled; compacted.")
+    elif archive.restore(args.conversation_id) is None:
+        raise SystemExit(f"Conversation {args.conversation_id} is not archived.")
+    else:
+        print(f"Conversation {args.conversation_id} restored.")
+
+
+if __name__ == "__main__":
+    main()
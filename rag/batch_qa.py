@@ -0,0 +1,210 @@
+"""
+Headless batch QA over a JSONL file of questions.
+
+    python -m rag.batch_qa questions.jsonl -o answers.jsonl --concurrency 8
+    python -m rag.batch_qa questions.jsonl -o answers.jsonl --resume
+
+Each input line is an object with a `question` and optional `id`, `history`
+(list of {"role", "content"}), `filters` (metadata equality, e.g. {"doc_id": "..."})
+and `top_k`. Lines without an id get their 1-based line number; an id already
+used by an earlier line is reported as an error rather than answered twice.
+Results are appended to the output as soon as they complete, one JSON object per
+question, with the answer, sources, per-stage timings and token counts. With
+`--resume`, ids that already have a successful result in the output are skipped
+and a partial last line left by an interrupted run is dropped first.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterator, TextIO
+
+from rag.config import DEFAULT_TOP_K, LLM_MAX_CONCURRENCY
+from rag.pipeline import answer_question, sanitize_question
+from rag.telemetry import stage, start_trace
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchItem:
+    item_id: str
+    question: str
+    history: list[dict[str, Any]] = field(default_factory=list)
+    filters: dict[str, Any] | None = None
+    top_k: int = DEFAULT_TOP_K
+
+
+def read_items(path: Path) -> Iterator[BatchItem | dict[str, Any]]:
+    """Yield parsed items; malformed lines and duplicate ids are yielded as ready-made error results."""
+    seen: set[str] = set()
+    with path.open(encoding="utf-8") as handle:
+        for line_no, line in enumerate(handle, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                raw = json.loads(line)
+                item = BatchItem(
+                    item_id=str(raw.get("id") or line_no),
+                    question=str(raw.get("question") or ""),
+                    history=list(raw.get("history") or []),
+                    filters=raw.get("filters") or None,
+                    top_k=int(raw.get("top_k") or DEFAULT_TOP_K),
+                )
+            except (ValueError, TypeError, AttributeError) as err:
+                yield {"id": str(line_no), "error": f"invalid input line: {err}"}
+                continue
+            # Implicit ids are line numbers and may collide with explicit ones: answering both
+            # under one id would make --resume skip whichever was not answered.
+            if item.item_id in seen:
+                yield {"id": item.item_id, "line": line_no, "error": "duplicate id used by an earlier line"}
+                continue
+            seen.add(item.item_id)
+            yield item
+
+
+def completed_ids(path: Path) -> set[str]:
+    """Ids with a successful result in an existing output file."""
+    done: set[str] = set()
+    if not path.exists():
+        return done
+    with path.open(encoding="utf-8") as handle:
+        for line in handle:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                continue  # partial last line from an interrupted run
+            if result.get("id") is not None and not result.get("error"):
+                done.add(str(result["id"]))
+    return done
+
+
+def drop_partial_line(path: Path) -> int:
+    """Cut `path` after its last newline, so appended results start on a fresh line; returns bytes cut."""
+    if not path.exists():
+        return 0
+    with path.open("rb+") as handle:
+        size = end = handle.seek(0, 2)
+        while end > 0:
+            start = max(end - 65536, 0)
+            handle.seek(start)
+            newline = handle.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            handle.truncate(end)
+    return size - end
+
+
+def run_item(item: BatchItem) -> dict[str, Any]:
+    started = time.perf_counter()
+    result: dict[str, Any] = {"id": item.item_id, "question": item.question}
+    with start_trace() as trace:
+        try:
+            with stage("sanitize"):
+                cleaned, refusal = sanitize_question(item.question, raise_on_refusal=False)
+            if refusal or not cleaned:
+                result["error"] = f"refused: {refusal or 'invalid question'}"
+            else:
+                answer, sources = answer_question(
+                    cleaned, top_k=item.top_k, history=item.history, filters=item.filters
+                )
+                result.update({"answer": answer, "sources": sources, "error": None})
+        except Exception as err:
+            logger.exception("Batch question %s failed", item.item_id)
+            result["error"] = f"{type(err).__name__}: {err}"
+    result.update(
+        {
+            "trace_id": trace.trace_id,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "timings_ms": trace.timings(),
+            "prompt_tokens": sum(record.prompt_tokens for record in trace.stages),
+            "completion_tokens": sum(record.completion_tokens for record in trace.stages),
+        }
+    )
+    return result
+
+
+def _write(out: TextIO, result: dict[str, Any]) -> None:
+    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    out.flush()
+
+
+def run_batch(
+    input_path: Path,
+    output_path: Path,
+    *,
+    concurrency: int = LLM_MAX_CONCURRENCY,
+    resume: bool = False,
+    progress_every: int = 50,
+) -> dict[str, Any]:
+    """Answer every question of `input_path`, streaming results to `output_path`; returns a summary."""
+    if resume:
+        dropped = drop_partial_line(output_path)
+        if dropped:
+            logger.warning("Dropped a partial last line (%d bytes) from %s", dropped, output_path)
+    skip = completed_ids(output_path) if resume else set()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    concurrency = max(concurrency, 1)
+    counts = {"done": 0, "errors": 0, "skipped": 0}
+    started = time.perf_counter()
+
+    def record(result: dict[str, Any]) -> None:
+        _write(out, result)
+        counts["done"] += 1
+        counts["errors"] += bool(result.get("error"))
+        if progress_every and counts["done"] % progress_every == 0:
+            rate = counts["done"] / max(time.perf_counter() - started, 1e-9) * 3600
+            logger.info("%d answered (%d errors), %.0f questions/hour", counts["done"], counts["errors"], rate)
+
+    with output_path.open("a" if resume else "w", encoding="utf-8") as out, ThreadPoolExecutor(
+        max_workers=concurrency, thread_name_prefix="batch-qa"
+    ) as pool:
+        pending: set[Future] = set()
+        for item in read_items(input_path):
+            if isinstance(item, dict):
+                record(item)
+                continue
+            if item.item_id in skip:
+                counts["skipped"] += 1
+                continue
+            # Bounded in-flight window keeps memory flat on very large input files.
+            if len(pending) >= concurrency * 2:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    record(future.result())
+            pending.add(pool.submit(run_item, item))
+        for future in wait(pending).done:
+            record(future.result())
+
+    elapsed = time.perf_counter() - started
+    return {
+        **counts,
+        "seconds": round(elapsed, 1),
+        "questions_per_hour": round(counts["done"] / elapsed * 3600) if elapsed else 0,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", type=Path, help="JSONL file of questions.")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="JSONL file receiving the results.")
+    parser.add_argument("--concurrency", type=int, default=LLM_MAX_CONCURRENCY)
+    parser.add_argument("--resume", action="store_true", help="Skip ids already answered in the output.")
+    args = parser.parse_args(argv)
+
+    summary = run_batch(args.input, args.output, concurrency=args.concurrency, resume=args.resume)
+    print(json.dumps(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,15 @@
 from __future__ import annotations
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import logging
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+# Structural markers of French legal texts, shared with the query router in rag.pipeline.hybrid_retriever.
+ARTICLE_PATTERN = r"Article\s+(?:L\.)?\d+(?:[._-]\d+)?"
+ROMAN_OR_NUMBER_PATTERN = r"(?:I{1,3}|IV|V|VI|VII|VIII|IX|\d+)"
+SECTION_PATTERN = rf"(?:Titre|Chapitre|SECTION|Section)\s+{ROMAN_OR_NUMBER_PATTERN}"
+PARAGRAPH_PATTERN = r"§\s*\d+"
 
 
 def chunk_text(
@@ -16,17 +25,20 @@ def chunk_text(
     
     # Define legal separators for French legal documents to preserve structure during chunking
     legal_separators = [
-        r"\n(?=Article\s+(?:L\.)?\d+(?:[._-]\d+)?)",
-        r"\n(?=Titre\s+(?:I{1,3}|IV|V|VI|VII|VIII|IX|\d+))",
-        r"\n(?=Chapitre\s+(?:I{1,3}|IV|V|VI|VII|VIII|IX|\d+))",
-        r"\n(?=(?:SECTION|Section)\s+(?:I{1,3}|IV|V|VI|VII|VIII|IX|\d+))",
-        r"\n(?=§\s*\d+)",
+        rf"\n(?={ARTICLE_PATTERN})",
+        rf"\n(?=Titre\s+{ROMAN_OR_NUMBER_PATTERN})",
+        rf"\n(?=Chapitre\s+{ROMAN_OR_NUMBER_PATTERN})",
+        rf"\n(?=(?:SECTION|Section)\s+{ROMAN_OR_NUMBER_PATTERN})",
+        rf"\n(?={PARAGRAPH_PATTERN})",
         "\n\n",
         "\n",
         " ",
         "",
     ]
 
+    # Deferred: langchain_text_splitters is only needed at ingestion, not to import this module.
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
     if use_tiktoken:
         splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
             encoding_name="cl100k_base",
@@ -45,3 +57,50 @@ def chunk_text(
             keep_separator="start",
         )
     return splitter.split_text(text)
+
+
+@lru_cache(maxsize=1)
+def _token_encoding():
+    # Cached, including a failure: offline hosts lack the encoding files and should not retry per chunk.
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        logger.warning("tiktoken encoding unavailable; estimating token counts.", exc_info=True)
+        return None
+
+
+def count_tokens(text: str, *, use_tiktoken: bool = True) -> int:
+    """cl100k_base token count, or a ~4 characters per token estimate when tiktoken is unusable."""
+    encoding = _token_encoding() if use_tiktoken else None
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def chunk_byte_spans(text: str, chunks: list[str]) -> list[tuple[int, int] | None]:
+    """
+    UTF-8 byte offsets (start, end) of each chunk in `text`. Chunks are located in order: each one
+    starts after the previous start and ends after the previous end, so overlapping or repeated
+    passages resolve to successive positions. None for a chunk that is not a substring of `text`.
+    """
+    spans: list[tuple[int, int] | None] = []
+    prev_start, prev_end = -1, 0
+    byte_pos, char_pos = 0, 0  # running UTF-8 offset of `char_pos`, to avoid re-encoding prefixes
+    for chunk in chunks:
+        start = text.find(chunk, max(prev_start + 1, prev_end - len(chunk) + 1))
+        if start < 0:
+            spans.append(None)
+            continue
+        byte_pos += len(text[char_pos:start].encode("utf-8"))
+        char_pos = start
+        spans.append((byte_pos, byte_pos + len(chunk.encode("utf-8"))))
+        prev_start, prev_end = start, start + len(chunk)
+    return spans
+
+
+def preview_text(text: str, max_chars: int) -> str:
+    """First `max_chars` characters of `text`, stripped, with "..." when truncated."""
+    text = text.strip()
+    return text[:max_chars] + "..." if len(text) > max_chars else text
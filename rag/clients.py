@@ -0,0 +1,345 @@
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Iterator, TypeVar
+
+import httpx
+import openai
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from rag.config import (
+    EMBEDDINGS_CHECK_CTX_LENGTH,
+    EMBEDDINGS_MODEL_NAME,
+    EMBEDDINGS_REQUESTS_PER_MINUTE,
+    EMBEDDINGS_TOKENS_PER_MINUTE,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_MODEL_NAME,
+    LLM_REQUESTS_PER_MINUTE,
+    LLM_RETRY_BASE_DELAY,
+    LLM_RETRY_MAX_DELAY,
+    LLM_TIMEOUT_SECONDS,
+    LLM_TOKENS_PER_MINUTE,
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Errors worth retrying: throttling, transient network failures and 5xx responses.
+RETRYABLE_ERRORS: tuple[type[BaseException], ...] = (
+    openai.RateLimitError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    httpx.TimeoutException,
+    httpx.TransportError,
+)
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        *,
+        capacity: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0, *, deadline: float | None = None) -> None:
+        """Block until `amount` tokens are available; raise TimeoutError past `deadline`."""
+        if self.rate <= 0:
+            return
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                wait = (amount - self._tokens) / self.rate
+            if deadline is not None and self._clock() + wait > deadline:
+                raise TimeoutError("Rate limit budget exhausted before the call deadline.")
+            self._sleep(wait)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit: grows by one slot per `limit` successes and halves on throttling,
+    so the number of in-flight calls tracks what the provider currently accepts.
+    """
+
+    def __init__(
+        self, max_limit: int, *, min_limit: int = 1, clock: Callable[[], float] = time.monotonic
+    ) -> None:
+        self.max_limit = max(max_limit, 1)
+        self.min_limit = max(min(min_limit, self.max_limit), 1)
+        self.limit = float(self.max_limit)
+        self.in_flight = 0
+        self._clock = clock
+        self._cond = threading.Condition()
+
+    def acquire(self, *, deadline: float | None = None) -> None:
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                timeout = None if deadline is None else deadline - self._clock()
+                if timeout is not None and timeout <= 0:
+                    raise TimeoutError("No concurrency slot available before the call deadline.")
+                self._cond.wait(timeout)
+            self.in_flight += 1
+
+    def release(self, *, throttled: bool = False) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(float(self.min_limit), self.limit / 2)
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+@dataclass
+class PoolSettings:
+    requests_per_minute: float
+    tokens_per_minute: float
+    max_concurrency: int = LLM_MAX_CONCURRENCY
+    max_retries: int = LLM_MAX_RETRIES
+    base_delay: float = LLM_RETRY_BASE_DELAY
+    max_delay: float = LLM_RETRY_MAX_DELAY
+    timeout: float = LLM_TIMEOUT_SECONDS
+
+
+class ClientPool:
+    """
+    Admission control for one OpenAI endpoint family, shared by every session of the process:
+    request and token buckets, adaptive concurrency, jittered exponential backoff and a deadline.
+    """
+
+    def __init__(
+        self,
+        settings: PoolSettings,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.settings = settings
+        self._clock = clock
+        self._sleep = sleep
+        self.requests = TokenBucket(settings.requests_per_minute, clock=clock, sleep=sleep)
+        self.tokens = TokenBucket(settings.tokens_per_minute, clock=clock, sleep=sleep)
+        self.concurrency = AdaptiveConcurrencyLimiter(settings.max_concurrency, clock=clock)
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        retry_after = None
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                retry_after = float(response.headers.get("retry-after"))
+            except (TypeError, ValueError):
+                retry_after = None
+        if retry_after is not None:
+            return min(retry_after, self.settings.max_delay)
+        # Full jitter keeps simultaneous sessions from retrying in lockstep.
+        return random.uniform(0, min(self.settings.max_delay, self.settings.base_delay * 2**attempt))
+
+    def _deadline(self, timeout: float | None) -> float:
+        return self._clock() + (timeout if timeout is not None else self.settings.timeout)
+
+    def _attempt_timeout(self, deadline: float) -> float:
+        """Request timeout for one attempt: what is left of the deadline, capped at the pool's timeout."""
+        return max(min(deadline - self._clock(), self.settings.timeout), 0.0)
+
+    @contextmanager
+    def _admitted(self, tokens: float, deadline: float) -> Iterator[None]:
+        """Hold a request, the token budget and a concurrency slot for the duration of the block."""
+        self.requests.acquire(1, deadline=deadline)
+        if tokens:
+            self.tokens.acquire(tokens, deadline=deadline)
+        self.concurrency.acquire(deadline=deadline)
+        throttled = False
+        try:
+            yield
+        except openai.RateLimitError:
+            throttled = True
+            raise
+        finally:
+            self.concurrency.release(throttled=throttled)
+
+    def call(self, fn: Callable[[float], T], *, tokens: float = 0.0, timeout: float | None = None) -> T:
+        """
+        Run `fn(request_timeout)` with retries until `timeout` (the pool's by default) elapses.
+        Each attempt gets the time left before that deadline, so a late retry cannot overrun it.
+        """
+        deadline = self._deadline(timeout)
+        attempt = 0
+        while True:
+            try:
+                with self._admitted(tokens, deadline):
+                    return fn(self._attempt_timeout(deadline))
+            except RETRYABLE_ERRORS as err:
+                if attempt >= self.settings.max_retries:
+                    raise
+                delay = self._backoff(attempt, err)
+                if self._clock() + delay > deadline:
+                    raise
+                logger.warning(
+                    "OpenAI call failed (%s); retry %d/%d in %.2fs",
+                    type(err).__name__,
+                    attempt + 1,
+                    self.settings.max_retries,
+                    delay,
+                )
+            self._sleep(delay)
+            attempt += 1
+
+    def stream(
+        self, fn: Callable[[float], Iterator[T]], *, tokens: float = 0.0, timeout: float | None = None
+    ) -> Iterator[T]:
+        """Admission for a streamed call: the slot is held until the stream ends; no retries once started."""
+        deadline = self._deadline(timeout)
+        with self._admitted(tokens, deadline):
+            yield from fn(self._attempt_timeout(deadline))
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting against tokens/min limits.
+    return max(len(text) // 4, 1)
+
+
+@lru_cache(maxsize=1)
+def get_http_client() -> httpx.Client:
+    """Keep-alive HTTP client shared by the chat and embeddings clients."""
+    return httpx.Client(
+        limits=httpx.Limits(max_connections=64, max_keepalive_connections=32, keepalive_expiry=60),
+        timeout=httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=10.0),
+    )
+
+
+@lru_cache(maxsize=None)
+def get_client_pool(name: str) -> ClientPool:
+    if name == "chat":
+        return ClientPool(PoolSettings(LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE))
+    if name == "embeddings":
+        return ClientPool(PoolSettings(EMBEDDINGS_REQUESTS_PER_MINUTE, EMBEDDINGS_TOKENS_PER_MINUTE))
+    raise ValueError(f"Unknown client pool: {name}")
+
+
+class PooledChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI whose generations go through the shared "chat" pool, each request carrying the
+    time left before the pool deadline as its timeout. Streaming holds its slot until the stream
+    ends; async calls run the pooled sync methods in the default executor.
+    """
+
+    def _token_budget(self, messages: list[Any]) -> int:
+        prompt_tokens = sum(estimate_tokens(str(message.content)) for message in messages)
+        return prompt_tokens + (self.max_tokens or 512)
+
+    def _generate(self, messages: list[Any], stop: list[str] | None = None, run_manager=None, **kwargs: Any):
+        if self.streaming:
+            # ChatOpenAI collects `_stream`, which is pooled below: admitting here too would take two slots.
+            return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        return get_client_pool("chat").call(
+            lambda timeout: super(PooledChatOpenAI, self)._generate(
+                messages, stop=stop, run_manager=run_manager, timeout=timeout, **kwargs
+            ),
+            tokens=self._token_budget(messages),
+        )
+
+    def _stream(self, messages: list[Any], stop: list[str] | None = None, run_manager=None, **kwargs: Any):
+        yield from get_client_pool("chat").stream(
+            lambda timeout: super(PooledChatOpenAI, self)._stream(
+                messages, stop=stop, run_manager=run_manager, timeout=timeout, **kwargs
+            ),
+            tokens=self._token_budget(messages),
+        )
+
+    async def _agenerate(
+        self, messages: list[Any], stop: list[str] | None = None, run_manager=None, **kwargs: Any
+    ):
+        # ChatOpenAI's native async client would bypass the pool; use the executor fallback instead.
+        return await BaseChatModel._agenerate(self, messages, stop, run_manager, **kwargs)
+
+    async def _astream(
+        self, messages: list[Any], stop: list[str] | None = None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[Any]:
+        async for chunk in BaseChatModel._astream(self, messages, stop, run_manager, **kwargs):
+            yield chunk
+
+
+# Timeout of the pooled embeddings attempt running in this context, read by `_invocation_params`.
+_embeddings_timeout: ContextVar[float | None] = ContextVar("rag_embeddings_timeout", default=None)
+
+
+class PooledOpenAIEmbeddings(OpenAIEmbeddings):
+    """
+    OpenAIEmbeddings whose requests go through the shared "embeddings" pool, with the time left
+    before the pool deadline as their timeout. The async `aembed_*` methods are not pooled.
+    """
+
+    @property
+    def _invocation_params(self) -> dict[str, Any]:
+        params = super()._invocation_params
+        timeout = _embeddings_timeout.get()
+        return params if timeout is None else {**params, "timeout": timeout}
+
+    def embed_documents(self, texts: list[str], chunk_size: int | None = 0) -> list[list[float]]:
+        def embed(timeout: float) -> list[list[float]]:
+            token = _embeddings_timeout.set(timeout)
+            try:
+                return super(PooledOpenAIEmbeddings, self).embed_documents(texts, chunk_size=chunk_size)
+            finally:
+                _embeddings_timeout.reset(token)
+
+        return get_client_pool("embeddings").call(embed, tokens=sum(estimate_tokens(text) for text in texts))
+
+
+@lru_cache(maxsize=1)
+def get_chat_model() -> PooledChatOpenAI:
+    return PooledChatOpenAI(
+        api_key=OPENAI_API_KEY,
+        base_url=OPENAI_BASE_URL,
+        model=LLM_MODEL_NAME,
+        temperature=0,
+        http_client=get_http_client(),
+        max_retries=0,  # retries are handled by the pool
+        timeout=LLM_TIMEOUT_SECONDS,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> PooledOpenAIEmbeddings:
+    return PooledOpenAIEmbeddings(
+        api_key=OPENAI_API_KEY,
+        base_url=OPENAI_BASE_URL,
+        model=EMBEDDINGS_MODEL_NAME,
+        check_embedding_ctx_length=EMBEDDINGS_CHECK_CTX_LENGTH,
+        http_client=get_http_client(),
+        max_retries=0,
+        timeout=LLM_TIMEOUT_SECONDS,
+    )
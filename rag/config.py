@@ -16,29 +16,92 @@ if not logging.getLogger().handlers:
         format="%(asctime)s %(levelname)s %(name)s: %(message)s",
     )
 
+
+def _choice(name: str, default: str, choices: tuple[str, ...]) -> str:
+    """Lower-cased setting, rejected at startup when it is not one of `choices`."""
+    value = os.getenv(name, default).strip().lower()
+    if value not in choices:
+        raise ValueError(f"Unsupported {name}={value!r}; expected one of {', '.join(map(repr, choices))}.")
+    return value
+
+
 BASE_DIR = Path(__file__).resolve().parents[1]
-DATA_DIR = BASE_DIR / "data"
+# RAG_DATA_DIR isolates benchmark and load-test runs from the app data.
+DATA_DIR = Path(os.getenv("RAG_DATA_DIR") or BASE_DIR / "data")
 UPLOADS_DIR = DATA_DIR / "uploads"
 CHUNKS_DIR = DATA_DIR / "chunks"
 CHROMA_DIR = DATA_DIR / "chroma"
+NUMPY_STORE_DIR = DATA_DIR / "vectors"
+QUANTIZED_DIR = DATA_DIR / "quantized"
 REGISTRY_DB_PATH = DATA_DIR / "registry.sqlite3"
 CONVERSATIONS_DB_PATH = DATA_DIR / "conversations.sqlite3"
+PROFILES_DIR = DATA_DIR / "profiles"
+ARCHIVE_DIR = DATA_DIR / "archive"
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMBEDDINGS_MODEL_NAME = os.getenv("OPENAI_EMBEDDINGS", "text-embedding-3-small")
 LLM_MODEL_NAME = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+EMBEDDINGS_PROVIDER = os.getenv("EMBEDDINGS_PROVIDER", "openai").strip().lower()  # "openai" or "local"
+LOCAL_EMBEDDINGS_DIM = int(os.getenv("LOCAL_EMBEDDINGS_DIM", "384"))  # rag.local_embeddings.HashingEmbeddings
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # e.g. the stand-in server of benchmarks.mock_openai
+# Tokenize embedding inputs with tiktoken to enforce the model context length (needs the encoding files).
+EMBEDDINGS_CHECK_CTX_LENGTH = (
+    os.getenv("EMBEDDINGS_CHECK_CTX_LENGTH", "true").strip().lower() in {"1", "true", "yes", "y"}
+)
+VECTOR_BACKEND = _choice("VECTOR_BACKEND", "chroma", ("chroma", "numpy"))
+QUANTIZED_INDEX_MODE = _choice("QUANTIZED_INDEX", "", ("", "int8", "binary"))  # "" disables it
+QUANTIZED_RESCORE_MULTIPLIER = int(os.getenv("QUANTIZED_RESCORE_MULTIPLIER", "4"))
+# Chroma HNSW settings, applied when the collection is created (see rag.vector_store.rebuild_collection).
+HNSW_SPACE = _choice("HNSW_SPACE", "l2", ("l2", "cosine", "ip"))
+HNSW_CONSTRUCTION_EF = int(os.getenv("HNSW_CONSTRUCTION_EF", "100"))
+HNSW_SEARCH_EF = int(os.getenv("HNSW_SEARCH_EF", "10"))
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+# Lexical-first routing of citation / identifier queries (see rag.pipeline.hybrid_retriever.QueryRouter).
+ROUTER_ENABLED = os.getenv("ROUTER_ENABLED", "true").strip().lower() in {"1", "true", "yes", "y"}
+ROUTER_MIN_SCORE = float(os.getenv("ROUTER_MIN_SCORE", "1.0"))  # minimum top BM25 score
+ROUTER_MIN_MARGIN = float(os.getenv("ROUTER_MIN_MARGIN", "0.2"))  # relative lead of top over second score
+DENSE_CANDIDATE_MULTIPLIER = int(os.getenv("DENSE_CANDIDATE_MULTIPLIER", "2"))  # dense hits = dense_k * this
+# Shared OpenAI client pool (rag.clients): rate limits, concurrency, retries and per-call deadline.
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "500"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "200000"))
+EMBEDDINGS_REQUESTS_PER_MINUTE = float(os.getenv("EMBEDDINGS_REQUESTS_PER_MINUTE", "3000"))
+EMBEDDINGS_TOKENS_PER_MINUTE = float(os.getenv("EMBEDDINGS_TOKENS_PER_MINUTE", "1000000"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "20"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "60"))
+# On-demand profiling of the chat / ingestion hot paths (see rag.profiling).
+PROFILE_MODE = os.getenv("PROFILE_MODE", "off").strip().lower()  # "off", "cprofile", "tracemalloc" or "both"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))  # fraction of calls profiled
+PROFILE_MIN_MS = float(os.getenv("PROFILE_MIN_MS", "0"))  # only keep profiles of calls at least this slow
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))  # oldest profiles are deleted beyond this
+# Background warm-up of the vector store, BM25 index, tokenizer and OpenAI clients at startup (rag.warmup).
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").strip().lower() in {"1", "true", "yes", "y"}
+# Shared retrieval service (rag.retrieval_service), e.g. http://127.0.0.1:8765; empty = in-process retrieval.
+RETRIEVAL_SERVICE_URL = os.getenv("RETRIEVAL_SERVICE_URL", "").strip().rstrip("/")
+RETRIEVAL_SERVICE_TIMEOUT = float(os.getenv("RETRIEVAL_SERVICE_TIMEOUT", "10"))
+# SQLite connection pool and pragmas shared by the registry and conversation stores (see rag.db).
+SQLITE_POOL_SIZE = int(os.getenv("SQLITE_POOL_SIZE", "8"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+SQLITE_MMAP_SIZE_MB = int(os.getenv("SQLITE_MMAP_SIZE_MB", "256"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
 DEFAULT_TOP_K = int(os.getenv("TOP_K", "4"))
 MAX_INPUT_LENGTH = int(os.getenv("MAX_INPUT_LENGTH", "4000"))
 HYBRID_K = int(os.getenv("HYBRID_K", "8"))  # number of candidates to pull from each retriever
 LEXICAL_WEIGHT = float(os.getenv("LEXICAL_WEIGHT", "0.4"))  # weight for BM25 in fusion
 HISTORY_MAX_MESSAGES = int(os.getenv("HISTORY_MAX_MESSAGES", "12"))
 HISTORY_MAX_CHARS = int(os.getenv("HISTORY_MAX_CHARS", "1200"))
+CHAT_WINDOW_MESSAGES = int(os.getenv("CHAT_WINDOW_MESSAGES", "30"))
+# Conversations idle for longer move to data/archive (rag.archive); 0 disables automatic archiving.
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
 REWRITE_MAX_MESSAGES = int(os.getenv("REWRITE_MAX_MESSAGES", "6"))
 
 DEFAULT_CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
 DEFAULT_CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "100"))
 USE_TIKTOKEN = os.getenv("USE_TIKTOKEN", "true").strip().lower() in {"1", "true", "yes", "y"}
 DOC_PREVIEW_CHARS = int(os.getenv("DOC_PREVIEW_CHARS", "400"))
+DOCUMENTS_PAGE_SIZE = int(os.getenv("DOCUMENTS_PAGE_SIZE", "20"))
 
 UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
 CHUNKS_DIR.mkdir(parents=True, exist_ok=True)
@@ -1,20 +1,68 @@
 from __future__ import annotations
 
 import json
+import logging
+import re
 import sqlite3
+import unicodedata
 from dataclasses import dataclass
 from datetime import datetime
-from functools import lru_cache
 from pathlib import Path
+from typing import ContextManager
 from uuid import uuid4
 
-from rag.config import CONVERSATIONS_DB_PATH
+from rag.config import HISTORY_MAX_CHARS
+from rag.db import get_pool
+from rag.migrations import Migration, columns, migrate
+from rag.telemetry import TELEMETRY_MIGRATIONS, Trace, write_trace
+
+
+logger = logging.getLogger(__name__)
+
+# Rolling summary line lengths: recent messages keep more text than older, condensed ones.
+SUMMARY_LINE_CHARS = 300
+SUMMARY_CONDENSED_CHARS = 100
+# Most recent full-text matches ranked by search_messages.
+SEARCH_CANDIDATES = 2000
 
 
 def _now() -> str:
     return datetime.utcnow().isoformat() + "Z"
 
 
+def _clip(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[: max(limit - 4, 0)].rstrip() + " ..."
+
+
+def roll_summary(summary: str, role: str, content: str, *, max_chars: int = HISTORY_MAX_CHARS) -> str:
+    """
+    Fold one message into a conversation summary, deterministically and in bounded time.
+
+    The summary holds one "Role: text" line per message. When it outgrows `max_chars`, the
+    oldest lines are condensed first and only dropped once everything older is condensed, so
+    long conversations keep a trace of their beginning without growing the prompt.
+    """
+    text = " ".join((content or "").split())
+    if not text:
+        return summary
+    label = "User" if role == "user" else "Assistant" if role == "assistant" else "Message"
+    lines = summary.splitlines() if summary else []
+    lines.append(_clip(f"{label}: {text}", SUMMARY_LINE_CHARS))
+
+    def size() -> int:
+        return sum(len(line) for line in lines) + len(lines) - 1
+
+    idx = 0
+    while size() > max_chars and idx < len(lines) - 1:
+        lines[idx] = _clip(lines[idx], SUMMARY_CONDENSED_CHARS)
+        idx += 1
+    while size() > max_chars and len(lines) > 1:
+        lines.pop(0)
+    if size() > max_chars:
+        lines[-1] = _clip(lines[-1], max_chars)
+    return "\n".join(lines)
+
+
 @dataclass
 class Conversation:
     conversation_id: str
@@ -33,51 +81,224 @@ class Message:
     sources: list[dict]
 
 
+@dataclass
+class MessageHit:
+    message_id: int
+    conversation_id: str
+    conversation_title: str
+    role: str
+    snippet: str
+    created_at: str
+    score: float
+
+
+def _fold(text: str) -> str:
+    """Lowercase and strip accents, like the FTS5 `unicode61 remove_diacritics 2` tokenizer."""
+    decomposed = unicodedata.normalize("NFD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _snippet(content: str, terms: list[str], *, window: int = 16) -> str:
+    """Up to `window` words around the first match, matched words in bold."""
+    words = content.split()
+
+    def matches(word: str) -> bool:
+        folded = [_fold(token) for token in re.findall(r"\w+", word)]
+        return any(
+            token == term or (idx == len(terms) - 1 and token.startswith(term))
+            for token in folded
+            for idx, term in enumerate(terms)
+        )
+
+    hits = [idx for idx, word in enumerate(words) if matches(word)]
+    start = max(0, (hits[0] if hits else 0) - window // 3)
+    end = min(len(words), start + window)
+    hit_set = set(hits)
+    parts = [f"**{words[idx]}**" if idx in hit_set else words[idx] for idx in range(start, end)]
+    return ("… " if start else "") + " ".join(parts) + (" …" if end < len(words) else "")
+
+
+def _fts_query(query: str) -> str:
+    """Turn free text into an FTS5 query: every word must match, the last one as a prefix."""
+    terms = re.findall(r"\w+", query)
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def _create_tables(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS conversations (
+            conversation_id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS messages (
+            message_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            conversation_id TEXT NOT NULL,
+            role TEXT NOT NULL,
+            content TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            sources TEXT NOT NULL DEFAULT '[]',
+            FOREIGN KEY (conversation_id) REFERENCES conversations(conversation_id)
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id);")
+    # Migrate old schemas lacking the sources column.
+    if "sources" not in columns(conn, "messages"):
+        conn.execute("ALTER TABLE messages ADD COLUMN sources TEXT NOT NULL DEFAULT '[]';")
+
+
+def _add_summary(conn: sqlite3.Connection) -> None:
+    if "summary" in columns(conn, "conversations"):
+        return
+    conn.execute("ALTER TABLE conversations ADD COLUMN summary TEXT NOT NULL DEFAULT '';")
+    summaries: dict[str, str] = {}
+    for conversation_id, role, content in conn.execute(
+        "SELECT conversation_id, role, content FROM messages ORDER BY message_id ASC"
+    ):
+        summaries[conversation_id] = roll_summary(summaries.get(conversation_id, ""), role, content)
+    conn.executemany(
+        "UPDATE conversations SET summary = ? WHERE conversation_id = ?",
+        [(summary, conversation_id) for conversation_id, summary in summaries.items()],
+    )
+
+
+def _create_fts(conn: sqlite3.Connection) -> bool:
+    # External-content FTS5 index over messages.content, kept in sync by triggers.
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'").fetchone()
+    try:
+        conn.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                content,
+                content='messages',
+                content_rowid='message_id',
+                tokenize='unicode61 remove_diacritics 2'
+            );
+            """
+        )
+    except sqlite3.OperationalError:
+        logger.warning("SQLite FTS5 unavailable; conversation search falls back to LIKE.", exc_info=True)
+        return False
+    for trigger in (
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+            INSERT INTO messages_fts(rowid, content) VALUES (new.message_id, new.content);
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content)
+            VALUES ('delete', old.message_id, old.content);
+        END;
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF content ON messages BEGIN
+            INSERT INTO messages_fts(messages_fts, rowid, content)
+            VALUES ('delete', old.message_id, old.content);
+            INSERT INTO messages_fts(rowid, content) VALUES (new.message_id, new.content);
+        END;
+        """,
+    ):
+        conn.execute(trigger)
+    if not exists:
+        conn.execute("INSERT INTO messages_fts(messages_fts) VALUES ('rebuild');")
+    return True
+
+
+def _create_counter(conn: sqlite3.Connection) -> None:
+    # Single-row conversation count maintained by triggers, so titles and counts skip COUNT(*).
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS conversation_counter (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            total INTEGER NOT NULL
+        );
+        """
+    )
+    conn.execute(
+        "INSERT OR IGNORE INTO conversation_counter (id, total) SELECT 1, COUNT(*) FROM conversations;"
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS conversation_counter_insert AFTER INSERT ON conversations BEGIN
+            UPDATE conversation_counter SET total = total + 1 WHERE id = 1;
+        END;
+        """
+    )
+    conn.execute(
+        """
+        CREATE TRIGGER IF NOT EXISTS conversation_counter_delete AFTER DELETE ON conversations BEGIN
+            UPDATE conversation_counter SET total = total - 1 WHERE id = 1;
+        END;
+        """
+    )
+
+
+def _index_updated_at(conn: sqlite3.Connection) -> None:
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_updated_at ON conversations(updated_at);")
+
+
+# Append new steps with the next version; never edit or reorder released ones.
+CONVERSATION_MIGRATIONS = [
+    Migration(1, "conversations and messages tables", _create_tables),
+    Migration(2, "rolling summary column", _add_summary),
+    Migration(3, "messages full-text index", _create_fts),
+    Migration(4, "conversation counter", _create_counter),
+    Migration(5, "updated_at index", _index_updated_at),
+]
+
+
 class ConversationStore:
     def __init__(self, path: Path) -> None:
         self.path = path
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self._init_db()
 
-    def _connect(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.path)
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        return get_pool(self.path).connection()
 
-    def _init_db(self) -> None:
+    def enable_incremental_vacuum(self, *, existing: bool = True) -> bool:
+        """
+        Switch the database to auto_vacuum=INCREMENTAL, so `PRAGMA incremental_vacuum` returns freed
+        pages to the OS. Once WAL mode has written the file header this takes a full VACUUM, which
+        rewrites the whole file: instant on a new database, a maintenance task on an existing one
+        (`python -m rag.archive vacuum`). With `existing=False`, only empty databases are switched.
+        Returns True when the mode was changed.
+        """
         with self._connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS conversations (
-                    conversation_id TEXT PRIMARY KEY,
-                    title TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL
-                );
-                """
-            )
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS messages (
-                    message_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    conversation_id TEXT NOT NULL,
-                    role TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    created_at TEXT NOT NULL,
-                    sources TEXT NOT NULL DEFAULT '[]',
-                    FOREIGN KEY (conversation_id) REFERENCES conversations(conversation_id)
-                );
-                """
-            )
-            conn.execute(
-                "CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id);"
-            )
-            # Migrate old schemas lacking the sources column.
-            info = conn.execute("PRAGMA table_info(messages);").fetchall()
-            cols = {row[1] for row in info}
-            if "sources" not in cols:
-                conn.execute(
-                    "ALTER TABLE messages ADD COLUMN sources TEXT NOT NULL DEFAULT '[]';"
+            if conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2:
+                return False
+            if not existing and conn.execute("SELECT 1 FROM sqlite_master LIMIT 1;").fetchone():
+                logger.info(
+                    "%s has no incremental vacuum; run `python -m rag.archive vacuum` once to enable it.",
+                    self.path.name,
                 )
+                return False
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+            conn.execute("VACUUM;")
+        return True
+
+    def _init_db(self) -> None:
+        self.enable_incremental_vacuum(existing=False)
+        with self._connect() as conn:
+            migrate(conn, "conversations", CONVERSATION_MIGRATIONS)
+            # Stage timings live in this database so an exchange and its trace commit together.
+            migrate(conn, "telemetry", TELEMETRY_MIGRATIONS)
             conn.commit()
+            self._fts_enabled = bool(
+                conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'").fetchone()
+            )
 
     def _hydrate_conversation(self, row: tuple) -> Conversation:
         return Conversation(
@@ -96,23 +317,23 @@ class ConversationStore:
 
     def count_conversations(self) -> int:
         with self._connect() as conn:
-            (count,) = conn.execute("SELECT COUNT(*) FROM conversations;").fetchone()
-            return count or 0
+            row = conn.execute("SELECT total FROM conversation_counter WHERE id = 1;").fetchone()
+            return row[0] if row else 0
 
     def create_conversation(self, title: str | None = None) -> Conversation:
         ts = _now()
         conv_id = uuid4().hex
-        if title is None:
-            title = f"Conversation {self.count_conversations() + 1}"
         with self._connect() as conn:
-            conn.execute(
+            (title,) = conn.execute(
                 """
                 INSERT INTO conversations (conversation_id, title, created_at, updated_at)
-                VALUES (?, ?, ?, ?)
+                SELECT ?, COALESCE(?, 'Conversation ' || (total + 1)), ?, ?
+                FROM conversation_counter
+                WHERE id = 1
+                RETURNING title
                 """,
                 (conv_id, title, ts, ts),
-            )
-            conn.commit()
+            ).fetchone()
         return Conversation(conversation_id=conv_id, title=title, created_at=ts, updated_at=ts)
 
     def list_conversations(self) -> list[Conversation]:
@@ -156,50 +377,196 @@ class ConversationStore:
             return existing
         return self.create_conversation()
 
-    def add_message(
-        self, conversation_id: str, role: str, content: str, sources: list[dict] | None = None
-    ) -> Message:
+    def _insert_messages(
+        self, conn: sqlite3.Connection, conversation_id: str, entries: list[tuple[str, str, list[dict]]]
+    ) -> list[Message]:
+        """Insert (role, content, sources) entries, rolling the summary into one conversation update."""
         ts = _now()
-        payload = json.dumps(sources or [], ensure_ascii=True)
-        with self._connect() as conn:
-            conn.execute(
+        row = conn.execute(
+            "SELECT summary FROM conversations WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        summary = row[0] if row else ""
+        messages: list[Message] = []
+        for role, content, sources in entries:
+            (message_id,) = conn.execute(
                 """
                 INSERT INTO messages (conversation_id, role, content, created_at, sources)
                 VALUES (?, ?, ?, ?, ?)
+                RETURNING message_id
                 """,
-                (conversation_id, role, content, ts, payload),
+                (conversation_id, role, content, ts, json.dumps(sources, ensure_ascii=True)),
+            ).fetchone()
+            summary = roll_summary(summary, role, content)
+            messages.append(
+                Message(
+                    message_id=message_id,
+                    conversation_id=conversation_id,
+                    role=role,
+                    content=content,
+                    created_at=ts,
+                    sources=sources,
+                )
+            )
+        conn.execute(
+            """
+            UPDATE conversations
+            SET updated_at = ?, summary = ?
+            WHERE conversation_id = ?
+            """,
+            (ts, summary, conversation_id),
+        )
+        return messages
+
+    def add_message(
+        self, conversation_id: str, role: str, content: str, sources: list[dict] | None = None
+    ) -> Message:
+        with self._connect() as conn:
+            (message,) = self._insert_messages(conn, conversation_id, [(role, content, sources or [])])
+        return message
+
+    def add_exchange(
+        self,
+        conversation_id: str,
+        question: str,
+        answer: str,
+        sources: list[dict] | None = None,
+        trace: Trace | None = None,
+    ) -> tuple[Message, Message]:
+        """
+        Store a user question, its answer and the answer's stage timings in one transaction.
+
+        One commit (one WAL fsync) per turn instead of one per message plus one for telemetry.
+        """
+        with self._connect() as conn:
+            user_msg, assistant_msg = self._insert_messages(
+                conn, conversation_id, [("user", question, []), ("assistant", answer, sources or [])]
             )
-            conn.execute(
+            if trace is not None and trace.stages:
+                write_trace(conn, trace, assistant_msg.message_id)
+        return user_msg, assistant_msg
+
+    def list_messages(
+        self,
+        conversation_id: str,
+        *,
+        before: int | None = None,
+        after: int | None = None,
+        limit: int | None = None,
+    ) -> list[Message]:
+        """
+        Messages in chronological order, keyset-paginated on `message_id`.
+
+        `before`/`after` are exclusive bounds. With a `limit`, the newest matching messages are
+        returned unless only `after` is given (then the oldest ones after it), so
+        `list_messages(cid, limit=n)` is the latest window and `before=first_id` pages backwards.
+        """
+        clauses = ["conversation_id = ?"]
+        params: list = [conversation_id]
+        if before is not None:
+            clauses.append("message_id < ?")
+            params.append(before)
+        if after is not None:
+            clauses.append("message_id > ?")
+            params.append(after)
+        newest_first = limit is not None and not (after is not None and before is None)
+        query = f"""
+            SELECT message_id, conversation_id, role, content, created_at, sources
+            FROM messages
+            WHERE {" AND ".join(clauses)}
+            ORDER BY message_id {"DESC" if newest_first else "ASC"}
+        """
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(max(limit, 0))
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        if newest_first:
+            rows.reverse()
+        return [self._hydrate_message(row) for row in rows]
+
+    def get_summary(self, conversation_id: str) -> str:
+        """Rolling summary of the conversation, maintained by `add_message`."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT summary FROM conversations WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+        return row[0] if row else ""
+
+    def has_messages_before(self, conversation_id: str, message_id: int) -> bool:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT 1 FROM messages WHERE conversation_id = ? AND message_id < ? LIMIT 1",
+                (conversation_id, message_id),
+            ).fetchone()
+        return row is not None
+
+    def search_messages(self, query: str, limit: int = 20) -> list[MessageHit]:
+        """
+        Full-text search over every conversation, best matches first.
+
+        Accents and case are ignored and the last word matches as a prefix. Results are ranked
+        by BM25 among the `SEARCH_CANDIDATES` most recent matches, which keeps very common terms
+        in the millisecond range. Snippets wrap matched words in `**` (Markdown bold).
+        """
+        if not self._fts_enabled:
+            return self._search_messages_like(query, limit)
+        match = _fts_query(query)
+        if not match:
+            return []
+        with self._connect() as conn:
+            rows = conn.execute(
                 """
-                UPDATE conversations
-                SET updated_at = ?
-                WHERE conversation_id = ?
+                SELECT m.message_id, m.conversation_id, c.title, m.role, m.content, m.created_at, hits.score
+                FROM (
+                    SELECT rowid, score FROM (
+                        SELECT rowid, bm25(messages_fts) AS score
+                        FROM messages_fts
+                        WHERE messages_fts MATCH ?
+                        ORDER BY rowid DESC
+                        LIMIT ?
+                    )
+                    ORDER BY score
+                    LIMIT ?
+                ) AS hits
+                JOIN messages m ON m.message_id = hits.rowid
+                JOIN conversations c ON c.conversation_id = m.conversation_id
+                ORDER BY hits.score
                 """,
-                (ts, conversation_id),
+                (match, SEARCH_CANDIDATES, limit),
+            ).fetchall()
+        # FTS5's snippet() re-runs prefix queries per row, so snippets are cut here instead.
+        terms = [_fold(term) for term in re.findall(r"\w+", query)]
+        return [
+            MessageHit(
+                message_id=row[0],
+                conversation_id=row[1],
+                conversation_title=row[2],
+                role=row[3],
+                snippet=_snippet(row[4], terms),
+                created_at=row[5],
+                score=-row[6],  # bm25() is lower-is-better
             )
-            conn.commit()
-            message_id = conn.execute("SELECT last_insert_rowid();").fetchone()[0]
-        return Message(
-            message_id=message_id,
-            conversation_id=conversation_id,
-            role=role,
-            content=content,
-            created_at=ts,
-            sources=sources or [],
-        )
+            for row in rows
+        ]
 
-    def list_messages(self, conversation_id: str) -> list[Message]:
+    def _search_messages_like(self, query: str, limit: int) -> list[MessageHit]:
+        text = " ".join(query.split())
+        if not text:
+            return []
         with self._connect() as conn:
             rows = conn.execute(
                 """
-                SELECT message_id, conversation_id, role, content, created_at, sources
-                FROM messages
-                WHERE conversation_id = ?
-                ORDER BY message_id ASC
+                SELECT m.message_id, m.conversation_id, c.title, m.role,
+                       substr(m.content, 1, 160), m.created_at
+                FROM messages m
+                JOIN conversations c ON c.conversation_id = m.conversation_id
+                WHERE m.content LIKE ?
+                ORDER BY m.message_id DESC
+                LIMIT ?
                 """,
-                (conversation_id,),
+                (f"%{text}%", limit),
             ).fetchall()
-        return [self._hydrate_message(row) for row in rows]
+        return [MessageHit(*row, score=0.0) for row in rows]
 
     def delete_conversation(self, conversation_id: str) -> bool:
         with self._connect() as conn:
@@ -215,6 +582,7 @@ class ConversationStore:
         return True
 
 
-@lru_cache(maxsize=1)
 def get_conversation_store() -> ConversationStore:
-    return ConversationStore(CONVERSATIONS_DB_PATH)
+    from rag.resources import get_resource_manager
+
+    return get_resource_manager().conversations
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from rag.config import (
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_CACHE_SIZE_KB,
+    SQLITE_MMAP_SIZE_MB,
+    SQLITE_POOL_SIZE,
+)
+
+logger = logging.getLogger(__name__)
+
+# Per-connection prepared statement cache (sqlite3's default is 128).
+CACHED_STATEMENTS = 256
+
+
+class ConnectionPool:
+    """
+    Reusable SQLite connections for one database file, shared by every thread of the process.
+
+    Connections are opened once with WAL journaling, `synchronous=NORMAL`, a larger page
+    cache, memory-mapped reads and a busy timeout, then checked out per unit of work.
+    Reusing them keeps sqlite3's prepared statement cache warm; WAL lets readers proceed
+    while a writer commits, and the busy timeout makes concurrent writers wait instead
+    of failing with "database is locked".
+    """
+
+    def __init__(self, path: str | Path, *, size: int = SQLITE_POOL_SIZE) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.size = max(size, 1)
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._all: list[sqlite3.Connection] = []
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.path,
+            timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,  # a connection is only used by the thread that checked it out
+            cached_statements=CACHED_STATEMENTS,
+        )
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+        conn.execute(f"PRAGMA cache_size=-{int(SQLITE_CACHE_SIZE_KB)};")
+        conn.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_SIZE_MB) * 1024 * 1024};")
+        conn.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)};")
+        conn.execute("PRAGMA temp_store=MEMORY;")
+        return conn
+
+    def _checkout(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    conn = self._open()
+                except Exception:
+                    self._opened -= 1
+                    raise
+                self._all.append(conn)
+                return conn
+        try:
+            return self._idle.get(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+        except queue.Empty:
+            raise sqlite3.OperationalError(f"No SQLite connection available for {self.path}") from None
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Check out a connection; the transaction commits on success and rolls back on error."""
+        conn = self._checkout()
+        try:
+            with conn:
+                yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait()
+                except queue.Empty:
+                    break
+            for conn in self._all:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    logger.warning("Failed to close SQLite connection for %s", self.path, exc_info=True)
+            self._all.clear()
+            self._opened = 0
+
+
+_POOLS: dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(path: str | Path) -> ConnectionPool:
+    """Process-wide pool for a database file; stores pointing at the same file share it."""
+    key = str(Path(path).resolve())
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = ConnectionPool(key)
+        return pool
+
+
+def close_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
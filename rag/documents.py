@@ -1,41 +1,91 @@
 from __future__ import annotations
 
+import hashlib
 import logging
-from langchain_chroma import Chroma
+from datetime import datetime
 from pathlib import Path
+from typing import Any
 from uuid import uuid4
 
-from rag.chunking import chunk_text
+from rag.chunking import chunk_byte_spans, chunk_text, count_tokens, preview_text
 from rag.config import (
     DEFAULT_CHUNK_OVERLAP,
     DEFAULT_CHUNK_SIZE,
-    REGISTRY_DB_PATH,
+    DOC_PREVIEW_CHARS,
     UPLOADS_DIR,
     USE_TIKTOKEN,
 )
 from rag.pipeline.hybrid_retriever import HybridRetriever
 from rag.preprocessing import preprocess_file
-from rag.registry import DocumentRecord, DocumentRegistry
+from rag.profiling import profiled
+from rag.registry import ChunkRecord, DocumentRecord, DocumentRegistry
+from rag.resources import get_resource_manager
+from rag.retrieval_service import broadcast_docs_changed
 from rag.vector_store import (
+    VectorBackend,
     add_chunks_to_store,
     delete_chunks_from_store,
-    init_vector_store,
+    invalidate_quantized_index,
 )
 
-# Initialize persistent store and registry singletons
-vector_store: Chroma = init_vector_store()
-registry = DocumentRegistry(REGISTRY_DB_PATH)
+# The vector store and registry are process-wide resources (rag.resources), created on first use
+# rather than at import: opening Chroma needs the embeddings client (and OPENAI_API_KEY), which pages
+# listing documents do not. `documents.vector_store` / `documents.registry` still resolve (and can be
+# monkeypatched) as attributes.
 
 
+def get_vector_store() -> VectorBackend:
+    store = globals().get("vector_store")
+    return store if store is not None else get_resource_manager().vector_store
+
+
+def get_registry() -> DocumentRegistry:
+    registry = globals().get("registry")
+    return registry if registry is not None else get_resource_manager().registry
+
+
+def __getattr__(name: str) -> Any:
+    if name == "vector_store":
+        return get_vector_store()
+    if name == "registry":
+        return get_registry()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 def _safe_name(name: str) -> str:
     return Path(name).name.replace(" ", "_")
 
 
+def _chunk_records(doc_id: str, chunk_ids: list[str], chunks: list[str], text: str) -> list[ChunkRecord]:
+    spans = chunk_byte_spans(text, chunks)
+    return [
+        ChunkRecord(
+            chunk_id=chunk_id,
+            doc_id=doc_id,
+            chunk_index=idx,
+            content_hash=hashlib.sha256(chunk.encode("utf-8")).hexdigest(),
+            token_count=count_tokens(chunk, use_tiktoken=USE_TIKTOKEN),
+            start_byte=span[0] if span else None,
+            end_byte=span[1] if span else None,
+        )
+        for idx, (chunk_id, chunk, span) in enumerate(zip(chunk_ids, chunks, spans))
+    ]
+
+
+def _corpus_changed() -> None:
+    invalidate_quantized_index()
+    HybridRetriever.notify_docs_changed()
+    # A shared retrieval service (RETRIEVAL_SERVICE_URL) holds its own copy of both indexes.
+    broadcast_docs_changed()
+
+
+@profiled("ingest_upload")
 def ingest_upload(filename: str, data: bytes) -> tuple[DocumentRecord, int]:
     """
     Ingest an uploaded file: store it, preprocess, chunk, embed, and register.
     """
+    # Resolved before any vector is written, so a first-use backfill cannot register this upload too.
+    registry = get_registry()
     doc_id = uuid4().hex
     original_name = _safe_name(filename)
     stored_name = f"{doc_id}_{original_name}"
@@ -52,7 +102,7 @@ def ingest_upload(filename: str, data: bytes) -> tuple[DocumentRecord, int]:
     )
 
     chunk_ids = add_chunks_to_store(
-        vector_store,
+        get_vector_store(),
         chunks=chunks,
         doc_id=doc_id,
         source_path=str(stored_path),
@@ -66,32 +116,41 @@ def ingest_upload(filename: str, data: bytes) -> tuple[DocumentRecord, int]:
         stored_path=str(stored_path),
         ext=ext,
         chunk_ids=chunk_ids,
+        size_bytes=len(data),
+        preview=preview_text(text, DOC_PREVIEW_CHARS),
+        ingested_at=datetime.utcnow().isoformat() + "Z",
     )
-    registry.add(record)
-    HybridRetriever.notify_docs_changed()
+    chunk_records = _chunk_records(doc_id, chunk_ids, chunks, text)
+    record.token_count = sum(chunk.token_count or 0 for chunk in chunk_records)
+    registry.add(record, chunk_records)
+    _corpus_changed()
     return record, len(chunks)
 
 
-def list_documents() -> list[DocumentRecord]:
-    return registry.list()
+def list_documents(limit: int | None = None, offset: int = 0) -> list[DocumentRecord]:
+    return get_registry().list(limit=limit, offset=offset)
+
+
+def count_documents() -> int:
+    return get_registry().count()
 
 
 def delete_document(doc_id: str) -> bool:
-    record = registry.get(doc_id)
+    record = get_registry().get(doc_id)
     if not record:
         return False
 
     if record.chunk_ids:
-        delete_chunks_from_store(vector_store, record.chunk_ids)
+        delete_chunks_from_store(get_vector_store(), record.chunk_ids)
     else:
-        vector_store.delete(where={"doc_id": doc_id})
+        get_vector_store().delete(where={"doc_id": doc_id})
 
     stored_path = Path(record.stored_path)
     if stored_path.exists():
         stored_path.unlink()
 
-    registry.remove(doc_id)
-    HybridRetriever.notify_docs_changed()
+    get_registry().remove(doc_id)
+    _corpus_changed()
     return True
 
 
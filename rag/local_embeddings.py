@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _fold(text: str) -> str:
+    # Lowercase and strip accents so "pénalité" and "penalite" share features.
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+@lru_cache(maxsize=200_000)
+def _bucket(feature: str, dim: int) -> tuple[int, float]:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    value = int.from_bytes(digest, "little")
+    # Signed hashing: collisions cancel out on average instead of piling up.
+    return value % dim, 1.0 if (value >> 63) & 1 else -1.0
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic offline embeddings: word unigrams plus character n-grams of each word,
+    hashed into `dim` signed buckets and L2-normalized. No model download or API key,
+    identical vectors across runs and machines; meant for benchmarks, CI and local demos,
+    not for answer quality.
+    """
+
+    def __init__(self, dim: int = 384, ngram_range: tuple[int, int] = (3, 5)) -> None:
+        if dim <= 0:
+            raise ValueError("dim must be positive")
+        self.dim = dim
+        self.ngram_range = ngram_range
+
+    def _features(self, text: str) -> list[str]:
+        low, high = self.ngram_range
+        features: list[str] = []
+        for word in _WORD_RE.findall(_fold(text)):
+            features.append(f"w:{word}")
+            padded = f"<{word}>"
+            for size in range(low, high + 1):
+                features.extend(padded[idx : idx + size] for idx in range(len(padded) - size + 1))
+        return features
+
+    def embed_array(self, texts: list[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                column, sign = _bucket(feature, self.dim)
+                matrix[row, column] += sign
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_array(list(texts)).tolist()
+
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_array([text])[0].tolist()
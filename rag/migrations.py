@@ -0,0 +1,221 @@
+"""
+Versioned, additive schema migrations for the SQLite stores.
+
+Each store declares an ordered list of `Migration` steps for its component
+("registry", "conversations", "telemetry", "archive"). `migrate` applies the
+steps above the version recorded in `schema_version`, each in the caller's
+transaction, so an upgrade either completes or leaves the previous schema intact.
+Steps only add or transform; none drops user data. A step that cannot run on this
+SQLite build (e.g. without FTS5) returns False: it is recorded in `schema_deferred`
+instead of as applied, and retried on every start until it succeeds.
+
+If the registry is lost or emptied while vectors remain, `backfill_registry`
+rebuilds its rows from the vector store metadata and `UPLOADS_DIR` instead of
+re-embedding the corpus:
+
+    python -m rag.migrations status
+    python -m rag.migrations backfill
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import logging
+import sqlite3
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Sequence
+
+from rag.config import DOC_PREVIEW_CHARS, UPLOADS_DIR, USE_TIKTOKEN
+
+if TYPE_CHECKING:
+    from rag.registry import DocumentRegistry
+    from rag.vector_store import VectorBackend
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection], bool | None]  # False: unavailable here, retry later
+
+
+def _ensure_version_table(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            component TEXT PRIMARY KEY,
+            version INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        );
+        """
+    )
+
+
+def current_version(conn: sqlite3.Connection, component: str) -> int:
+    _ensure_version_table(conn)
+    row = conn.execute("SELECT version FROM schema_version WHERE component = ?", (component,)).fetchone()
+    return row[0] if row else 0
+
+
+def deferred_versions(conn: sqlite3.Connection, component: str) -> set[int]:
+    """Steps below the current version that could not run yet (see `Migration.apply`)."""
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS schema_deferred (
+            component TEXT NOT NULL,
+            version INTEGER NOT NULL,
+            PRIMARY KEY (component, version)
+        );
+        """
+    )
+    rows = conn.execute("SELECT version FROM schema_deferred WHERE component = ?", (component,)).fetchall()
+    return {row[0] for row in rows}
+
+
+def migrate(conn: sqlite3.Connection, component: str, migrations: Sequence[Migration]) -> list[int]:
+    """
+    Apply pending steps in version order on `conn` (caller commits); returns the versions applied.
+
+    Databases created before versioning start at 0 and replay every step, which is why steps
+    are written to be idempotent (IF NOT EXISTS, column checks). `schema_version` holds the
+    highest step reached; deferred steps below it are listed in `schema_deferred`.
+    """
+    versions = [step.version for step in migrations]
+    if versions != sorted(set(versions)):
+        raise ValueError(f"Migrations for {component} must have unique, increasing versions.")
+    version = current_version(conn, component)
+    deferred = deferred_versions(conn, component)
+    pending = [step for step in migrations if step.version > version or step.version in deferred]
+    if pending and not conn.in_transaction:
+        # sqlite3 only opens transactions implicitly before DML; DDL steps must be covered too.
+        conn.execute("BEGIN")
+    applied: list[int] = []
+    for step in pending:
+        logger.info("Migrating %s schema to v%d: %s", component, step.version, step.description)
+        if step.apply(conn) is False:
+            # Not applied: later steps still run and this one is retried on the next start.
+            if step.version not in deferred:
+                logger.warning("Deferred %s schema v%d: %s", component, step.version, step.description)
+            conn.execute(
+                "INSERT OR IGNORE INTO schema_deferred (component, version) VALUES (?, ?)",
+                (component, step.version),
+            )
+        else:
+            conn.execute(
+                "DELETE FROM schema_deferred WHERE component = ? AND version = ?", (component, step.version)
+            )
+            applied.append(step.version)
+        if step.version > version:
+            conn.execute(
+                """
+                INSERT INTO schema_version (component, version, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT(component) DO UPDATE
+                SET version = excluded.version, updated_at = excluded.updated_at
+                """,
+                (component, step.version, datetime.utcnow().isoformat() + "Z"),
+            )
+    return applied
+
+
+def columns(conn: sqlite3.Connection, table: str) -> set[str]:
+    return {row[1] for row in conn.execute(f"PRAGMA table_info({table});").fetchall()}
+
+
+def _stored_upload(doc_id: str, metadata: dict[str, Any], uploads_dir: Path) -> Path | None:
+    source = metadata.get("source_path")
+    if source and Path(source).exists():
+        return Path(source)
+    matches = sorted(uploads_dir.glob(f"{doc_id}_*"))
+    return matches[0] if matches else None
+
+
+def backfill_registry(
+    registry: DocumentRegistry, vector_store: VectorBackend, uploads_dir: Path = UPLOADS_DIR
+) -> int:
+    """
+    Register documents that have vectors but no registry row; returns how many were restored.
+
+    Names, formats and chunk ids come from the chunk metadata written at ingestion; the stored
+    file is matched in `uploads_dir`. Byte offsets and the ingest time cannot be recovered and
+    stay empty; the preview is rebuilt from the first chunk.
+    """
+    from rag.chunking import count_tokens, preview_text
+    from rag.registry import ChunkRecord, DocumentRecord
+
+    data = vector_store.get(include=["documents", "metadatas"])
+    known = set(registry.doc_ids())
+    grouped: dict[str, list[tuple[str, str, dict[str, Any]]]] = {}
+    rows = zip(data.get("ids") or [], data.get("documents") or [], data.get("metadatas") or [])
+    for chunk_id, text, metadata in rows:
+        doc_id = (metadata or {}).get("doc_id")
+        if doc_id and doc_id not in known:
+            grouped.setdefault(doc_id, []).append((chunk_id, text or "", metadata))
+
+    for doc_id, chunk_rows in grouped.items():
+        chunk_rows.sort(key=lambda row: row[2].get("chunk_index") or 0)
+        metadata = chunk_rows[0][2]
+        stored = _stored_upload(doc_id, metadata, uploads_dir)
+        original_name = metadata.get("original_name") or (
+            stored.name.split("_", 1)[-1] if stored else f"{doc_id}.{metadata.get('doc_format') or 'txt'}"
+        )
+        record = DocumentRecord(
+            doc_id=doc_id,
+            original_name=original_name,
+            stored_path=str(stored or metadata.get("source_path") or ""),
+            ext=metadata.get("doc_format") or Path(original_name).suffix.lstrip(".").lower(),
+            chunk_ids=[chunk_id for chunk_id, _text, _meta in chunk_rows],
+            size_bytes=stored.stat().st_size if stored else None,
+            preview=preview_text(chunk_rows[0][1], DOC_PREVIEW_CHARS),
+        )
+        chunks = [
+            ChunkRecord(
+                chunk_id=chunk_id,
+                doc_id=doc_id,
+                chunk_index=meta.get("chunk_index", idx),
+                content_hash=hashlib.sha256(text.encode("utf-8")).hexdigest(),
+                token_count=count_tokens(text, use_tiktoken=USE_TIKTOKEN),
+            )
+            for idx, (chunk_id, text, meta) in enumerate(chunk_rows)
+        ]
+        registry.add(record, chunks)
+        if stored is None:
+            logger.warning("Restored %s (%s) without its uploaded file.", doc_id, original_name)
+    if grouped:
+        logger.info("Restored %d document(s) into the registry from vector metadata.", len(grouped))
+    return len(grouped)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["status", "backfill"])
+    args = parser.parse_args(argv)
+
+    from rag.config import CONVERSATIONS_DB_PATH, REGISTRY_DB_PATH
+    from rag.db import get_pool
+
+    if args.command == "status":
+        for path in (REGISTRY_DB_PATH, CONVERSATIONS_DB_PATH):
+            if not path.exists():
+                print(f"{path.name}: missing")
+                continue
+            with get_pool(path).connection() as conn:
+                _ensure_version_table(conn)
+                for component, version, updated_at in conn.execute(
+                    "SELECT component, version, updated_at FROM schema_version ORDER BY component"
+                ).fetchall():
+                    deferred = ", ".join(f"v{step}" for step in sorted(deferred_versions(conn, component)))
+                    pending = f", deferred: {deferred}" if deferred else ""
+                    print(f"{path.name}: {component} v{version} ({updated_at}){pending}")
+        return
+
+    from rag.documents import registry, vector_store
+
+    print(f"{backfill_registry(registry, vector_store)} document(s) restored")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,481 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+try:
+    import fcntl
+except ImportError:  # Windows: only writers within one process are serialized.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_MANIFEST_FILE = "manifest.json"
+# flock target serializing writers across processes (several app workers ingesting).
+_LOCK_FILE = ".write.lock"
+# Single-file layout written before the manifest existed; migrated on first load.
+_LEGACY_VECTORS_FILE = "vectors.f32"
+_LEGACY_METADATA_FILE = "metadata.json"
+
+
+def _vectors_file(generation: int) -> str:
+    return f"vectors.{generation}.f32"
+
+
+def _metadata_file(generation: int) -> str:
+    return f"metadata.{generation}.jsonl"
+
+
+def _write_synced(path: Path, data: bytes, *, offset: int | None = None) -> None:
+    """Write `data` at `offset` (file truncated there first) or as the whole file, then fsync."""
+    if offset is None:
+        with path.open("wb") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        return
+    with path.open("r+b") as handle:
+        handle.truncate(offset)
+        handle.seek(offset)
+        handle.write(data)
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+def _metadata_lines(ids: list[str], texts: list[str], metadatas: list[dict[str, Any]]) -> bytes:
+    return b"".join(
+        json.dumps({"id": id_, "document": text, "metadata": meta}, ensure_ascii=True).encode("ascii") + b"\n"
+        for id_, text, meta in zip(ids, texts, metadatas)
+    )
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+_OPERATORS = {
+    "$eq": lambda value, expected: value == expected,
+    "$ne": lambda value, expected: value != expected,
+    "$in": lambda value, expected: value in expected,
+    "$nin": lambda value, expected: value not in expected,
+}
+
+
+def _matches(metadata: dict[str, Any], where: dict[str, Any] | None) -> bool:
+    """Evaluate the subset of Chroma `where` syntax used by the app: equality, $and/$or, $eq/$ne/$in/$nin."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(_matches(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(_matches(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            if not all(_OPERATORS[op](value, expected) for op, expected in condition.items()):
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class NumpyVectorStore(VectorStore):
+    """
+    Exact cosine search over L2-normalized float32 embeddings.
+
+    Vectors live in a raw memory-mapped matrix (`vectors.<generation>.f32`) and ids, texts
+    and metadata in a JSON-lines sidecar (`metadata.<generation>.jsonl`), one line per row.
+    `manifest.json` records the generation, row count and sidecar length and is replaced
+    last, so it is the commit point: new rows are appended to both files (O(rows added)),
+    and bytes past the manifest, left by an interrupted append, are ignored on load and
+    overwritten by the next one. Deletions and upserts write a new generation and swap the
+    manifest. Writers hold an exclusive flock on `.write.lock` and reload the manifest first
+    when another process committed since, so offsets and generations are never computed from
+    stale state. Queries are a single matmul against the matrix followed by `argpartition`,
+    so a batch of queries costs one BLAS call. Scores are cosine similarities (higher is better).
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        embedding_function: Embeddings,
+        collection_name: str = "documents",
+    ) -> None:
+        self._dir = Path(directory) / collection_name
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._manifest_path = self._dir / _MANIFEST_FILE
+        self._embedding = embedding_function
+        self._lock = threading.RLock()
+        self._ids: list[str] = []
+        self._texts: list[str] = []
+        self._metadatas: list[dict[str, Any]] = []
+        self._matrix: np.ndarray = np.zeros((0, 0), dtype=np.float32)
+        self._generation = 0
+        self._metadata_bytes = 0
+        self._manifest_stamp: tuple[int, int, int] | None = None
+        with self._write_lock():
+            self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Exclusive access to the store files, against threads of this process and other processes."""
+        with self._lock, (self._dir / _LOCK_FILE).open("a+b") as handle:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+    def _current_stamp(self) -> tuple[int, int, int] | None:
+        try:
+            stat = self._manifest_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self) -> None:
+        """Reload from disk when another process committed since this one last read or wrote."""
+        if self._current_stamp() == self._manifest_stamp:
+            return
+        self._ids, self._texts, self._metadatas = [], [], []
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._generation, self._metadata_bytes = 0, 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self._manifest_path.exists():
+            self._load_legacy()
+            return
+        manifest = json.loads(self._manifest_path.read_text(encoding="utf-8"))
+        generation, dim, rows = int(manifest["generation"]), int(manifest["dim"]), int(manifest["rows"])
+        vectors_path = self._dir / _vectors_file(generation)
+        metadata_path = self._dir / _metadata_file(generation)
+        with metadata_path.open("rb") as handle:
+            lines = handle.read(int(manifest["metadata_bytes"])).splitlines()
+        records = [json.loads(line) for line in lines]
+        vector_rows = vectors_path.stat().st_size // (4 * dim) if dim else 0  # tail past the manifest ignored
+        count = min(rows, len(records), vector_rows)
+        if count != rows:
+            logger.error(
+                "Vector store files are shorter than their manifest; keeping the consistent prefix.",
+                extra={"rows": rows, "vectors": vector_rows, "metadata": len(records), "dir": str(self._dir)},
+            )
+        self._generation = generation
+        self._ids = [record["id"] for record in records[:count]]
+        self._texts = [record["document"] for record in records[:count]]
+        self._metadatas = [record["metadata"] for record in records[:count]]
+        self._metadata_bytes = sum(len(line) + 1 for line in lines[:count])
+        self._manifest_stamp = self._current_stamp()
+        self._remap(dim)
+        if count != rows:
+            self._rewrite(np.array(self._matrix, dtype=np.float32))
+
+    def _load_legacy(self) -> None:
+        vectors_path = self._dir / _LEGACY_VECTORS_FILE
+        metadata_path = self._dir / _LEGACY_METADATA_FILE
+        if not metadata_path.exists() or not vectors_path.exists():
+            return
+        sidecar = json.loads(metadata_path.read_text(encoding="utf-8"))
+        ids, dim = sidecar.get("ids", []), int(sidecar.get("dim", 0))
+        if ids and dim:
+            count = min(vectors_path.stat().st_size // (4 * dim), len(ids))
+            matrix = np.fromfile(vectors_path, dtype=np.float32, count=count * dim).reshape(count, dim)
+            self._ids = ids[:count]
+            self._texts = sidecar.get("documents", [])[:count]
+            self._metadatas = sidecar.get("metadatas", [])[:count]
+            self._rewrite(matrix)
+            logger.info("Migrated vector store %s to the manifest layout (%d rows).", self._dir, count)
+        vectors_path.unlink()
+        metadata_path.unlink()
+
+    def _remap(self, dim: int) -> None:
+        count = len(self._ids)
+        path = self._dir / _vectors_file(self._generation)
+        self._matrix = (
+            np.memmap(path, dtype=np.float32, mode="r", shape=(count, dim))
+            if count
+            else np.zeros((0, dim), dtype=np.float32)
+        )
+
+    def _write_manifest(self, dim: int) -> None:
+        tmp = self._manifest_path.with_suffix(".tmp")
+        manifest = {
+            "generation": self._generation,
+            "dim": dim,
+            "rows": len(self._ids),
+            "metadata_bytes": self._metadata_bytes,
+        }
+        _write_synced(tmp, json.dumps(manifest).encode("utf-8"))
+        os.replace(tmp, self._manifest_path)
+        self._manifest_stamp = self._current_stamp()
+
+    def _rewrite(self, matrix: np.ndarray) -> None:
+        """Write every row into a new generation, commit it through the manifest, drop the old one."""
+        previous, generation = self._generation, self._generation + 1
+        dim = int(matrix.shape[1]) if matrix.ndim == 2 else 0
+        metadata = _metadata_lines(self._ids, self._texts, self._metadatas)
+        vectors = np.ascontiguousarray(matrix, np.float32).tobytes()
+        _write_synced(self._dir / _vectors_file(generation), vectors)
+        _write_synced(self._dir / _metadata_file(generation), metadata)
+        self._generation, self._metadata_bytes = generation, len(metadata)
+        self._write_manifest(dim)
+        for name in (_vectors_file(previous), _metadata_file(previous)):
+            (self._dir / name).unlink(missing_ok=True)
+        self._remap(dim)
+
+    def _append(self, vectors: np.ndarray, ids: list[str], texts: list[str], metadatas: list[dict]) -> None:
+        """Append rows to the current generation; only the manifest write makes them visible on load."""
+        rows, dim = len(self._ids), int(vectors.shape[1])
+        lines = _metadata_lines(ids, texts, metadatas)
+        _write_synced(
+            self._dir / _vectors_file(self._generation),
+            np.ascontiguousarray(vectors, np.float32).tobytes(),
+            offset=rows * dim * 4,
+        )
+        _write_synced(self._dir / _metadata_file(self._generation), lines, offset=self._metadata_bytes)
+        self._ids.extend(ids)
+        self._texts.extend(texts)
+        self._metadatas.extend(metadatas)
+        self._metadata_bytes += len(lines)
+        self._write_manifest(dim)
+        self._remap(dim)
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: list[dict] | None = None,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> list[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        ids = list(ids) if ids else [uuid.uuid4().hex for _ in texts]
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        last = {id_: idx for idx, id_ in enumerate(ids)}
+        if len(last) != len(ids):
+            # A repeated id is stored once, at its first position, with its last text and metadata.
+            keep = [last[id_] for id_ in dict.fromkeys(ids)]
+            ids = [ids[idx] for idx in keep]
+            texts = [texts[idx] for idx in keep]
+            metadatas = [metadatas[idx] for idx in keep]
+        vectors = _normalize(self._embedding.embed_documents(texts))
+
+        with self._write_lock():
+            self._refresh()
+            if len(self._ids) and self._matrix.shape[1] != vectors.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension {vectors.shape[1]} does not match "
+                    f"store dimension {self._matrix.shape[1]}."
+                )
+            positions = {id_: row for row, id_ in enumerate(self._ids)}
+            metadatas = [meta or {} for meta in metadatas]
+            if not self._ids or any(id_ in positions for id_ in ids):
+                # Upsert: existing ids are overwritten in place, new ids are appended, in a new generation.
+                matrix = np.array(self._matrix, dtype=np.float32) if self._ids else vectors[:0]
+                appended: list[np.ndarray] = []
+                for idx, id_ in enumerate(ids):
+                    row = positions.get(id_)
+                    if row is not None:
+                        matrix[row] = vectors[idx]
+                        self._texts[row] = texts[idx]
+                        self._metadatas[row] = metadatas[idx]
+                        continue
+                    positions[id_] = len(self._ids)
+                    self._ids.append(id_)
+                    self._texts.append(texts[idx])
+                    self._metadatas.append(metadatas[idx])
+                    appended.append(vectors[idx])
+                self._rewrite(np.vstack([matrix, *appended]) if appended else matrix)
+            else:
+                self._append(vectors, ids, texts, metadatas)
+        return ids
+
+    def delete(self, ids: list[str] | None = None, **kwargs: Any) -> bool:
+        where = kwargs.get("where")
+        if not ids and not where:
+            return False
+        with self._write_lock():
+            self._refresh()
+            targets = set(ids or [])
+            keep = [
+                row
+                for row, id_ in enumerate(self._ids)
+                if id_ not in targets and not (where and _matches(self._metadatas[row], where))
+            ]
+            if len(keep) == len(self._ids):
+                return True
+            matrix = np.array(self._matrix[keep], dtype=np.float32)
+            self._ids = [self._ids[row] for row in keep]
+            self._texts = [self._texts[row] for row in keep]
+            self._metadatas = [self._metadatas[row] for row in keep]
+            self._rewrite(matrix)
+        return True
+
+    def get(
+        self,
+        ids: list[str] | None = None,
+        where: dict[str, Any] | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        where_document: dict[str, Any] | None = None,
+        include: list[str] | None = None,
+    ) -> dict[str, Any]:
+        """Chroma-compatible `get` returning ids plus the requested fields."""
+        include = include or ["documents", "metadatas"]
+        with self._lock:
+            wanted = set(ids) if ids else None
+            rows = [
+                row
+                for row, id_ in enumerate(self._ids)
+                if (wanted is None or id_ in wanted) and _matches(self._metadatas[row], where)
+            ]
+            start = offset or 0
+            rows = rows[start : start + limit] if limit is not None else rows[start:]
+            result: dict[str, Any] = {"ids": [self._ids[row] for row in rows]}
+            result["documents"] = [self._texts[row] for row in rows] if "documents" in include else None
+            result["metadatas"] = [self._metadatas[row] for row in rows] if "metadatas" in include else None
+            result["embeddings"] = (
+                np.array(self._matrix[rows], dtype=np.float32) if "embeddings" in include else None
+            )
+        return result
+
+    def _column_mask(self, where: dict[str, Any] | None) -> np.ndarray | None:
+        if not where:
+            return None
+        return np.fromiter(
+            (_matches(meta, where) for meta in self._metadatas), dtype=bool, count=len(self._metadatas)
+        )
+
+    def similarity_search_by_vectors(
+        self,
+        embeddings: list[list[float]] | np.ndarray,
+        k: int = 4,
+        filter: dict[str, Any] | None = None,
+    ) -> list[list[tuple[Document, float]]]:
+        """Batched exact top-k: one matmul for all queries, then per-row argpartition."""
+        queries = _normalize(embeddings)
+        with self._lock:
+            count = len(self._ids)
+            if not count or k <= 0:
+                return [[] for _ in range(queries.shape[0])]
+            scores = queries @ self._matrix.T
+            mask = self._column_mask(filter)
+            if mask is not None:
+                scores[:, ~mask] = -np.inf
+                count = int(mask.sum())
+            k = min(k, count)
+            if k == 0:
+                return [[] for _ in range(queries.shape[0])]
+            if k < scores.shape[1]:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.tile(np.arange(scores.shape[1]), (scores.shape[0], 1))
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+            results: list[list[tuple[Document, float]]] = []
+            for rows, row_scores in zip(top, top_scores):
+                results.append(
+                    [
+                        (
+                            Document(page_content=self._texts[row], metadata=dict(self._metadatas[row])),
+                            float(score),
+                        )
+                        for row, score in zip(rows, row_scores)
+                        if np.isfinite(score)
+                    ]
+                )
+        return results
+
+    def similarity_search_by_vector(
+        self,
+        embedding: list[float],
+        k: int = 4,
+        filter: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> list[Document]:
+        return [doc for doc, _score in self.similarity_search_by_vectors([embedding], k, filter)[0]]
+
+    def similarity_search_with_score(
+        self,
+        query: str,
+        k: int = 4,
+        filter: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> list[tuple[Document, float]]:
+        embedding = self._embedding.embed_query(query)
+        return self.similarity_search_by_vectors([embedding], k, filter)[0]
+
+    def similarity_search(
+        self,
+        query: str,
+        k: int = 4,
+        filter: dict[str, Any] | None = None,
+        **kwargs: Any,
+    ) -> list[Document]:
+        return [doc for doc, _score in self.similarity_search_with_score(query, k, filter)]
+
+    def similarity_search_batch(
+        self,
+        queries: list[str],
+        k: int = 4,
+        filter: dict[str, Any] | None = None,
+    ) -> list[list[Document]]:
+        if not queries:
+            return []
+        embeddings = self._embedding.embed_documents(list(queries))
+        return [
+            [doc for doc, _score in hits]
+            for hits in self.similarity_search_by_vectors(embeddings, k, filter)
+        ]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity in [-1, 1] mapped to [0, 1].
+        return lambda score: (score + 1.0) / 2.0
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: list[str],
+        embedding: Embeddings,
+        metadatas: list[dict] | None = None,
+        ids: list[str] | None = None,
+        directory: str | Path | None = None,
+        collection_name: str = "documents",
+        **kwargs: Any,
+    ) -> "NumpyVectorStore":
+        if directory is None:
+            raise ValueError("NumpyVectorStore.from_texts requires a directory.")
+        store = cls(directory, embedding, collection_name=collection_name)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -1,6 +1,23 @@
-from rag.pipeline.contextualizer import contextualize_history, rewrite_question_with_history
-from rag.pipeline.qa import answer_question
-from rag.pipeline.safety import sanitize_question
+"""
+Question answering pipeline. Exports resolve on first access, so importing the package (or
+`rag.pipeline.safety`) does not load the retriever, the LLM client and LangChain.
+"""
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from rag.pipeline.contextualizer import contextualize_history, rewrite_question_with_history
+    from rag.pipeline.qa import answer_question
+    from rag.pipeline.safety import sanitize_question
+
+_EXPORTS = {
+    "answer_question": "rag.pipeline.qa",
+    "sanitize_question": "rag.pipeline.safety",
+    "contextualize_history": "rag.pipeline.contextualizer",
+    "rewrite_question_with_history": "rag.pipeline.contextualizer",
+}
 
 __all__ = [
     "answer_question",
@@ -8,3 +25,11 @@ __all__ = [
     "contextualize_history",
     "rewrite_question_with_history",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(_EXPORTS[name]), name)
+    globals()[name] = value
+    return value
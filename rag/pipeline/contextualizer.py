@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import logging
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from rag.config import HISTORY_MAX_CHARS, HISTORY_MAX_MESSAGES, REWRITE_MAX_MESSAGES
+from rag.telemetry import record_usage
+
+if TYPE_CHECKING:
+    from langchain_core.messages import AIMessage, HumanMessage
 
 
 def contextualize_history(
@@ -52,6 +55,8 @@ def rewrite_question_with_history(
     if not history:
         return question
 
+    from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
     normalized: list[HumanMessage | AIMessage] = []
     for msg in history[-max_messages:]:
         role = msg.get("role", "").strip().lower()
@@ -84,6 +89,7 @@ def rewrite_question_with_history(
 
     try:
         resp = llm.invoke([system_msg, *normalized, user_msg])
+        record_usage(resp)
         rewritten_raw = resp.content.strip()
         if not rewritten_raw:
             return question
@@ -1,15 +1,158 @@
 from __future__ import annotations
 
 import logging
+import re
+import threading
+import time
 from collections import defaultdict
 from dataclasses import dataclass
-from typing import ClassVar, List
+from typing import TYPE_CHECKING, Any, ClassVar, List
 
-from langchain.schema import Document
-from langchain_community.retrievers import BM25Retriever
+import numpy as np
 
-from rag.config import HYBRID_K, LEXICAL_WEIGHT
-from rag.vector_store import init_vector_store
+from rag.chunking import ARTICLE_PATTERN, PARAGRAPH_PATTERN, SECTION_PATTERN
+from rag.config import (
+    DENSE_CANDIDATE_MULTIPLIER,
+    HYBRID_K,
+    LEXICAL_WEIGHT,
+    ROUTER_ENABLED,
+    ROUTER_MIN_MARGIN,
+    ROUTER_MIN_SCORE,
+)
+from rag.profiling import profiled
+from rag.telemetry import stage
+from rag.vector_store import (
+    close_quantized_index,
+    init_quantized_index,
+    init_vector_store,
+    similarity_search_by_vectors,
+    where_filter,
+)
+
+if TYPE_CHECKING:
+    # Imported on first use (index rebuild, result building) to keep `import rag.pipeline` cheap.
+    from langchain_community.retrievers import BM25Retriever
+    from langchain_core.documents import Document
+
+
+def _build_postings(vectorizer) -> dict[str, tuple[np.ndarray, np.ndarray]]:
+    """
+    Invert a rank_bm25 BM25Okapi model into term -> (doc indices, BM25 term weights).
+    Scoring a query then only touches documents that contain its terms.
+    """
+    k1, b, avgdl = vectorizer.k1, vectorizer.b, vectorizer.avgdl or 1.0
+    raw: dict[str, tuple[list[int], list[float]]] = defaultdict(lambda: ([], []))
+    for doc_idx, (freqs, doc_len) in enumerate(zip(vectorizer.doc_freqs, vectorizer.doc_len)):
+        norm = k1 * (1 - b + b * doc_len / avgdl)
+        for term, tf in freqs.items():
+            idxs, weights = raw[term]
+            idxs.append(doc_idx)
+            weights.append(vectorizer.idf.get(term, 0.0) * tf * (k1 + 1) / (tf + norm))
+    return {
+        term: (np.asarray(idxs, dtype=np.int64), np.asarray(weights, dtype=np.float32))
+        for term, (idxs, weights) in raw.items()
+    }
+
+
+def _metadata_matches(metadata: dict[str, Any], filters: dict[str, Any]) -> bool:
+    """Plain metadata filters (see `rag.vector_store.where_filter`): equality, or membership for lists."""
+    for key, expected in filters.items():
+        value = metadata.get(key)
+        if isinstance(expected, (list, tuple, set)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+class QueryRouter:
+    """
+    Sends citation-style and identifier-heavy queries to BM25 alone when the lexical
+    ranking is unambiguous, skipping the embeddings call of the dense branch.
+    Keeps per-route counts and cumulative latency.
+    """
+
+    REFERENCE_PATTERNS: ClassVar[dict[str, re.Pattern[str]]] = {
+        "article": re.compile(
+            rf"{ARTICLE_PATTERN}|\b(?:art\.?|article)\s*[LRD]?\.?\s*\d+(?:[._-]\d+)*", re.IGNORECASE
+        ),
+        "structure": re.compile(rf"{SECTION_PATTERN}|{PARAGRAPH_PATTERN}"),
+        "case_number": re.compile(
+            r"\b(?:n[°o]\s*)?\d{2}-\d{2}\.\d{3}\b|\bcass\.?\s*(?:com|civ|soc|crim)\b|\bRG\s*\d+",
+            re.IGNORECASE,
+        ),
+        "invoice_or_client": re.compile(
+            r"\b(?:facture|invoice|fact|FAC|INV)\s*(?:n[°o]\s*|#)?[A-Z0-9-]*\d[A-Z0-9-]*"
+            # A client reference needs an identifier: after a n°/#, or a token with a digit.
+            r"|\bclient\s*(?:(?:n°|no\b\.?|#)\s*[A-Z0-9][\w-]*|[A-Z-]*\d[\w-]*)",
+            re.IGNORECASE,
+        ),
+    }
+    IDENTIFIER_TOKEN_RE: ClassVar[re.Pattern[str]] = re.compile(r"\d")
+
+    def __init__(
+        self,
+        *,
+        min_score: float = ROUTER_MIN_SCORE,
+        min_margin: float = ROUTER_MIN_MARGIN,
+        identifier_ratio: float = 0.4,
+    ) -> None:
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.identifier_ratio = identifier_ratio
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = defaultdict(int)
+        self._seconds: dict[str, float] = defaultdict(float)
+
+    def reference_kind(self, query: str) -> str | None:
+        """Name of the reference pattern the query matches, or None for free-text questions."""
+        for kind, pattern in self.REFERENCE_PATTERNS.items():
+            if pattern.search(query):
+                return kind
+        tokens = query.split()
+        with_digits = sum(bool(self.IDENTIFIER_TOKEN_RE.search(token)) for token in tokens)
+        if tokens and with_digits / len(tokens) >= self.identifier_ratio:
+            return "identifiers"
+        return None
+
+    def is_confident(self, scores: np.ndarray) -> bool:
+        """True when the best BM25 hit is strong and clearly ahead of the runner-up."""
+        if scores.size == 0:
+            return False
+        if scores.size == 1:
+            return float(scores[0]) >= self.min_score
+        top_two = np.partition(scores, scores.size - 2)[-2:]
+        second, best = float(top_two[0]), float(top_two[1])
+        if best <= 0:
+            return False
+        return best >= self.min_score and (best - second) / best >= self.min_margin
+
+    def record(self, route: str, seconds: float) -> None:
+        with self._lock:
+            self._counts[route] += 1
+            self._seconds[route] += seconds
+
+    def report(self) -> dict[str, dict[str, Any]]:
+        """Per-route {"count", "total_ms", "mean_ms"}."""
+        with self._lock:
+            return {
+                route: {
+                    "count": count,
+                    "total_ms": round(self._seconds[route] * 1000, 3),
+                    "mean_ms": round(self._seconds[route] * 1000 / count, 3),
+                }
+                for route, count in self._counts.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._seconds.clear()
+
+
+# Shared by every HybridRetriever so route statistics cover the whole process.
+query_router = QueryRouter()
 
 
 @dataclass
@@ -23,22 +166,43 @@ class HybridRetriever:
     _bm25_docs: ClassVar[List[Document]] = []
     _bm25_ready: ClassVar[bool] = False
     _bm25_stale: ClassVar[bool] = True
+    _bm25_postings: ClassVar[dict[str, tuple[np.ndarray, np.ndarray]]] = {}
+    # Serializes rebuilds: a request arriving during the warm-up (rag.warmup) waits for it instead
+    # of building the same index a second time.
+    _bm25_lock: ClassVar[threading.RLock] = threading.RLock()
+    # Bumped by notify_docs_changed; a rebuild that started before the bump discards its result.
+    # The short state lock makes the check-and-publish atomic against a concurrent reset.
+    _bm25_generation: ClassVar[int] = 0
+    _bm25_state_lock: ClassVar[threading.Lock] = threading.Lock()
 
     def __post_init__(self) -> None:
         vector_store = init_vector_store()
-        self._dense = vector_store.as_retriever(search_kwargs={"k": self.dense_k * 2})
+        self._dense = vector_store.as_retriever(
+            search_kwargs={"k": self.dense_k * DENSE_CANDIDATE_MULTIPLIER}
+        )
 
     @classmethod
     def notify_docs_changed(cls) -> None:
-        cls._bm25 = None
-        cls._bm25_docs = []
-        cls._bm25_ready = False
-        cls._bm25_stale = True
+        # The compressed index is reopened too; its files are cleared by whoever changed the corpus.
+        close_quantized_index()
+        with cls._bm25_state_lock:
+            cls._bm25_generation += 1
+            cls._bm25 = None
+            cls._bm25_docs = []
+            cls._bm25_ready = False
+            cls._bm25_stale = True
+            cls._bm25_postings = {}
 
     @classmethod
+    @profiled("rebuild_bm25_index")
     def _rebuild_bm25_index(cls, lexical_k: int) -> None:
-        cls._bm25_ready = False
-        cls._bm25_stale = True
+        from langchain_community.retrievers import BM25Retriever
+        from langchain_core.documents import Document
+
+        generation = cls._bm25_generation
+        docs: List[Document] = []
+        bm25: BM25Retriever | None = None
+        postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
         try:
             vector_store = init_vector_store()
             data = vector_store.get(include=["documents", "metadatas"])
@@ -46,12 +210,6 @@ class HybridRetriever:
             metadatas = data.get("metadatas", []) or []
             ids = data.get("ids", []) or []
 
-            cls._bm25_docs = []
-            if not texts:
-                cls._bm25 = None
-                cls._bm25_stale = False
-                return
-
             for idx, text in enumerate(texts):
                 meta = (metadatas[idx] if idx < len(metadatas) else {}) or {}
                 id_ = ids[idx] if idx < len(ids) else None
@@ -59,30 +217,36 @@ class HybridRetriever:
                 if not chunk_id:
                     chunk_id = id_ or text[:50]
                 merged_meta = {**meta, "chunk_id": chunk_id}
-                cls._bm25_docs.append(Document(page_content=text, metadata=merged_meta))
+                docs.append(Document(page_content=text, metadata=merged_meta))
 
-            cls._bm25 = BM25Retriever.from_documents(cls._bm25_docs)
-            cls._bm25.k = lexical_k * 2
-            cls._bm25_ready = True
-            cls._bm25_stale = False
+            if docs:
+                bm25 = BM25Retriever.from_documents(docs)
+                bm25.k = lexical_k * 2
+                postings = _build_postings(bm25.vectorizer)
         except Exception:
             logging.exception("Failed to rebuild BM25 index; lexical search disabled.")
-            cls._bm25_docs = []
-            cls._bm25 = None
-            cls._bm25_ready = False
+            docs, bm25, postings = [], None, {}
+
+        with cls._bm25_state_lock:
+            if generation != cls._bm25_generation:
+                # The corpus changed while reading it: stay stale so the next request rebuilds.
+                return
+            cls._bm25_docs = docs
+            cls._bm25_postings = postings
+            cls._bm25 = bm25
+            cls._bm25_ready = bm25 is not None
             cls._bm25_stale = False
 
+    @classmethod
+    def _bm25_needs_rebuild(cls) -> bool:
+        return cls._bm25_stale or not cls._bm25_ready or not cls._bm25_docs or not cls._bm25
+
     def _ensure_bm25(self) -> None:
-        if (
-            self.__class__._bm25_stale
-            or not self.__class__._bm25_ready
-            or not self.__class__._bm25_docs
-            or not self.__class__._bm25
-        ):
-            self.__class__._rebuild_bm25_index(self.lexical_k)
-        elif self.__class__._bm25:
-            # Keep k in sync with the latest lexical_k
-            self.__class__._bm25.k = self.lexical_k * 2
+        cls = self.__class__
+        if cls._bm25_needs_rebuild():
+            with cls._bm25_lock:
+                if cls._bm25_needs_rebuild():
+                    cls._rebuild_bm25_index(self.lexical_k)
 
     def _fuse(self, dense_docs: List[Document], lexical_docs: List[Document], k: int) -> List[Document]:
         # Reciprocal Rank Fusion with optional lexical weighting.
@@ -118,8 +282,115 @@ class HybridRetriever:
                 break
         return fused
 
+    def _dense_search(self, query: str, filters: dict[str, Any] | None = None) -> List[Document]:
+        n = self.dense_k * DENSE_CANDIDATE_MULTIPLIER
+        if filters:
+            # The compressed index carries no metadata, so filtered queries go to the vector store.
+            return init_vector_store().similarity_search(query, k=n, filter=where_filter(filters))
+        # Prefer the compressed index when enabled: first pass on codes, exact rescoring on float32.
+        index = init_quantized_index()
+        if index is None or not len(index):
+            return self._dense.invoke(query) or []
+        embedding = init_vector_store().embeddings.embed_query(query)
+        return self._docs_for_hits(index.search([embedding], n))[0]
+
+    def _dense_search_batch(
+        self, queries: List[str], filters: dict[str, Any] | None = None
+    ) -> List[List[Document]]:
+        # One embeddings request for every query, then one batched nearest-neighbour call.
+        vector_store = init_vector_store()
+        embeddings = vector_store.embeddings.embed_documents(list(queries))
+        n = self.dense_k * DENSE_CANDIDATE_MULTIPLIER
+        index = None if filters else init_quantized_index()
+        if index is not None and len(index):
+            return self._docs_for_hits(index.search(embeddings, n))
+        return similarity_search_by_vectors(vector_store, embeddings, n, where_filter(filters))
+
+    @staticmethod
+    def _docs_for_hits(hits_per_query: List[List[tuple[str, float]]]) -> List[List[Document]]:
+        from langchain_core.documents import Document
+
+        ids = list(dict.fromkeys(id_ for hits in hits_per_query for id_, _score in hits))
+        if not ids:
+            return [[] for _ in hits_per_query]
+        data = init_vector_store().get(ids=ids, include=["documents", "metadatas"])
+        found = {
+            id_: (text, meta or {})
+            for id_, text, meta in zip(data.get("ids", []), data.get("documents", []), data.get("metadatas", []))
+        }
+        return [
+            [
+                Document(page_content=found[id_][0], metadata=found[id_][1])
+                for id_, _score in hits
+                if id_ in found
+            ]
+            for hits in hits_per_query
+        ]
+
+    @classmethod
+    def _lexical_scores(cls, queries: List[str]) -> np.ndarray:
+        """BM25 scores of every indexed chunk for each query, shape (len(queries), n_chunks)."""
+        scores = np.zeros((len(queries), len(cls._bm25_docs)), dtype=np.float32)
+        if cls._bm25 is None:
+            return scores
+        postings = cls._bm25_postings
+        for row, query in enumerate(queries):
+            for token in cls._bm25.preprocess_func(query):
+                hit = postings.get(token)
+                if hit is not None:
+                    scores[row, hit[0]] += hit[1]
+        return scores
+
+    @classmethod
+    def _filter_mask(cls, filters: dict[str, Any] | None) -> np.ndarray | None:
+        """Boolean mask over the indexed chunks matching `filters`, or None when unfiltered."""
+        if not filters:
+            return None
+        return np.fromiter(
+            (_metadata_matches(doc.metadata or {}, filters) for doc in cls._bm25_docs),
+            dtype=bool,
+            count=len(cls._bm25_docs),
+        )
+
+    @classmethod
+    def _top_lexical(cls, scores: np.ndarray, n: int) -> List[Document]:
+        """Chunks with the n highest BM25 scores, best first, ignoring non-matching chunks."""
+        docs = cls._bm25_docs
+        n = min(n, scores.size)
+        if n <= 0:
+            return []
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [docs[idx] for idx in top if scores[idx] > 0]
+
+    def _route_lexical(
+        self, query: str, k: int, filters: dict[str, Any] | None = None
+    ) -> List[Document] | None:
+        """Lexical-only answer for reference queries with an unambiguous BM25 ranking, else None."""
+        if not ROUTER_ENABLED or query_router.reference_kind(query) is None:
+            return None
+        if not self.__class__._bm25 or not self.__class__._bm25_docs:
+            return None
+        scores = self._lexical_scores([query])[0]
+        mask = self._filter_mask(filters)
+        if mask is not None:
+            scores = np.where(mask, scores, 0.0)
+        if not query_router.is_confident(scores):
+            return None
+        return self._top_lexical(scores, k)
+
+    def _lexical_search(self, query: str, filters: dict[str, Any] | None = None) -> List[Document]:
+        """BM25 candidates for `query`, ranked exactly as `batch` ranks them."""
+        scores = self._lexical_scores([query])[0]
+        mask = self._filter_mask(filters)
+        if mask is not None:
+            scores = np.where(mask, scores, 0.0)
+        return self._top_lexical(scores, self.lexical_k * 2)
+
     @staticmethod
     def _normalize_docs(raw_docs: List[Document | str]) -> List[Document]:
+        from langchain_core.documents import Document
+
         normalized: List[Document] = []
         for item in raw_docs:
             if isinstance(item, Document):
@@ -129,29 +400,59 @@ class HybridRetriever:
                 normalized.append(Document(page_content=text, metadata={"chunk_id": text[:50]}))
         return normalized
 
-    def invoke(self, query: str, *, k: int) -> List[Document]:
+    def _lexical_disabled(self) -> bool:
+        # Support tests or callers that explicitly disable lexical retrieval.
+        return "_bm25_ready" in self.__dict__ and self.__dict__["_bm25_ready"] is False
+
+    def invoke(self, query: str, *, k: int, filters: dict[str, Any] | None = None) -> List[Document]:
+        """
+        Fused dense + BM25 results for `query`. `filters` restricts both branches to chunks whose
+        metadata match (e.g. `{"doc_id": "..."}`, or a list of accepted values).
+        """
+        started = time.perf_counter()
         dense_docs: List[Document] = []
         lexical_docs: List[Document] = []
 
+        if not self._lexical_disabled():
+            if self._bm25_needs_rebuild():
+                # Timed apart so a rebuild after a corpus change is not reported as routing or search.
+                with stage("bm25_index"):
+                    self._ensure_bm25()
+            try:
+                # Its own stage: the lexical search below is recorded once per trace as "bm25".
+                with stage("route"):
+                    routed = self._route_lexical(query, k, filters)
+            except Exception:
+                logging.exception("Query routing failed; using hybrid retrieval.")
+                routed = None
+            if routed:
+                query_router.record("lexical", time.perf_counter() - started)
+                return routed
+
         try:
-            dense_docs = self._dense.invoke(query) or []
+            with stage("dense"):
+                dense_docs = self._dense_search(query, filters)
         except Exception:
             logging.exception("Dense retrieval failed.")
 
-        # Support tests or callers that explicitly disable lexical retrieval.
-        if "_bm25_ready" in self.__dict__ and self.__dict__["_bm25_ready"] is False:
+        if self._lexical_disabled():
+            query_router.record("dense", time.perf_counter() - started)
             return dense_docs[:k]
 
-        self._ensure_bm25()
-        bm25 = self.__class__._bm25
-        if bm25 and self.__class__._bm25_docs:
-            try:
-                bm25.k = self.lexical_k * 2
-                lexical_docs = bm25.invoke(query) or []
-            except Exception:
-                logging.exception("Lexical retrieval failed; continuing with dense only.")
-                lexical_docs = []
+        with stage("bm25"):
+            if self.__class__._bm25 and self.__class__._bm25_docs:
+                try:
+                    lexical_docs = self._lexical_search(query, filters)
+                except Exception:
+                    logging.exception("Lexical retrieval failed; continuing with dense only.")
+                    lexical_docs = []
+
+        with stage("fusion"):
+            fused = self._combine(dense_docs, lexical_docs, k)
+        query_router.record("hybrid", time.perf_counter() - started)
+        return fused
 
+    def _combine(self, dense_docs: List[Document], lexical_docs: List[Document], k: int) -> List[Document]:
         lexical_docs = self._normalize_docs(lexical_docs)
 
         if dense_docs and lexical_docs:
@@ -162,3 +463,51 @@ class HybridRetriever:
         if lexical_docs:
             return lexical_docs[:k]
         return []
+
+    def batch(
+        self, queries: List[str], k: int, filters: dict[str, Any] | None = None
+    ) -> List[List[Document]]:
+        """
+        Retrieve for many queries at once: a vectorized BM25 pass over the inverted index,
+        lexical-only answers for confidently routed reference queries, then a single
+        embeddings request and one batched dense search for the rest, fused per query.
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        started = time.perf_counter()
+        results: List[List[Document] | None] = [None] * len(queries)
+        routes = ["dense" if self._lexical_disabled() else "hybrid"] * len(queries)
+        lexical_results: List[List[Document]] = [[] for _ in queries]
+
+        if not self._lexical_disabled():
+            self._ensure_bm25()
+            try:
+                scores = self._lexical_scores(queries)
+                mask = self._filter_mask(filters)
+                if mask is not None:
+                    scores = np.where(mask, scores, 0.0)
+                for idx, (query, row) in enumerate(zip(queries, scores)):
+                    lexical_results[idx] = self._top_lexical(row, self.lexical_k * 2)
+                    routable = ROUTER_ENABLED and query_router.reference_kind(query) is not None
+                    if routable and query_router.is_confident(row):
+                        results[idx] = self._top_lexical(row, k)
+                        routes[idx] = "lexical"
+            except Exception:
+                logging.exception("Batched lexical retrieval failed; continuing with dense only.")
+
+        pending = [idx for idx, result in enumerate(results) if result is None]
+        dense_results: dict[int, List[Document]] = {}
+        if pending:
+            try:
+                dense = self._dense_search_batch([queries[idx] for idx in pending], filters)
+                dense_results = dict(zip(pending, dense))
+            except Exception:
+                logging.exception("Batched dense retrieval failed.")
+        for idx in pending:
+            results[idx] = self._combine(dense_results.get(idx, []), lexical_results[idx], k)
+
+        share = (time.perf_counter() - started) / len(queries)
+        for route in routes:
+            query_router.record(route, share)
+        return [result or [] for result in results]
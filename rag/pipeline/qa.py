@@ -3,20 +3,52 @@ from __future__ import annotations
 import logging
 import re
 from functools import lru_cache
-from pathlib import Path
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-
-from rag.config import DEFAULT_TOP_K, LLM_MODEL_NAME, OPENAI_API_KEY
+from rag.config import DEFAULT_TOP_K, OPENAI_API_KEY
 from rag.pipeline.contextualizer import contextualize_history, rewrite_question_with_history
-from rag.pipeline.hybrid_retriever import HybridRetriever
-from rag.pipeline.safety import sanitize_question
+from rag.profiling import profiled
+from rag.resources import get_resource_manager
+from rag.telemetry import record_usage, stage
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import Runnable, RunnableConfig
+
+    from rag.clients import PooledChatOpenAI
 
 logger = logging.getLogger(__name__)
 
+# Static instructions first and the per-request parts (context, summary, question) last, so every
+# call shares the same prompt prefix. That prefix is ~60 tokens: provider prompt caching only starts
+# at 1024 static tokens, so the ordering alone does not make any of it cacheable.
+QA_SYSTEM_PROMPT = (
+    "You are a legal assistant. Use the conversation summary and the retrieved context to answer. "
+    "If the answer is not in the provided documents, say you cannot answer from the available documents. "
+    "Keep responses concise and cite sources using [index] matching the context blocks."
+)
+
+QA_USER_TEMPLATE = "Context:\n{context}\n\nConversation summary:\n{history_summary}\n\nQuestion: {question}"
+
+
+def _generate(prompt_value: Any, config: RunnableConfig) -> Any:
+    # The model is resolved per call so the compiled chain can be shared by every request.
+    llm = (config.get("configurable") or {}).get("llm") or _get_llm()
+    return llm.invoke(prompt_value, config=config)
+
+
+@lru_cache(maxsize=1)
+def get_qa_chain() -> Runnable:
+    """
+    Compiled once, on the first question rather than at import (LangChain is slow to import);
+    `answer_question` passes its model through `configurable["llm"]`.
+    """
+    from langchain_core.prompts import ChatPromptTemplate
+    from langchain_core.runnables import RunnableLambda
+
+    prompt = ChatPromptTemplate.from_messages([("system", QA_SYSTEM_PROMPT), ("user", QA_USER_TEMPLATE)])
+    return prompt | RunnableLambda(_generate)
+
+
 def _format_docs(docs: list[Any]) -> str:
     lines: list[str] = []
     for idx, doc in enumerate(docs, start=1):
@@ -46,63 +78,68 @@ def _has_citation(text: str) -> bool:
 
 
 @lru_cache(maxsize=1)
-def _get_llm() -> ChatOpenAI:
+def _get_llm() -> PooledChatOpenAI:
     if not OPENAI_API_KEY:
         logging.error("OPENAI_API_KEY is missing; cannot initialize ChatOpenAI.")
         raise ValueError("OPENAI_API_KEY is required to run the QA pipeline.")
-    return ChatOpenAI(
-        api_key=OPENAI_API_KEY,
-        model=LLM_MODEL_NAME,
-        temperature=0,
-    )
+    from rag.clients import get_chat_model
+
+    return get_chat_model()
 
 
+@profiled("answer_question")
 def answer_question(
     question: str,
     top_k: int = DEFAULT_TOP_K,
     history: list[dict[str, Any]] | None = None,
     llm=None,
+    filters: dict[str, Any] | None = None,
+    history_summary: str | None = None,
 ) -> tuple[str, list[dict[str, Any]]]:
     """
     Run retrieval-augmented QA and return (answer, sources).
     Sources are lightweight dicts with doc_id, source_path, chunk_index, doc_format.
+    `filters` restricts retrieval to chunks whose metadata match (e.g. {"doc_id": ...}).
+    `history_summary` (e.g. `ConversationStore.get_summary`) replaces the summary otherwise
+    recomputed from `history`, which is then only used to rewrite the question.
     """
     cleaned_question = question.strip()
     if not cleaned_question:
         return "La requête est vide.", []
 
     history_records = history or []
-    history_summary = contextualize_history(history_records)
+    with stage("contextualize"):
+        if history_summary is None:
+            history_summary = contextualize_history(history_records)
+        elif not history_summary.strip():
+            history_summary = "Aucun historique pertinent."
 
     llm = llm or _get_llm()
-    rewritten_question = rewrite_question_with_history(cleaned_question, history_records, llm)
+    with stage("rewrite"):
+        rewritten_question = rewrite_question_with_history(cleaned_question, history_records, llm)
 
-    retriever = HybridRetriever(dense_k=top_k, lexical_k=top_k)
-    docs = retriever.invoke(rewritten_question, k=top_k)
+    # Shared per process and top_k (rag.resources) instead of a new retriever per question.
+    retriever = get_resource_manager().retriever(top_k)
+    docs = retriever.invoke(rewritten_question, k=top_k, filters=filters)
     if not docs:
         logger.warning("No documents available for retrieval.")
         return "Aucun document disponible pour répondre à la question.", []
 
     context = _format_docs(docs)
-    prompt = ChatPromptTemplate.from_messages(
-        [
-            (
-                "system",
-                "You are a legal assistant. Use the conversation summary and the retrieved context to answer. "
-                "If the answer is not in the provided documents, say you cannot answer from the available documents. "
-                "Keep responses concise and cite sources using [index] matching the context blocks.",
-            ),
-            (
-                "user",
-                "Conversation summary:\n{history_summary}\n\nQuestion: {question}\n\nContext:\n{context}",
-            ),
-        ]
-    )
-    chain = prompt | llm | StrOutputParser()
-    answer = chain.invoke(
-        {"question": cleaned_question, "context": context, "history_summary": history_summary}
-    )
-    answer = answer.strip()
+    with stage("generation"):
+        response = get_qa_chain().invoke(
+            {"question": cleaned_question, "context": context, "history_summary": history_summary},
+            config={"configurable": {"llm": llm}},
+        )
+        usage = record_usage(response)
+    answer = str(getattr(response, "content", response)).strip()
+    if usage["prompt_tokens"]:
+        logger.info(
+            "QA generation used %d prompt tokens (%d served from the provider cache), %d completion tokens.",
+            usage["prompt_tokens"],
+            usage["cached_tokens"],
+            usage["completion_tokens"],
+        )
 
     if not _has_citation(answer):
         logger.warning("Answer missing citations; refusing to respond without sources.")
@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import csv
 import logging
-from bs4 import BeautifulSoup
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -39,6 +38,8 @@ def _preprocess_csv(path: Path) -> str:
 
 
 def _preprocess_html_for_rag(path: Path) -> str:
+    from bs4 import BeautifulSoup
+
     raw = path.read_text(encoding="utf-8", errors="ignore")
     soup = BeautifulSoup(raw, "html.parser")
 
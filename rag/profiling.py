@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import argparse
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Iterator, TypeVar
+
+from rag.config import PROFILE_MAX_FILES, PROFILE_MIN_MS, PROFILE_MODE, PROFILE_SAMPLE_RATE, PROFILES_DIR
+from rag.telemetry import current_trace
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+PROFILE_MODES = ("off", "cprofile", "tracemalloc", "both")
+TRACEMALLOC_TOP = 30
+
+# Set while a profiled call runs, so nested profiled functions do not start a second profiler.
+_active: ContextVar[bool] = ContextVar("rag_profiling_active", default=False)
+_forced: ContextVar[str | None] = ContextVar("rag_profiling_forced", default=None)
+
+# tracemalloc is process-wide: start it once for the first traced call, stop after the last one.
+_tracemalloc_lock = threading.Lock()
+_tracemalloc_users = 0
+
+
+@contextmanager
+def force_profiling(mode: str = "both") -> Iterator[None]:
+    """Profile every `profiled` call in this context, regardless of PROFILE_MODE and sampling."""
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unsupported profile mode: {mode}")
+    token = _forced.set(mode)
+    try:
+        yield
+    finally:
+        _forced.reset(token)
+
+
+def _selected_mode() -> str:
+    forced = _forced.get()
+    if forced is not None:
+        return forced
+    mode = PROFILE_MODE if PROFILE_MODE in PROFILE_MODES else "off"
+    if mode == "off" or PROFILE_SAMPLE_RATE <= 0:
+        return "off"
+    if PROFILE_SAMPLE_RATE < 1 and random.random() >= PROFILE_SAMPLE_RATE:
+        return "off"
+    return mode
+
+
+def _start_tracemalloc() -> None:
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        if _tracemalloc_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        _tracemalloc_users += 1
+
+
+def _stop_tracemalloc() -> None:
+    global _tracemalloc_users
+    with _tracemalloc_lock:
+        _tracemalloc_users -= 1
+        if _tracemalloc_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def _profile_path(name: str, elapsed_ms: float, suffix: str) -> Path:
+    trace = current_trace()
+    tag = trace.trace_id[:12] if trace else f"{os.getpid()}-{threading.get_ident()}"
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S%f")
+    return PROFILES_DIR / f"{stamp}_{name}_{tag}_{int(elapsed_ms)}ms{suffix}"
+
+
+def _rotate(directory: Path, max_files: int) -> None:
+    files = sorted(
+        (path for path in directory.glob("*") if path.is_file()),
+        key=lambda path: path.stat().st_mtime,
+    )
+    for path in files[: max(len(files) - max_files, 0)]:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _write_memory_report(path: Path, snapshot: tracemalloc.Snapshot, peak: int) -> None:
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )
+    )
+    lines = [f"peak traced memory: {peak / 1024:.1f} KiB", ""]
+    for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+        lines.append(str(stat))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+def profiled(name: str) -> Callable[[F], F]:
+    """
+    Profile calls of the decorated function according to PROFILE_MODE / PROFILE_SAMPLE_RATE
+    (or `force_profiling`). cProfile stats go to `<name>...ms.prof` and tracemalloc's top
+    allocations to `<name>...ms.mem.txt` under PROFILES_DIR; unsampled calls only pay for
+    one random draw.
+    """
+
+    def decorator(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _active.get():
+                return fn(*args, **kwargs)
+            mode = _selected_mode()
+            if mode == "off":
+                return fn(*args, **kwargs)
+
+            token = _active.set(True)
+            profiler = cProfile.Profile() if mode in {"cprofile", "both"} else None
+            traced = mode in {"tracemalloc", "both"}
+            if traced:
+                _start_tracemalloc()
+                tracemalloc.reset_peak()
+            started = time.perf_counter()
+            if profiler is not None:
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Python 3.12+ allows one cProfile per interpreter; skip while another thread profiles.
+                    profiler = None
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                if profiler is not None:
+                    profiler.disable()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                snapshot = tracemalloc.take_snapshot() if traced else None
+                peak = tracemalloc.get_traced_memory()[1] if traced else 0
+                if traced:
+                    _stop_tracemalloc()
+                _active.reset(token)
+                if elapsed_ms >= PROFILE_MIN_MS or _forced.get() is not None:
+                    try:
+                        PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+                        if profiler is not None:
+                            profiler.dump_stats(_profile_path(name, elapsed_ms, ".prof"))
+                        if snapshot is not None:
+                            _write_memory_report(_profile_path(name, elapsed_ms, ".mem.txt"), snapshot, peak)
+                        _rotate(PROFILES_DIR, PROFILE_MAX_FILES)
+                    except Exception:
+                        logger.exception("Failed to write profile for %s", name)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def summarize(path: str | Path, *, sort: str = "cumulative", limit: int = 30) -> str:
+    """Readable top functions of a `.prof` file."""
+    stream = io.StringIO()
+    pstats.Stats(str(path), stream=stream).strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Inspect profiles written under data/profiles.")
+    parser.add_argument("profile", nargs="?", help="Profile file; defaults to the most recent .prof.")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key (cumulative, tottime...).")
+    parser.add_argument("--limit", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    path = Path(args.profile) if args.profile else None
+    if path is None:
+        candidates = sorted(PROFILES_DIR.glob("*.prof"), key=lambda item: item.stat().st_mtime)
+        if not candidates:
+            parser.error(f"No profiles found in {PROFILES_DIR}")
+        path = candidates[-1]
+    print(path)
+    print(summarize(path, sort=args.sort, limit=args.limit))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("int8", "binary")
+
+# Rows scored per block during the first pass; bounds temporary memory for large corpora.
+_BLOCK_ROWS = 65536
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+# Full-precision vectors for a list of ids, one row per id in that order (zeros for unknown ids).
+VectorLookup = Callable[[list[str]], Any]
+
+
+def _normalize(matrix: Any) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def array_lookup(ids: list[str], vectors: Any) -> VectorLookup:
+    """VectorLookup over an in-memory matrix, for benchmarks and tests without a vector store."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    rows = {id_: row for row, id_ in enumerate(ids)}
+
+    def lookup(wanted: list[str]) -> np.ndarray:
+        found = np.zeros((len(wanted), vectors.shape[1]), dtype=np.float32)
+        for position, id_ in enumerate(wanted):
+            if id_ in rows:
+                found[position] = vectors[rows[id_]]
+        return found
+
+    return lookup
+
+
+def _atomic_save(path: Path, array: np.ndarray) -> None:
+    # Other processes may have the previous file memory-mapped: replace it, never truncate it.
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as handle:
+        np.save(handle, array)
+    os.replace(tmp, path)
+
+
+def exact_search(vectors: np.ndarray, queries: Any, k: int) -> np.ndarray:
+    """Brute-force cosine top-k row indices, used as ground truth for recall."""
+    scores = _normalize(queries) @ np.asarray(vectors, dtype=np.float32).T
+    k = min(k, scores.shape[1])
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+
+class QuantizedIndex:
+    """
+    Compressed first-pass vector index with full-precision rescoring.
+
+    Codes are either int8 scalar-quantized vectors (one scale per dimension) or
+    1-bit sign codes packed 8 per byte. A query scores every code, keeps the best
+    `k * rescore_multiplier` candidates and rescores only those rows with the
+    float32 vectors returned by `lookup`, i.e. read back from the vector store that
+    already holds them: the index stores no second full-precision copy. Codes are
+    opened with mmap so several workers share the same pages.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        mode: str = "int8",
+        rescore_multiplier: int = 4,
+        lookup: VectorLookup | None = None,
+    ) -> None:
+        if mode not in QUANTIZATION_MODES:
+            raise ValueError(f"Unsupported quantization mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.rescore_multiplier = max(rescore_multiplier, 1)
+        self.lookup = lookup
+        self.ids: list[str] = []
+        self.dim = 0
+        self._codes: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+        self._stamp: tuple[int, int] | None = None
+
+    @property
+    def _codes_path(self) -> Path:
+        return self.directory / f"codes_{self.mode}.npy"
+
+    @property
+    def _scales_path(self) -> Path:
+        return self.directory / "scales.npy"
+
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / f"index_{self.mode}.json"
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def build(self, ids: list[str], embeddings: Any) -> None:
+        embeddings = np.asarray(embeddings, dtype=np.float32) if len(ids) else np.zeros((0, 0), np.float32)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        dim = int(embeddings.shape[1]) if len(ids) else 0
+
+        # Normalized block by block, so building never holds a second float32 matrix.
+        if self.mode == "int8":
+            scales = np.zeros(dim, dtype=np.float32)
+            for start in range(0, len(ids), _BLOCK_ROWS):
+                block = _normalize(embeddings[start : start + _BLOCK_ROWS])
+                scales = np.maximum(scales, np.abs(block).max(axis=0))
+            scales = scales / 127.0
+            scales[scales == 0] = 1.0
+            codes = np.empty((len(ids), dim), dtype=np.int8)
+            for start in range(0, len(ids), _BLOCK_ROWS):
+                block = _normalize(embeddings[start : start + _BLOCK_ROWS])
+                codes[start : start + block.shape[0]] = np.clip(np.rint(block / scales), -127, 127)
+            _atomic_save(self._scales_path, scales.astype(np.float32))
+        else:
+            codes = np.empty((len(ids), (dim + 7) // 8), dtype=np.uint8)
+            for start in range(0, len(ids), _BLOCK_ROWS):
+                block = embeddings[start : start + _BLOCK_ROWS]
+                codes[start : start + block.shape[0]] = np.packbits(block > 0, axis=1)
+
+        _atomic_save(self._codes_path, codes)
+        # The metadata file is written last: its replacement marks a new build for other processes.
+        tmp = self._meta_path.with_name(self._meta_path.name + ".tmp")
+        tmp.write_text(json.dumps({"mode": self.mode, "dim": dim, "ids": list(ids)}), encoding="utf-8")
+        os.replace(tmp, self._meta_path)
+        self.load()
+
+    def _current_stamp(self) -> tuple[int, int] | None:
+        try:
+            stat = self._meta_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def load(self) -> bool:
+        """Open persisted codes; returns False when nothing was built yet."""
+        stamp = self._current_stamp()
+        if stamp is None or not self._codes_path.exists():
+            return False
+        meta = json.loads(self._meta_path.read_text(encoding="utf-8"))
+        self.ids = meta.get("ids", [])
+        self.dim = int(meta.get("dim", 0))
+        self._stamp = stamp
+        if not self.ids or not self.dim:
+            self._codes = None
+            return True
+        self._codes = np.load(self._codes_path, mmap_mode="r")
+        self._scales = np.load(self._scales_path) if self.mode == "int8" else None
+        return True
+
+    def is_current(self) -> bool:
+        """False once the files on disk were rebuilt or cleared, possibly by another process."""
+        return self._stamp is not None and self._current_stamp() == self._stamp
+
+    def clear(self) -> None:
+        for path in (self._codes_path, self._meta_path, self._scales_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        self.ids = []
+        self.dim = 0
+        self._codes = self._scales = None
+        self._stamp = None
+
+    def memory_bytes(self) -> dict[str, int]:
+        """Size of the codes, and of the same vectors as float32 (held by the store, not here)."""
+        codes = int(self._codes.nbytes) if self._codes is not None else 0
+        return {"codes": codes, "float32": len(self.ids) * self.dim * 4 if self._codes is not None else 0}
+
+    def _first_pass(self, queries: np.ndarray) -> np.ndarray:
+        """Approximate scores (higher is better) for every query against every code."""
+        assert self._codes is not None
+        scores = np.empty((queries.shape[0], len(self.ids)), dtype=np.float32)
+        if self.mode == "int8":
+            # Asymmetric: float query against int8 codes, folding the per-dimension scale into the query.
+            scaled = (queries * self._scales).astype(np.float32)
+            for start in range(0, len(self.ids), _BLOCK_ROWS):
+                block = np.asarray(self._codes[start : start + _BLOCK_ROWS], dtype=np.float32)
+                scores[:, start : start + block.shape[0]] = scaled @ block.T
+        else:
+            packed_queries = np.packbits(queries > 0, axis=1)
+            for start in range(0, len(self.ids), _BLOCK_ROWS):
+                block = np.asarray(self._codes[start : start + _BLOCK_ROWS])
+                for row, packed in enumerate(packed_queries):
+                    hamming = _POPCOUNT[np.bitwise_xor(block, packed)].sum(axis=1, dtype=np.int32)
+                    scores[row, start : start + block.shape[0]] = -hamming
+        return scores
+
+    def search_indices(self, query_embeddings: Any, k: int) -> list[list[tuple[int, float]]]:
+        queries = _normalize(query_embeddings)
+        if self._codes is None or k <= 0:
+            return [[] for _ in range(queries.shape[0])]
+        if self.lookup is None:
+            raise ValueError("QuantizedIndex needs a vector lookup to rescore candidates.")
+        total = len(self.ids)
+        k = min(k, total)
+        candidates = min(k * self.rescore_multiplier, total)
+
+        approx = self._first_pass(queries)
+        if candidates < total:
+            shortlist = np.argpartition(-approx, candidates - 1, axis=1)[:, :candidates]
+        else:
+            shortlist = np.tile(np.arange(total), (queries.shape[0], 1))
+
+        # One lookup for the candidates of every query in the batch.
+        unique = np.unique(shortlist)
+        vectors = _normalize(self.lookup([self.ids[row] for row in unique]))
+        results: list[list[tuple[int, float]]] = []
+        for query, rows in zip(queries, shortlist):
+            rows = np.sort(rows)
+            exact = vectors[np.searchsorted(unique, rows)] @ query
+            best = np.argsort(-exact)[:k]
+            results.append([(int(rows[idx]), float(exact[idx])) for idx in best])
+        return results
+
+    def search(self, query_embeddings: Any, k: int) -> list[list[tuple[str, float]]]:
+        """Top-k `(id, cosine similarity)` pairs per query."""
+        return [
+            [(self.ids[row], score) for row, score in hits]
+            for hits in self.search_indices(query_embeddings, k)
+        ]
+
+
+def recall_report(index: QuantizedIndex, vectors: Any, queries: Any, k: int = 10) -> dict[str, Any]:
+    """
+    Compare the quantized index against exact float32 search on `vectors`, the rows the
+    index was built from. Reports recall@k, per-query latency percentiles for both paths
+    and memory use.
+    """
+    queries = _normalize(queries)
+    if not len(index):
+        return {"mode": index.mode, "k": k, "queries": int(queries.shape[0]), "vectors": 0}
+    vectors = _normalize(vectors)
+
+    exact_latencies: list[float] = []
+    truth: list[set[int]] = []
+    for query in queries:
+        start = time.perf_counter()
+        top = exact_search(vectors, query, k)[0]
+        exact_latencies.append(time.perf_counter() - start)
+        truth.append(set(int(row) for row in top))
+
+    approx_latencies: list[float] = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        found = index.search_indices(query, k)[0]
+        approx_latencies.append(time.perf_counter() - start)
+        hits += len(expected.intersection(row for row, _score in found))
+
+    def _ms(values: list[float], q: float) -> float:
+        return round(float(np.percentile(values, q)) * 1000, 3)
+
+    memory = index.memory_bytes()
+    return {
+        "mode": index.mode,
+        "k": k,
+        "queries": int(queries.shape[0]),
+        "vectors": len(index),
+        "rescore_multiplier": index.rescore_multiplier,
+        "recall_at_k": round(hits / max(sum(len(t) for t in truth), 1), 4),
+        "exact_p50_ms": _ms(exact_latencies, 50),
+        "exact_p95_ms": _ms(exact_latencies, 95),
+        "quantized_p50_ms": _ms(approx_latencies, 50),
+        "quantized_p95_ms": _ms(approx_latencies, 95),
+        "codes_bytes": memory["codes"],
+        "float32_bytes": memory["float32"],
+        "compression_ratio": round(memory["float32"] / memory["codes"], 2) if memory["codes"] else None,
+    }
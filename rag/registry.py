@@ -2,8 +2,12 @@ from __future__ import annotations
 
 import json
 import sqlite3
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import ContextManager
+
+from rag.db import get_pool
+from rag.migrations import Migration, columns, migrate
 
 
 @dataclass
@@ -12,7 +16,117 @@ class DocumentRecord:
     original_name: str
     stored_path: str
     ext: str
-    chunk_ids: list[str]
+    # Loaded by `get`/`remove`; `list` only fills `chunk_count` to stay a single cheap SELECT.
+    chunk_ids: list[str] = field(default_factory=list)
+    chunk_count: int = 0
+    # Computed at ingestion so the Documents page never opens the stored files.
+    size_bytes: int | None = None
+    token_count: int | None = None
+    preview: str = ""  # start of the preprocessed text, DOC_PREVIEW_CHARS long
+    ingested_at: str | None = None
+
+    def __post_init__(self) -> None:
+        if not self.chunk_count and self.chunk_ids:
+            self.chunk_count = len(self.chunk_ids)
+
+
+@dataclass
+class ChunkRecord:
+    chunk_id: str
+    doc_id: str
+    chunk_index: int
+    content_hash: str | None = None  # sha256 of the chunk text
+    token_count: int | None = None
+    start_byte: int | None = None  # UTF-8 offsets in the preprocessed document text
+    end_byte: int | None = None
+
+
+_DOCUMENT_COLUMNS = (
+    "doc_id, original_name, stored_path, ext, chunk_count, size_bytes, token_count, preview, ingested_at"
+)
+_CHUNK_COLUMNS = "chunk_id, doc_id, chunk_index, content_hash, token_count, start_byte, end_byte"
+
+
+def _create_documents(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS documents (
+            doc_id TEXT PRIMARY KEY,
+            original_name TEXT NOT NULL,
+            stored_path TEXT NOT NULL,
+            ext TEXT NOT NULL,
+            chunk_count INTEGER NOT NULL DEFAULT 0
+        );
+        """
+    )
+
+
+def _normalize_chunks(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS chunks (
+            chunk_id TEXT PRIMARY KEY,
+            doc_id TEXT NOT NULL REFERENCES documents(doc_id),
+            chunk_index INTEGER NOT NULL,
+            content_hash TEXT,
+            token_count INTEGER,
+            start_byte INTEGER,
+            end_byte INTEGER
+        );
+        """
+    )
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_chunks_doc ON chunks(doc_id, chunk_index);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_hash ON chunks(content_hash);")
+    # Older registries kept each document's chunk ids as a JSON array in documents.chunk_ids.
+    cols = columns(conn, "documents")
+    if "chunk_ids" not in cols:
+        return
+    if "chunk_count" not in cols:
+        conn.execute("ALTER TABLE documents ADD COLUMN chunk_count INTEGER NOT NULL DEFAULT 0;")
+    rows = conn.execute("SELECT doc_id, chunk_ids FROM documents").fetchall()
+    for doc_id, payload in rows:
+        chunk_ids = json.loads(payload) if payload else []
+        conn.executemany(
+            "INSERT OR IGNORE INTO chunks (chunk_id, doc_id, chunk_index) VALUES (?, ?, ?)",
+            [(chunk_id, doc_id, idx) for idx, chunk_id in enumerate(chunk_ids)],
+        )
+        conn.execute("UPDATE documents SET chunk_count = ? WHERE doc_id = ?", (len(chunk_ids), doc_id))
+    conn.execute("ALTER TABLE documents DROP COLUMN chunk_ids;")
+
+
+def _add_document_stats(conn: sqlite3.Connection) -> None:
+    cols = columns(conn, "documents")
+    for name, ddl in (
+        ("size_bytes", "INTEGER"),
+        ("token_count", "INTEGER"),
+        ("preview", "TEXT NOT NULL DEFAULT ''"),
+        ("ingested_at", "TEXT"),
+    ):
+        if name not in cols:
+            conn.execute(f"ALTER TABLE documents ADD COLUMN {name} {ddl};")
+    # Rows from before this step: token totals come from the chunk rows, sizes from one last stat().
+    conn.execute(
+        """
+        UPDATE documents SET token_count = (
+            SELECT SUM(token_count) FROM chunks WHERE chunks.doc_id = documents.doc_id
+        )
+        WHERE token_count IS NULL;
+        """
+    )
+    rows = conn.execute("SELECT doc_id, stored_path FROM documents WHERE size_bytes IS NULL").fetchall()
+    for doc_id, stored_path in rows:
+        path = Path(stored_path)
+        if stored_path and path.is_file():
+            size = path.stat().st_size
+            conn.execute("UPDATE documents SET size_bytes = ? WHERE doc_id = ?", (size, doc_id))
+
+
+# Append new steps with the next version; never edit or reorder released ones.
+REGISTRY_MIGRATIONS = [
+    Migration(1, "documents table", _create_documents),
+    Migration(2, "normalized chunks table", _normalize_chunks),
+    Migration(3, "document size, tokens, preview and ingest time", _add_document_stats),
+]
 
 
 class DocumentRegistry:
@@ -21,104 +135,150 @@ class DocumentRegistry:
         self.path.parent.mkdir(parents=True, exist_ok=True)
         self._init_db()
 
-    def _connect(self) -> sqlite3.Connection:
-        return sqlite3.connect(self.path)
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        return get_pool(self.path).connection()
 
     def _init_db(self) -> None:
-        desired_columns = {"doc_id", "original_name", "stored_path", "ext", "chunk_ids"}
         with self._connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS documents (
-                    doc_id TEXT PRIMARY KEY,
-                    original_name TEXT NOT NULL,
-                    stored_path TEXT NOT NULL,
-                    ext TEXT NOT NULL,
-                    chunk_ids TEXT NOT NULL
-                );
-                """
-            )
-            cols = {
-                row[1] for row in conn.execute("PRAGMA table_info(documents);").fetchall()
-            }
-            if cols != desired_columns:
-                conn.execute("DROP TABLE IF EXISTS documents;")
-                conn.execute(
-                    """
-                    CREATE TABLE documents (
-                        doc_id TEXT PRIMARY KEY,
-                        original_name TEXT NOT NULL,
-                        stored_path TEXT NOT NULL,
-                        ext TEXT NOT NULL,
-                        chunk_ids TEXT NOT NULL
-                    );
-                    """
-                )
+            migrate(conn, "registry", REGISTRY_MIGRATIONS)
             conn.commit()
 
-    def list(self) -> list[DocumentRecord]:
+    @staticmethod
+    def _hydrate(row: tuple, chunk_ids: list[str] | None = None) -> DocumentRecord:
+        return DocumentRecord(
+            doc_id=row[0],
+            original_name=row[1],
+            stored_path=row[2],
+            ext=row[3],
+            chunk_ids=chunk_ids or [],
+            chunk_count=row[4],
+            size_bytes=row[5],
+            token_count=row[6],
+            preview=row[7] or "",
+            ingested_at=row[8],
+        )
+
+    @staticmethod
+    def _chunk_ids(conn: sqlite3.Connection, doc_id: str) -> list[str]:
+        rows = conn.execute(
+            "SELECT chunk_id FROM chunks WHERE doc_id = ? ORDER BY chunk_index", (doc_id,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def list(self, limit: int | None = None, offset: int = 0) -> list[DocumentRecord]:
+        """Most recently added first; `limit`/`offset` page through the registry."""
         with self._connect() as conn:
             rows = conn.execute(
-                """
-                SELECT doc_id, original_name, stored_path, ext, chunk_ids
+                f"""
+                SELECT {_DOCUMENT_COLUMNS}
                 FROM documents
                 ORDER BY rowid DESC
-                """
+                LIMIT ? OFFSET ?
+                """,
+                (-1 if limit is None else limit, offset),
             ).fetchall()
-        return [
-            DocumentRecord(
-                doc_id=row[0],
-                original_name=row[1],
-                stored_path=row[2],
-                ext=row[3],
-                chunk_ids=json.loads(row[4]) if row[4] else [],
-            )
-            for row in rows
-        ]
+        return [self._hydrate(row) for row in rows]
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            (count,) = conn.execute("SELECT COUNT(*) FROM documents;").fetchone()
+        return count or 0
+
+    def doc_ids(self) -> list[str]:
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT doc_id FROM documents").fetchall()]
 
     def get(self, doc_id: str) -> DocumentRecord | None:
         with self._connect() as conn:
             row = conn.execute(
-                """
-                SELECT doc_id, original_name, stored_path, ext, chunk_ids
+                f"""
+                SELECT {_DOCUMENT_COLUMNS}
                 FROM documents
                 WHERE doc_id = ?
                 """,
                 (doc_id,),
             ).fetchone()
-        if row is None:
-            return None
-        return DocumentRecord(
-            doc_id=row[0],
-            original_name=row[1],
-            stored_path=row[2],
-            ext=row[3],
-            chunk_ids=json.loads(row[4]) if row[4] else [],
-        )
+            if row is None:
+                return None
+            return self._hydrate(row, self._chunk_ids(conn, doc_id))
 
-    def add(self, record: DocumentRecord) -> None:
+    def add(self, record: DocumentRecord, chunks: list[ChunkRecord] | None = None) -> None:
+        """
+        Register a document and its chunks; without `chunks`, rows are derived from `record.chunk_ids`.
+        A missing `token_count` is summed from the chunks when they carry one.
+        """
+        if chunks is None:
+            chunks = [
+                ChunkRecord(chunk_id=chunk_id, doc_id=record.doc_id, chunk_index=idx)
+                for idx, chunk_id in enumerate(record.chunk_ids)
+            ]
+        token_count = record.token_count
+        if token_count is None and chunks and all(chunk.token_count is not None for chunk in chunks):
+            token_count = sum(chunk.token_count for chunk in chunks)
         with self._connect() as conn:
             conn.execute(
-                """
-                INSERT INTO documents (
-                    doc_id, original_name, stored_path, ext, chunk_ids
-                ) VALUES (?, ?, ?, ?, ?)
+                f"""
+                INSERT INTO documents ({_DOCUMENT_COLUMNS})
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                 (
                     record.doc_id,
                     record.original_name,
                     record.stored_path,
                     record.ext,
-                    json.dumps(record.chunk_ids, ensure_ascii=True),
+                    len(chunks),
+                    record.size_bytes,
+                    token_count,
+                    record.preview,
+                    record.ingested_at,
                 ),
             )
+            conn.executemany(
+                f"INSERT INTO chunks ({_CHUNK_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        chunk.chunk_id,
+                        record.doc_id,
+                        chunk.chunk_index,
+                        chunk.content_hash,
+                        chunk.token_count,
+                        chunk.start_byte,
+                        chunk.end_byte,
+                    )
+                    for chunk in chunks
+                ],
+            )
             conn.commit()
 
+    def get_chunks(self, doc_id: str) -> list[ChunkRecord]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT {_CHUNK_COLUMNS} FROM chunks WHERE doc_id = ? ORDER BY chunk_index",
+                (doc_id,),
+            ).fetchall()
+        return [ChunkRecord(*row) for row in rows]
+
+    def find_chunks(self, content_hashes: list[str]) -> list[ChunkRecord]:
+        """Chunks, from any document, whose text hashes to one of `content_hashes` (duplicate/diff checks)."""
+        if not content_hashes:
+            return []
+        placeholders = ", ".join("?" * len(content_hashes))
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT {_CHUNK_COLUMNS} FROM chunks
+                WHERE content_hash IN ({placeholders})
+                ORDER BY doc_id, chunk_index
+                """,
+                content_hashes,
+            ).fetchall()
+        return [ChunkRecord(*row) for row in rows]
+
     def remove(self, doc_id: str) -> DocumentRecord | None:
         with self._connect() as conn:
             row = conn.execute(
-                """
-                SELECT doc_id, original_name, stored_path, ext, chunk_ids
+                f"""
+                SELECT {_DOCUMENT_COLUMNS}
                 FROM documents
                 WHERE doc_id = ?
                 """,
@@ -126,13 +286,8 @@ class DocumentRegistry:
             ).fetchone()
             if row is None:
                 return None
+            record = self._hydrate(row, self._chunk_ids(conn, doc_id))
+            conn.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
             conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
             conn.commit()
-
-        return DocumentRecord(
-            doc_id=row[0],
-            original_name=row[1],
-            stored_path=row[2],
-            ext=row[3],
-            chunk_ids=json.loads(row[4]) if row[4] else [],
-        )
+        return record
@@ -0,0 +1,277 @@
+"""
+Process-wide shared resources with explicit lifecycles.
+
+The conversation, telemetry and archive stores, the document registry, the vector store and
+the hybrid retrievers are created once per process by `get_resource_manager()` and handed to
+every request and Streamlit session (the pages wrap it in `st.cache_resource`):
+
+- creation is lazy, on first `get`, and thread-safe: concurrent first calls build one instance;
+- `health()` runs each created resource's check and reports its state and latency;
+- `reset(name)` drops an instance so the next `get` rebuilds it (e.g. `rebuild_vector_store`);
+- `close()` resets everything and closes the SQLite connection pools.
+
+The `get_*` helpers of `rag.conversations`, `rag.telemetry`, `rag.archive` and `rag.documents`
+delegate here, so callers keep their existing entry points.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable
+
+from rag.config import CONVERSATIONS_DB_PATH, REGISTRY_DB_PATH, RETRIEVAL_SERVICE_URL
+
+if TYPE_CHECKING:
+    from rag.archive import ConversationArchive
+    from rag.conversations import ConversationStore
+    from rag.pipeline.hybrid_retriever import HybridRetriever
+    from rag.registry import DocumentRegistry
+    from rag.retrieval_service import RemoteRetriever
+    from rag.telemetry import TelemetryStore
+    from rag.vector_store import VectorBackend
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResourceHealth:
+    name: str
+    state: str  # idle (not created yet), ok or error
+    latency_ms: float = 0.0
+    detail: str = ""
+
+
+@dataclass
+class _Slot:
+    factory: Callable[[], Any]
+    health: Callable[[Any], str] | None = None
+    close: Callable[[Any], None] | None = None
+    instance: Any = None
+    created: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+
+class ResourceManager:
+    def __init__(self) -> None:
+        self._slots: dict[str, _Slot] = {}
+        self._lock = threading.Lock()
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        *,
+        health: Callable[[Any], str] | None = None,
+        close: Callable[[Any], None] | None = None,
+    ) -> None:
+        """Declare a resource; `factory` runs on first `get`, `health` returns a short status detail."""
+        with self._lock:
+            if name in self._slots:
+                raise ValueError(f"Resource {name!r} is already registered.")
+            self._slots[name] = _Slot(factory, health, close)
+
+    def _slot(self, name: str) -> _Slot:
+        try:
+            return self._slots[name]
+        except KeyError:
+            raise KeyError(f"Unknown resource {name!r}.") from None
+
+    def get(self, name: str) -> Any:
+        slot = self._slot(name)
+        if not slot.created:
+            # One lock per resource: a slow factory (Chroma opening) does not block the others.
+            with slot.lock:
+                if not slot.created:
+                    started = time.perf_counter()
+                    slot.instance = slot.factory()
+                    slot.created = True
+                    logger.info("Created %s in %.1f ms", name, (time.perf_counter() - started) * 1000)
+        return slot.instance
+
+    def is_created(self, name: str) -> bool:
+        return self._slot(name).created
+
+    def health(self) -> list[ResourceHealth]:
+        """Check every created resource; idle ones are reported without being created."""
+        report: list[ResourceHealth] = []
+        for name, slot in list(self._slots.items()):
+            if not slot.created:
+                report.append(ResourceHealth(name, "idle"))
+                continue
+            started = time.perf_counter()
+            try:
+                detail, state = (slot.health(slot.instance) if slot.health else "") or "", "ok"
+            except Exception as exc:
+                logger.warning("Health check of %s failed", name, exc_info=True)
+                detail, state = f"{type(exc).__name__}: {exc}", "error"
+            latency_ms = round((time.perf_counter() - started) * 1000, 2)
+            report.append(ResourceHealth(name, state, latency_ms, detail))
+        return report
+
+    def reset(self, name: str | None = None) -> None:
+        """Close and drop `name` (every resource when None); the next `get` recreates it."""
+        names = [name] if name is not None else list(reversed(self._slots))
+        for current in names:
+            slot = self._slot(current)
+            with slot.lock:
+                instance, created = slot.instance, slot.created
+                slot.instance, slot.created = None, False
+            if created and slot.close is not None:
+                try:
+                    slot.close(instance)
+                except Exception:
+                    logger.exception("Failed to close %s", current)
+
+    def close(self) -> None:
+        from rag.db import close_pools
+
+        self.reset()
+        close_pools()
+
+    @property
+    def conversations(self) -> ConversationStore:
+        return self.get("conversations")
+
+    @property
+    def telemetry(self) -> TelemetryStore:
+        return self.get("telemetry")
+
+    @property
+    def archive(self) -> ConversationArchive:
+        return self.get("archive")
+
+    @property
+    def registry(self) -> DocumentRegistry:
+        return self.get("registry")
+
+    @property
+    def vector_store(self) -> VectorBackend:
+        return self.get("vector_store")
+
+    def rebuild_vector_store(self, **kwargs: Any) -> int:
+        """`rebuild_collection`, then reopen the store: shared retrievers were bound to the old one."""
+        from rag.vector_store import rebuild_collection
+
+        copied = rebuild_collection(**kwargs)
+        self.reset("vector_store")
+        self.reset("retrievers")
+        return copied
+
+    def retriever(self, top_k: int) -> HybridRetriever | RemoteRetriever:
+        """
+        Shared HybridRetriever for `top_k`, or a RemoteRetriever when RETRIEVAL_SERVICE_URL is set.
+        Instances hold no per-query state (the BM25 index is class-level), so one per k serves
+        every request. The "retrievers" resource is the `{top_k: retriever}` cache.
+        """
+        retrievers = self.get("retrievers")
+        retriever = retrievers.get(top_k)
+        if retriever is None:
+            with self._slot("retrievers").lock:
+                retriever = retrievers.get(top_k)
+                if retriever is None:
+                    retriever = retrievers[top_k] = _create_retriever(top_k)
+        return retriever
+
+
+def _create_retriever(top_k: int) -> HybridRetriever | RemoteRetriever:
+    if RETRIEVAL_SERVICE_URL:
+        from rag.retrieval_service import RemoteRetriever
+
+        return RemoteRetriever(RETRIEVAL_SERVICE_URL, dense_k=top_k, lexical_k=top_k)
+    from rag.pipeline.hybrid_retriever import HybridRetriever
+
+    return HybridRetriever(dense_k=top_k, lexical_k=top_k)
+
+
+def _ping(path: Any) -> Callable[[Any], str]:
+    def check(_store: Any) -> str:
+        from rag.db import get_pool
+
+        with get_pool(path).connection() as conn:
+            conn.execute("SELECT 1").fetchone()
+        return path.name
+
+    return check
+
+
+def _create_conversations() -> ConversationStore:
+    from rag.conversations import ConversationStore
+
+    return ConversationStore(CONVERSATIONS_DB_PATH)
+
+
+def _create_telemetry() -> TelemetryStore:
+    from rag.telemetry import TelemetryStore
+
+    return TelemetryStore(CONVERSATIONS_DB_PATH)
+
+
+def _create_archive(manager: ResourceManager) -> ConversationArchive:
+    from rag.archive import ConversationArchive
+
+    # Idle conversations are archived by the warm-up thread or `python -m rag.archive archive`.
+    return ConversationArchive(manager.conversations)
+
+
+def _create_registry(manager: ResourceManager) -> DocumentRegistry:
+    from rag.migrations import backfill_registry
+    from rag.registry import DocumentRegistry
+    from rag.vector_store import has_stored_vectors
+
+    registry = DocumentRegistry(REGISTRY_DB_PATH)
+    # Checked on the files first: a fresh install must not open the vector store here.
+    if registry.count() == 0 and has_stored_vectors():
+        # A lost or pre-migration registry is rebuilt from vector metadata, not re-embedded.
+        try:
+            backfill_registry(registry, manager.vector_store)
+        except Exception:
+            logger.exception("Failed to backfill the document registry from the vector store")
+    return registry
+
+
+def _create_vector_store() -> VectorBackend:
+    from rag.vector_store import init_vector_store
+
+    return init_vector_store()
+
+
+def _vector_store_health(store: VectorBackend) -> str:
+    store.get(limit=1, include=[])
+    return type(store).__name__
+
+
+def _retrievers_health(retrievers: dict[int, HybridRetriever | RemoteRetriever]) -> str:
+    from rag.pipeline.hybrid_retriever import HybridRetriever
+
+    if RETRIEVAL_SERVICE_URL:
+        from rag.retrieval_service import RemoteRetriever
+
+        remote = RemoteRetriever(RETRIEVAL_SERVICE_URL).health()
+        return f"k={sorted(retrievers)}, {RETRIEVAL_SERVICE_URL}: BM25 {remote['bm25_chunks']} chunks"
+
+    if not HybridRetriever._bm25_ready:
+        return f"k={sorted(retrievers)}, BM25 not built"
+    return f"k={sorted(retrievers)}, BM25 {len(HybridRetriever._bm25_docs)} chunks"
+
+
+@lru_cache(maxsize=1)
+def get_resource_manager() -> ResourceManager:
+    manager = ResourceManager()
+    manager.register("conversations", _create_conversations, health=_ping(CONVERSATIONS_DB_PATH))
+    manager.register("telemetry", _create_telemetry, health=_ping(CONVERSATIONS_DB_PATH))
+    manager.register(
+        "archive",
+        lambda: _create_archive(manager),
+        health=lambda archive: f"{archive.count_archived()} archived conversations",
+    )
+    manager.register("vector_store", _create_vector_store, health=_vector_store_health)
+    manager.register(
+        "registry",
+        lambda: _create_registry(manager),
+        health=lambda registry: f"{registry.count()} documents",
+    )
+    manager.register("retrievers", dict, health=_retrievers_health)
+    return manager
@@ -0,0 +1,323 @@
+"""
+Standalone retrieval service: one resident hybrid index shared by every app worker.
+
+    python -m rag.retrieval_service --host 127.0.0.1 --port 8765
+    RETRIEVAL_SERVICE_URL=http://127.0.0.1:8765 streamlit run main.py
+
+Each Streamlit process otherwise keeps its own BM25 corpus (the full text of every chunk)
+and its own vector store client. With RETRIEVAL_SERVICE_URL set, `ResourceManager.retriever`
+hands `answer_question` a `RemoteRetriever` instead, so workers load neither; the service runs
+`HybridRetriever` on its side (stdlib ThreadingHTTPServer, JSON):
+
+- POST /retrieve        {"query", "k", "top_k", "filters"} -> {"documents": [...]}
+- POST /retrieve/batch  {"queries", "k", "top_k", "filters"} -> {"results": [[...], ...]}
+- POST /invalidate      reopen the vector store and drop the BM25 index (after an ingestion
+                        or deletion in any worker: `broadcast_docs_changed`), once the
+                        queries in flight on the old store have finished
+- GET  /health          BM25 state and vector store backend
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Callable, Iterator
+
+from rag.config import DEFAULT_TOP_K, HYBRID_K, RETRIEVAL_SERVICE_TIMEOUT, RETRIEVAL_SERVICE_URL
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_core.documents import Document
+
+    from rag.pipeline.hybrid_retriever import HybridRetriever
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8765
+
+
+class RetrievalServiceError(RuntimeError):
+    """The retrieval service could not be reached or failed to answer."""
+
+
+def _dump_docs(docs: list[Document]) -> list[dict[str, Any]]:
+    return [{"page_content": doc.page_content, "metadata": doc.metadata or {}} for doc in docs]
+
+
+def _load_docs(payload: list[dict[str, Any]]) -> list[Document]:
+    from langchain_core.documents import Document
+
+    return [
+        Document(page_content=item["page_content"], metadata=item.get("metadata") or {}) for item in payload
+    ]
+
+
+class _ReadWriteLock:
+    """Many readers or one writer; a waiting writer holds back new readers so it cannot starve."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            while self._writer or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class RetrievalService:
+    """The in-process side: HybridRetriever instances per top_k over the shared class-level BM25 index."""
+
+    def __init__(self) -> None:
+        self._retrievers: dict[int, HybridRetriever] = {}
+        self._lock = threading.Lock()
+        # Queries hold the read side for their whole run; invalidate takes the write side, so the
+        # old vector store is only closed once the queries still using it have finished.
+        self._corpus_lock = _ReadWriteLock()
+
+    def retriever(self, top_k: int) -> HybridRetriever:
+        from rag.pipeline.hybrid_retriever import HybridRetriever
+
+        with self._lock:
+            retriever = self._retrievers.get(top_k)
+            if retriever is None:
+                retriever = self._retrievers[top_k] = HybridRetriever(dense_k=top_k, lexical_k=top_k)
+            return retriever
+
+    def retrieve(self, query: str, k: int, top_k: int, filters: dict[str, Any] | None) -> list[Document]:
+        with self._corpus_lock.read():
+            return self.retriever(top_k).invoke(query, k=k, filters=filters)
+
+    def retrieve_batch(
+        self, queries: list[str], k: int, top_k: int, filters: dict[str, Any] | None
+    ) -> list[list[Document]]:
+        with self._corpus_lock.read():
+            return self.retriever(top_k).batch(queries, k=k, filters=filters)
+
+    def warm(self, top_k: int = DEFAULT_TOP_K) -> None:
+        with self._corpus_lock.read():
+            self.retriever(top_k)._ensure_bm25()
+
+    def invalidate(self) -> None:
+        from rag.pipeline.hybrid_retriever import HybridRetriever
+        from rag.vector_store import reload_vector_store
+
+        # Retrievers hold a dense retriever bound to the old store object: drop them with it.
+        with self._corpus_lock.write(), self._lock:
+            reload_vector_store()
+            HybridRetriever.notify_docs_changed()
+            self._retrievers.clear()
+        logger.info("Corpus changed: vector store reopened, BM25 index will be rebuilt on next query.")
+
+    def health(self) -> dict[str, Any]:
+        from rag.config import VECTOR_BACKEND
+        from rag.pipeline.hybrid_retriever import HybridRetriever
+
+        return {
+            "status": "ok",
+            "vector_backend": VECTOR_BACKEND,
+            "bm25_ready": HybridRetriever._bm25_ready,
+            "bm25_chunks": len(HybridRetriever._bm25_docs),
+            "retrievers": sorted(self._retrievers),
+        }
+
+
+def _make_handler(service: RetrievalService) -> type[BaseHTTPRequestHandler]:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+            logger.debug("%s - %s", self.address_string(), format % args)
+
+        def _json(self, status: int, payload: dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self) -> dict[str, Any]:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self) -> None:  # noqa: N802
+            if self.path.rstrip("/") == "/health":
+                self._json(200, service.health())
+            else:
+                self._json(404, {"error": f"Unknown path {self.path}"})
+
+        def _action(self, path: str, body: dict[str, Any]) -> Callable[[], dict[str, Any]] | None:
+            """Validate the request up front, so only service failures surface as HTTP 500."""
+            if path == "/retrieve":
+                query, k = str(body["query"]), int(body["k"])
+                top_k, filters = int(body.get("top_k") or k), body.get("filters")
+                return lambda: {"documents": _dump_docs(service.retrieve(query, k, top_k, filters))}
+            if path == "/retrieve/batch":
+                queries, k = [str(query) for query in body["queries"]], int(body["k"])
+                top_k, filters = int(body.get("top_k") or k), body.get("filters")
+
+                def retrieve_batch() -> dict[str, Any]:
+                    results = service.retrieve_batch(queries, k, top_k, filters)
+                    return {"results": [_dump_docs(docs) for docs in results]}
+
+                return retrieve_batch
+            if path == "/invalidate":
+
+                def invalidate() -> dict[str, Any]:
+                    service.invalidate()
+                    return {"status": "ok"}
+
+                return invalidate
+            return None
+
+        def do_POST(self) -> None:  # noqa: N802
+            path = self.path.rstrip("/")
+            try:
+                action = self._action(path, self._read_body())
+            except (json.JSONDecodeError, KeyError, TypeError, ValueError) as err:
+                self._json(400, {"error": f"Invalid request: {err!r}"})
+                return
+            if action is None:
+                self._json(404, {"error": f"Unknown path {self.path}"})
+                return
+            started = time.perf_counter()
+            try:
+                payload = action()
+            except Exception as err:
+                logger.exception("Retrieval service failed on %s", path)
+                self._json(500, {"error": f"{type(err).__name__}: {err}"})
+                return
+            payload["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            self._json(200, payload)
+
+    return Handler
+
+
+def start_retrieval_service(
+    service: RetrievalService | None = None, *, host: str = "127.0.0.1", port: int = 0
+) -> tuple[ThreadingHTTPServer, RetrievalService]:
+    """Serve in a daemon thread; the URL is `http://host:<server.server_port>`."""
+    service = service or RetrievalService()
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="retrieval-service", daemon=True).start()
+    return server, service
+
+
+@lru_cache(maxsize=1)
+def _http_client() -> httpx.Client:
+    import httpx
+
+    return httpx.Client(
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=60),
+        timeout=httpx.Timeout(RETRIEVAL_SERVICE_TIMEOUT, connect=2.0),
+    )
+
+
+def _request(method: str, url: str, payload: dict[str, Any] | None = None) -> dict[str, Any]:
+    import httpx
+
+    try:
+        response = _http_client().request(method, url, json=payload)
+    except httpx.HTTPError as err:
+        raise RetrievalServiceError(f"Retrieval service unreachable at {url}: {err}") from err
+    if response.status_code != 200:
+        raise RetrievalServiceError(
+            f"Retrieval service returned HTTP {response.status_code}: {response.text[:200]}"
+        )
+    return response.json()
+
+
+@dataclass
+class RemoteRetriever:
+    """Client with the `invoke` / `batch` interface of HybridRetriever, backed by the service."""
+
+    base_url: str
+    dense_k: int = HYBRID_K
+    lexical_k: int = HYBRID_K
+
+    def invoke(self, query: str, *, k: int, filters: dict[str, Any] | None = None) -> list[Document]:
+        payload = {"query": query, "k": k, "top_k": self.dense_k, "filters": filters}
+        return _load_docs(_request("POST", f"{self.base_url}/retrieve", payload)["documents"])
+
+    def batch(
+        self, queries: list[str], k: int, filters: dict[str, Any] | None = None
+    ) -> list[list[Document]]:
+        queries = list(queries)
+        if not queries:
+            return []
+        payload = {"queries": queries, "k": k, "top_k": self.dense_k, "filters": filters}
+        results = _request("POST", f"{self.base_url}/retrieve/batch", payload)["results"]
+        return [_load_docs(docs) for docs in results]
+
+    def health(self) -> dict[str, Any]:
+        return _request("GET", f"{self.base_url}/health")
+
+
+def broadcast_docs_changed(base_url: str | None = None) -> None:
+    """Tell the shared service that the corpus changed; a no-op without RETRIEVAL_SERVICE_URL."""
+    base_url = RETRIEVAL_SERVICE_URL if base_url is None else base_url
+    if not base_url:
+        return
+    try:
+        _request("POST", f"{base_url}/invalidate")
+    except RetrievalServiceError:
+        # The ingestion itself succeeded; the service serves stale results until the next broadcast.
+        logger.exception("Failed to notify the retrieval service of a corpus change")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--no-warm", action="store_true", help="Build the BM25 index on the first query.")
+    args = parser.parse_args(argv)
+
+    service = RetrievalService()
+    if not args.no_warm:
+        started = time.perf_counter()
+        service.warm()
+        logger.info("BM25 index ready in %.0f ms", (time.perf_counter() - started) * 1000)
+    server, _service = start_retrieval_service(service, host=args.host, port=args.port)
+    print(f"Retrieval service listening on http://{args.host}:{server.server_port} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, ContextManager, Iterator
+from uuid import uuid4
+
+from rag.db import get_pool
+from rag.migrations import Migration, migrate
+
+
+def _now() -> str:
+    return datetime.utcnow().isoformat() + "Z"
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    duration_ms: float = 0.0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+
+
+@dataclass
+class Trace:
+    trace_id: str = field(default_factory=lambda: uuid4().hex)
+    started_at: str = field(default_factory=_now)
+    stages: list[StageRecord] = field(default_factory=list)
+
+    def timings(self) -> dict[str, float]:
+        """Total milliseconds per stage name (a stage may run several times per request)."""
+        totals: dict[str, float] = defaultdict(float)
+        for record in self.stages:
+            totals[record.stage] += record.duration_ms
+        return {name: round(value, 3) for name, value in totals.items()}
+
+
+_current_trace: ContextVar[Trace | None] = ContextVar("rag_trace", default=None)
+_current_stage: ContextVar[StageRecord | None] = ContextVar("rag_stage", default=None)
+
+
+def current_trace() -> Trace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def start_trace(trace: Trace | None = None) -> Iterator[Trace]:
+    """Make `trace` (or a new one) the active trace for stages recorded in this context."""
+    trace = trace or Trace()
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[StageRecord]:
+    """Time a pipeline stage into the active trace; a no-op record when no trace is active."""
+    record = StageRecord(stage=name)
+    trace = _current_trace.get()
+    token = _current_stage.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.duration_ms = (time.perf_counter() - start) * 1000
+        _current_stage.reset(token)
+        if trace is not None:
+            trace.stages.append(record)
+
+
+def token_usage(message: Any) -> dict[str, int]:
+    """Prompt, completion and provider-cached prompt tokens reported on a chat response."""
+    metadata = getattr(message, "response_metadata", None) or {}
+    usage = metadata.get("token_usage") or {}
+    details = usage.get("prompt_tokens_details") or {}
+    usage_metadata = getattr(message, "usage_metadata", None) or {}
+    return {
+        "prompt_tokens": int(usage.get("prompt_tokens") or usage_metadata.get("input_tokens") or 0),
+        "completion_tokens": int(usage.get("completion_tokens") or usage_metadata.get("output_tokens") or 0),
+        "cached_tokens": int(details.get("cached_tokens") or 0),
+    }
+
+
+def record_usage(message: Any) -> dict[str, int]:
+    """Add a chat response's token counts to the innermost active stage and return them."""
+    usage = token_usage(message)
+    record = _current_stage.get()
+    if record is not None:
+        record.prompt_tokens += usage["prompt_tokens"]
+        record.completion_tokens += usage["completion_tokens"]
+        record.cached_tokens += usage["cached_tokens"]
+    return usage
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    pos = (len(ordered) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+class TelemetryStore:
+    """Per-stage timings stored in the conversations database, linked to assistant messages."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._init_db()
+
+    def _connect(self) -> ContextManager[sqlite3.Connection]:
+        return get_pool(self.path).connection()
+
+    def _init_db(self) -> None:
+        with self._connect() as conn:
+            migrate(conn, "telemetry", TELEMETRY_MIGRATIONS)
+            conn.commit()
+
+    def record(self, trace: Trace, message_id: int | None = None) -> None:
+        if not trace.stages:
+            return
+        with self._connect() as conn:
+            write_trace(conn, trace, message_id)
+            conn.commit()
+
+    def stages_for_message(self, message_id: int) -> list[StageRecord]:
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT stage, duration_ms, prompt_tokens, completion_tokens, cached_tokens
+                FROM stage_timings
+                WHERE message_id = ?
+                ORDER BY id ASC
+                """,
+                (message_id,),
+            ).fetchall()
+        return [StageRecord(*row) for row in rows]
+
+    def stage_percentiles(self, *, days: int = 7, by_day: bool = True) -> list[dict[str, Any]]:
+        """p50/p95 latency and mean tokens per (day, stage) — or per stage only — over the last `days` days."""
+        since = (datetime.utcnow() - timedelta(days=days)).isoformat() + "Z"
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT substr(started_at, 1, 10), stage, duration_ms, prompt_tokens + completion_tokens
+                FROM stage_timings
+                WHERE started_at >= ?
+                """,
+                (since,),
+            ).fetchall()
+        grouped: dict[tuple[str, str], list[tuple[float, int]]] = defaultdict(list)
+        for day, name, duration, tokens in rows:
+            grouped[(day if by_day else "", name)].append((duration, tokens))
+        report = []
+        for (day, name), values in sorted(grouped.items()):
+            durations = [duration for duration, _tokens in values]
+            report.append(
+                {
+                    "day": day,
+                    "stage": name,
+                    "count": len(values),
+                    "p50_ms": round(_percentile(durations, 50), 2),
+                    "p95_ms": round(_percentile(durations, 95), 2),
+                    "mean_tokens": round(sum(tokens for _d, tokens in values) / len(values), 1),
+                }
+            )
+        return report
+
+
+def _create_stage_timings(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS stage_timings (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            trace_id TEXT NOT NULL,
+            message_id INTEGER,
+            stage TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            duration_ms REAL NOT NULL,
+            prompt_tokens INTEGER NOT NULL DEFAULT 0,
+            completion_tokens INTEGER NOT NULL DEFAULT 0,
+            cached_tokens INTEGER NOT NULL DEFAULT 0
+        );
+        """
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stage_timings_started ON stage_timings(started_at, stage);")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_stage_timings_message ON stage_timings(message_id);")
+
+
+TELEMETRY_MIGRATIONS = [Migration(1, "stage_timings table", _create_stage_timings)]
+
+
+def write_trace(conn: sqlite3.Connection, trace: Trace, message_id: int | None) -> None:
+    """Insert a trace's stage records using an open connection (caller commits)."""
+    conn.executemany(
+        """
+        INSERT INTO stage_timings (
+            trace_id, message_id, stage, started_at, duration_ms,
+            prompt_tokens, completion_tokens, cached_tokens
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                trace.trace_id,
+                message_id,
+                record.stage,
+                trace.started_at,
+                record.duration_ms,
+                record.prompt_tokens,
+                record.completion_tokens,
+                record.cached_tokens,
+            )
+            for record in trace.stages
+        ],
+    )
+
+
+def get_telemetry_store() -> TelemetryStore:
+    from rag.resources import get_resource_manager
+
+    return get_resource_manager().telemetry
@@ -1,35 +1,421 @@
 from __future__ import annotations
 
+import json
 import logging
+import sqlite3
 from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Protocol
 
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
+from rag.config import (
+    CHROMA_DIR,
+    EMBEDDINGS_PROVIDER,
+    HNSW_CONSTRUCTION_EF,
+    HNSW_M,
+    HNSW_SEARCH_EF,
+    HNSW_SPACE,
+    LOCAL_EMBEDDINGS_DIM,
+    NUMPY_STORE_DIR,
+    OPENAI_API_KEY,
+    QUANTIZED_DIR,
+    QUANTIZED_INDEX_MODE,
+    QUANTIZED_RESCORE_MULTIPLIER,
+    VECTOR_BACKEND,
+)
+from rag.quantized_index import QuantizedIndex, VectorLookup
 
-from rag.config import CHROMA_DIR, EMBEDDINGS_MODEL_NAME, OPENAI_API_KEY
+if TYPE_CHECKING:
+    # Chroma, LangChain and the OpenAI client are imported where first used: importing this module
+    # (and rag.documents, rag.pipeline through it) must stay cheap for Streamlit cold starts.
+    from langchain_core.documents import Document
+    from langchain_core.embeddings import Embeddings
+
+    from rag.clients import PooledOpenAIEmbeddings
+    from rag.local_embeddings import HashingEmbeddings
+
+# Values Chroma uses when a collection was created without explicit HNSW metadata.
+CHROMA_HNSW_DEFAULTS: dict[str, Any] = {
+    "hnsw:space": "l2",
+    "hnsw:construction_ef": 100,
+    "hnsw:search_ef": 10,
+    "hnsw:M": 16,
+}
+
+
+class VectorBackend(Protocol):
+    """
+    Operations ingestion, deletion and retrieval rely on.
+    Implemented by `langchain_chroma.Chroma` and `rag.numpy_store.NumpyVectorStore`.
+    """
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: list[dict] | None = None,
+        ids: list[str] | None = None,
+        **kwargs: Any,
+    ) -> list[str]: ...
+
+    def delete(self, ids: list[str] | None = None, **kwargs: Any) -> Any: ...
+
+    def get(
+        self,
+        ids: list[str] | None = None,
+        where: dict[str, Any] | None = None,
+        limit: int | None = None,
+        offset: int | None = None,
+        where_document: dict[str, Any] | None = None,
+        include: list[str] | None = None,
+    ) -> dict[str, Any]: ...
+
+    def as_retriever(self, **kwargs: Any) -> Any: ...
 
 
 @lru_cache(maxsize=1)
-def init_embedder() -> OpenAIEmbeddings:
+def init_embedder() -> PooledOpenAIEmbeddings | HashingEmbeddings:
+    if EMBEDDINGS_PROVIDER == "local":
+        from rag.local_embeddings import HashingEmbeddings
+
+        return HashingEmbeddings(dim=LOCAL_EMBEDDINGS_DIM)
+    if EMBEDDINGS_PROVIDER != "openai":
+        raise ValueError(f"Unsupported embeddings provider: {EMBEDDINGS_PROVIDER}")
     if not OPENAI_API_KEY:
         logging.error("OPENAI_API_KEY is missing; embeddings cannot be initialized.")
         raise ValueError("OPENAI_API_KEY is required to initialize embeddings.")
-    return OpenAIEmbeddings(api_key=OPENAI_API_KEY, model=EMBEDDINGS_MODEL_NAME)
+    from rag.clients import get_embeddings
+
+    return get_embeddings()
+
+
+def hnsw_settings(
+    *,
+    space: str = HNSW_SPACE,
+    construction_ef: int = HNSW_CONSTRUCTION_EF,
+    search_ef: int = HNSW_SEARCH_EF,
+    m: int = HNSW_M,
+) -> dict[str, Any]:
+    """Chroma collection metadata carrying the HNSW parameters."""
+    return {
+        "hnsw:space": space,
+        "hnsw:construction_ef": construction_ef,
+        "hnsw:search_ef": search_ef,
+        "hnsw:M": m,
+    }
+
+
+def hnsw_drift(current: dict[str, Any] | None, desired: dict[str, Any]) -> dict[str, tuple[Any, Any]]:
+    """Settings whose effective value differs from the desired one, as {key: (current, desired)}."""
+    effective = {**CHROMA_HNSW_DEFAULTS, **(current or {})}
+    return {
+        key: (effective.get(key), value)
+        for key, value in desired.items()
+        if effective.get(key) != value
+    }
+
+
+def create_vector_store(
+    backend: str,
+    *,
+    embedder: Embeddings,
+    name: str = "documents",
+    directory: Path | None = None,
+) -> VectorBackend:
+    """Build a vector store for the given backend name ("chroma" or "numpy")."""
+    if backend == "chroma":
+        import chromadb
+        from langchain_chroma import Chroma
+
+        directory = directory or CHROMA_DIR
+        directory.mkdir(parents=True, exist_ok=True)
+        # First: Chroma would otherwise create an empty collection in place of a swapped-out one.
+        recover_interrupted_rebuild(chromadb.PersistentClient(path=str(directory)), name)
+        desired = hnsw_settings()
+        store = Chroma(
+            collection_name=name,
+            persist_directory=str(directory),
+            embedding_function=embedder,
+            collection_metadata=desired,
+        )
+        # HNSW settings are fixed at creation; existing collections keep theirs until rebuilt.
+        drift = hnsw_drift(store._collection.metadata, desired)
+        if drift:
+            logging.warning(
+                "Chroma collection %s uses HNSW settings that differ from the configuration %s; "
+                "run `python -m rag.vector_store rebuild` to apply them.",
+                name,
+                drift,
+            )
+        return store
+    if backend == "numpy":
+        from rag.numpy_store import NumpyVectorStore
+
+        return NumpyVectorStore(directory or NUMPY_STORE_DIR, embedder, collection_name=name)
+    raise ValueError(f"Unsupported vector backend: {backend}")
+
+
+def has_stored_vectors(backend: str = VECTOR_BACKEND, *, name: str = "documents") -> bool:
+    """
+    Whether the store on disk holds any vector, read from its files without opening it (no Chroma
+    import, no embeddings client). Unknown layouts count as non-empty, so callers still look.
+    """
+    if backend == "numpy":
+        directory = NUMPY_STORE_DIR / name
+        try:
+            manifest = json.loads((directory / "manifest.json").read_text(encoding="utf-8"))
+            return int(manifest.get("rows", 0)) > 0
+        except FileNotFoundError:
+            legacy = directory / "vectors.f32"
+            return legacy.exists() and legacy.stat().st_size > 0
+        except (ValueError, TypeError):
+            return True
+    database = CHROMA_DIR / "chroma.sqlite3"
+    if not database.exists():
+        return False
+    try:
+        conn = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+        try:
+            return conn.execute("SELECT 1 FROM embeddings LIMIT 1").fetchone() is not None
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return True
 
 
 @lru_cache(maxsize=1)
-def init_vector_store(name: str = "documents") -> Chroma:
+def init_vector_store(name: str = "documents") -> VectorBackend:
     embedder = init_embedder()
-    CHROMA_DIR.mkdir(parents=True, exist_ok=True)
-    return Chroma(
-        collection_name=name,
-        persist_directory=str(CHROMA_DIR),
-        embedding_function=embedder,
+    return create_vector_store(VECTOR_BACKEND, embedder=embedder, name=name)
+
+
+def _rebuild_names(name: str) -> tuple[str, str]:
+    return f"{name}-rebuild", f"{name}-backup"
+
+
+def recover_interrupted_rebuild(client: Any, name: str = "documents") -> str | None:
+    """
+    Finish or roll back a `rebuild_collection` that stopped midway, from the collections left:
+
+    - backup without the live collection: the swap was interrupted, the backup becomes live again;
+    - backup next to the live collection: the swap completed, the backup is dropped;
+    - staging collection: an unfinished copy, dropped.
+
+    Returns a description of what was done, None when there was nothing to recover.
+    """
+    staging_name, backup_name = _rebuild_names(name)
+    names = {collection.name for collection in client.list_collections()}
+    actions: list[str] = []
+    if backup_name in names:
+        if name in names:
+            client.delete_collection(backup_name)
+            actions.append(f"dropped {backup_name} left by a completed rebuild")
+        else:
+            client.get_collection(backup_name).modify(name=name)
+            actions.append(f"restored {name} from {backup_name}")
+    if staging_name in names:
+        client.delete_collection(staging_name)
+        actions.append(f"dropped the unfinished copy {staging_name}")
+    if not actions:
+        return None
+    detail = "; ".join(actions)
+    logging.warning("Interrupted rebuild of Chroma collection %s: %s.", name, detail)
+    return detail
+
+
+def rebuild_collection(
+    name: str = "documents",
+    *,
+    directory: Path | None = None,
+    settings: dict[str, Any] | None = None,
+    batch_size: int = 1000,
+) -> int:
+    """
+    Recreate a Chroma collection with new HNSW settings without re-embedding.
+
+    Stored embeddings, documents and metadata are copied into a staging collection
+    created with the new settings. Once the copy's count matches, the original is
+    renamed to a backup, the staging collection takes over the original name and only
+    then is the backup dropped: at any point a crash leaves either collection intact,
+    and `recover_interrupted_rebuild` (run when the store is opened) completes the swap.
+    Processes holding the store must reopen it afterwards (`ResourceManager.rebuild_vector_store`).
+    Returns the number of copied records.
+    """
+    import chromadb
+
+    directory = directory or CHROMA_DIR
+    settings = settings or hnsw_settings()
+    client = chromadb.PersistentClient(path=str(directory))
+    recover_interrupted_rebuild(client, name)
+    staging_name, backup_name = _rebuild_names(name)
+    source = client.get_collection(name)
+    staging = client.create_collection(staging_name, metadata=settings)
+
+    total = source.count()
+    for offset in range(0, total, batch_size):
+        batch = source.get(
+            limit=batch_size,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"],
+        )
+        if not batch["ids"]:
+            break
+        staging.add(
+            ids=batch["ids"],
+            embeddings=batch["embeddings"],
+            documents=batch["documents"],
+            metadatas=batch["metadatas"],
+        )
+
+    copied = staging.count()
+    if copied != total:
+        client.delete_collection(staging_name)
+        raise RuntimeError(f"Rebuild of {name} copied {copied} of {total} records; original kept.")
+
+    source.modify(name=backup_name)
+    staging.modify(name=name)
+    client.delete_collection(backup_name)
+    init_vector_store.cache_clear()
+    logging.info("Rebuilt Chroma collection %s with %s (%d records).", name, settings, copied)
+    return copied
+
+
+def store_lookup(vector_store: VectorBackend) -> VectorLookup:
+    """Read the full-precision embeddings of the given ids back from the vector store."""
+    import numpy as np
+
+    def lookup(ids: list[str]) -> np.ndarray:
+        data = vector_store.get(ids=ids, include=["embeddings"])
+        embeddings = data.get("embeddings")
+        found = dict(zip(data.get("ids", []) or [], embeddings if embeddings is not None else []))
+        dim = len(next(iter(found.values()))) if found else 0
+        empty = np.zeros(dim, dtype=np.float32)
+        return np.asarray([found.get(id_, empty) for id_ in ids], dtype=np.float32).reshape(len(ids), dim)
+
+    return lookup
+
+
+def build_quantized_index(
+    vector_store: VectorBackend,
+    *,
+    mode: str = QUANTIZED_INDEX_MODE,
+    directory: Path | None = None,
+    rescore_multiplier: int = QUANTIZED_RESCORE_MULTIPLIER,
+) -> QuantizedIndex:
+    """Quantize every embedding currently in the store into a compressed side index."""
+    data = vector_store.get(include=["embeddings"])
+    ids = data.get("ids", []) or []
+    embeddings = data.get("embeddings")
+    index = QuantizedIndex(
+        directory or QUANTIZED_DIR,
+        mode=mode,
+        rescore_multiplier=rescore_multiplier,
+        lookup=store_lookup(vector_store),
+    )
+    index.build(ids, embeddings if embeddings is not None and len(ids) else [])
+    return index
+
+
+@lru_cache(maxsize=1)
+def _open_quantized_index() -> QuantizedIndex | None:
+    if not QUANTIZED_INDEX_MODE:
+        return None
+    vector_store = init_vector_store()
+    index = QuantizedIndex(
+        QUANTIZED_DIR,
+        mode=QUANTIZED_INDEX_MODE,
+        rescore_multiplier=QUANTIZED_RESCORE_MULTIPLIER,
+        lookup=store_lookup(vector_store),
     )
+    if not index.load():
+        index = build_quantized_index(vector_store)
+    return index
+
+
+def init_quantized_index() -> QuantizedIndex | None:
+    """
+    Optional compressed index living next to the vector store (QUANTIZED_INDEX=int8|binary).
+    Loaded from disk when present, otherwise built once from the store's embeddings; reopened
+    when its files were rebuilt or cleared since, including by an ingestion in another process.
+    """
+    index = _open_quantized_index()
+    if index is not None and not index.is_current():
+        _open_quantized_index.cache_clear()
+        index = _open_quantized_index()
+    return index
+
+
+def close_quantized_index() -> None:
+    """Forget this process's open index; the next `init_quantized_index` reopens or rebuilds it."""
+    _open_quantized_index.cache_clear()
+
+
+def reload_vector_store() -> None:
+    """
+    Reopen the vector store and compressed index on next use, so this process sees vectors
+    written by another one (the shared retrieval service after an ingestion in a worker).
+    """
+    if VECTOR_BACKEND == "chroma":
+        from chromadb.api.client import SharedSystemClient
+
+        # Chroma keeps one system, with its in-memory HNSW index, per directory and process.
+        SharedSystemClient.clear_system_cache()
+    init_vector_store.cache_clear()
+    close_quantized_index()
+
+
+def invalidate_quantized_index() -> None:
+    """Drop the compressed index after the corpus changed; it is rebuilt on next use."""
+    if not QUANTIZED_INDEX_MODE:
+        return
+    QuantizedIndex(QUANTIZED_DIR, mode=QUANTIZED_INDEX_MODE).clear()
+    close_quantized_index()
+
+
+def where_filter(filters: dict[str, Any] | None) -> dict[str, Any] | None:
+    """
+    Chroma `where` clause for plain metadata filters: `{"doc_id": "abc"}` matches one value,
+    a list value (`{"doc_format": ["txt", "csv"]}`) matches any of them, several keys are ANDed.
+    """
+    if not filters:
+        return None
+    clauses = [
+        {key: {"$in": list(value)} if isinstance(value, (list, tuple, set)) else value}
+        for key, value in filters.items()
+    ]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def similarity_search_by_vectors(
+    vector_store: VectorBackend,
+    embeddings: list[list[float]],
+    k: int,
+    where: dict[str, Any] | None = None,
+) -> list[list[Document]]:
+    """Nearest neighbours for several query embeddings in one backend call."""
+    if not embeddings:
+        return []
+    batched = getattr(vector_store, "similarity_search_by_vectors", None)
+    if batched is not None:
+        return [[doc for doc, _score in hits] for hits in batched(embeddings, k, where)]
+    collection = getattr(vector_store, "_collection", None)
+    if collection is not None:
+        from langchain_core.documents import Document
+
+        # Chroma: one `query` call with every embedding.
+        result = collection.query(
+            query_embeddings=[[float(value) for value in embedding] for embedding in embeddings],
+            n_results=k,
+            where=where,
+            include=["documents", "metadatas"],
+        )
+        return [
+            [Document(page_content=text or "", metadata=meta or {}) for text, meta in zip(texts, metas)]
+            for texts, metas in zip(result.get("documents") or [], result.get("metadatas") or [])
+        ]
+    return [vector_store.similarity_search_by_vector(embedding, k=k, filter=where) for embedding in embeddings]
 
 
 def add_chunks_to_store(
-    vector_store: Chroma,
+    vector_store: VectorBackend,
     *,
     chunks: list[str],
     doc_id: str,
@@ -60,10 +446,21 @@ def add_chunks_to_store(
     return ids
 
 
-def delete_chunks_from_store(vector_store: Chroma, doc_ids: list[str]) -> bool:
+def delete_chunks_from_store(vector_store: VectorBackend, doc_ids: list[str]) -> bool:
     try:
         vector_store.delete(ids=doc_ids)
         return True
     except Exception:
         logging.exception("Failed to delete chunks", extra={"doc_ids": doc_ids})
         return False
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Vector store maintenance.")
+    parser.add_argument("command", choices=["rebuild"], help="rebuild: apply HNSW settings from the configuration")
+    parser.add_argument("--name", default="documents")
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        print(f"{rebuild_collection(args.name)} records copied with {hnsw_settings()}")
@@ -0,0 +1,227 @@
+"""
+Background warm-up of what the first question would otherwise pay for.
+
+`start_warmup()` (called by main.py and the Chat page, once per process) runs these steps
+in a daemon thread while the first page renders:
+
+- vector_store: the shared registry and vector store (rag.resources: Chroma opening, embeddings client);
+- bm25: the shared retriever for DEFAULT_TOP_K, its BM25 index and the optional quantized index;
+- tokenizer: the tiktoken encoding and text splitter used by chunking and token counts;
+- llm: the chat model and the compiled QA chain (LangChain and OpenAI SDK imports);
+- connections: a first request to the OpenAI endpoint so the TLS handshake happens now and
+  the connection waits in the shared keep-alive pool;
+- archive: moves conversations idle for ARCHIVE_AFTER_DAYS to the archive (rag.archive), last
+  so it never delays the others. Without warm-up, schedule `python -m rag.archive archive`.
+
+With RETRIEVAL_SERVICE_URL set, the vector store step is skipped and the bm25 step only checks
+that the shared retrieval service (rag.retrieval_service) answers.
+
+`get_warmup().status()` reports each step's state and duration for the UI; a failing step is
+logged and recorded without stopping the others, the request path then initializes it lazily
+as before. WARMUP_ENABLED=false turns the whole subsystem off.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable
+
+from rag.config import (
+    ARCHIVE_AFTER_DAYS,
+    DEFAULT_CHUNK_OVERLAP,
+    DEFAULT_CHUNK_SIZE,
+    DEFAULT_TOP_K,
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    RETRIEVAL_SERVICE_URL,
+    USE_TIKTOKEN,
+    WARMUP_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_OPENAI_URL = "https://api.openai.com/v1"
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    state: str = "pending"  # pending, running, done, skipped or failed
+    duration_ms: float = 0.0
+    detail: str = ""
+
+
+@dataclass
+class WarmupStatus:
+    steps: list[WarmupStep] = field(default_factory=list)
+    started: bool = False
+    finished: bool = False
+    total_ms: float = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.finished
+
+    @property
+    def progress(self) -> float:
+        completed = sum(step.state not in {"pending", "running"} for step in self.steps)
+        return completed / len(self.steps) if self.steps else 1.0
+
+
+class SkipStep(Exception):
+    """Raised by a step that does not apply to this configuration."""
+
+
+def _warm_vector_store() -> str:
+    if RETRIEVAL_SERVICE_URL:
+        raise SkipStep(f"retrieval served by {RETRIEVAL_SERVICE_URL}")
+    from rag.resources import get_resource_manager
+
+    resources = get_resource_manager()
+    backend = type(resources.vector_store).__name__
+    return f"{resources.registry.count()} documents, {backend}"
+
+
+def _warm_bm25() -> str:
+    from rag.pipeline.hybrid_retriever import HybridRetriever
+    from rag.resources import get_resource_manager
+    from rag.vector_store import init_quantized_index
+
+    if RETRIEVAL_SERVICE_URL:
+        # The service holds the index; this checks it is up and connects the keep-alive client.
+        health = get_resource_manager().retriever(DEFAULT_TOP_K).health()
+        return f"{RETRIEVAL_SERVICE_URL}: {health['bm25_chunks']} chunks"
+    # The retriever answer_question will reuse for the default top_k.
+    get_resource_manager().retriever(DEFAULT_TOP_K)._ensure_bm25()
+    detail = f"{len(HybridRetriever._bm25_docs)} chunks"
+    if init_quantized_index() is not None:
+        detail += ", quantized index"
+    return detail
+
+
+def _warm_tokenizer() -> str:
+    from rag.chunking import _token_encoding, chunk_text
+
+    use_tiktoken = USE_TIKTOKEN and _token_encoding() is not None
+    chunk_text(
+        "Préchargement.",
+        chunk_size=DEFAULT_CHUNK_SIZE,
+        overlap=DEFAULT_CHUNK_OVERLAP,
+        use_tiktoken=use_tiktoken,
+    )
+    return "cl100k_base" if use_tiktoken else "estimation (tiktoken unavailable)"
+
+
+def _warm_llm() -> str:
+    if not OPENAI_API_KEY:
+        raise SkipStep("OPENAI_API_KEY is not set")
+    from rag.clients import get_chat_model
+    from rag.pipeline.qa import get_qa_chain
+
+    get_chat_model()
+    get_qa_chain()
+    return "chat model and QA chain"
+
+
+def _warm_connections() -> str:
+    if not OPENAI_API_KEY:
+        raise SkipStep("OPENAI_API_KEY is not set")
+    from rag.clients import get_http_client
+
+    # Any HTTP status will do: the point is the DNS lookup and TLS handshake on a pooled connection.
+    url = (OPENAI_BASE_URL or DEFAULT_OPENAI_URL).rstrip("/") + "/models"
+    response = get_http_client().get(url, headers={"Authorization": f"Bearer {OPENAI_API_KEY}"})
+    return f"{url} -> HTTP {response.status_code}"
+
+
+def _archive_idle() -> str:
+    if ARCHIVE_AFTER_DAYS <= 0:
+        raise SkipStep("ARCHIVE_AFTER_DAYS is 0")
+    from rag.resources import get_resource_manager
+
+    moved = get_resource_manager().archive.archive_idle(ARCHIVE_AFTER_DAYS)
+    return f"{moved} conversations idle for {ARCHIVE_AFTER_DAYS} days archived"
+
+
+DEFAULT_STEPS: list[tuple[str, Callable[[], str]]] = [
+    ("vector_store", _warm_vector_store),
+    ("bm25", _warm_bm25),
+    ("tokenizer", _warm_tokenizer),
+    ("llm", _warm_llm),
+    ("connections", _warm_connections),
+    ("archive", _archive_idle),
+]
+
+
+class Warmup:
+    def __init__(self, steps: list[tuple[str, Callable[[], str]]] | None = None) -> None:
+        self._steps = list(DEFAULT_STEPS if steps is None else steps)
+        self._status = WarmupStatus(steps=[WarmupStep(name) for name, _fn in self._steps])
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        """Run the steps in a background thread; later calls are no-ops."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._status.started = True
+            self._thread = threading.Thread(target=self._run, name="rag-warmup", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        started = time.perf_counter()
+        for (name, fn), step in zip(self._steps, self._status.steps):
+            with self._lock:
+                step.state = "running"
+            step_started = time.perf_counter()
+            try:
+                detail, state = fn() or "", "done"
+            except SkipStep as reason:
+                detail, state = str(reason), "skipped"
+            except Exception as exc:
+                logger.exception("Warm-up step %s failed", name)
+                detail, state = f"{type(exc).__name__}: {exc}", "failed"
+            with self._lock:
+                step.state, step.detail = state, detail
+                step.duration_ms = round((time.perf_counter() - step_started) * 1000, 1)
+        with self._lock:
+            self._status.total_ms = round((time.perf_counter() - started) * 1000, 1)
+            self._status.finished = True
+        self._done.set()
+        logger.info(
+            "Warm-up finished in %.0f ms: %s",
+            self._status.total_ms,
+            ", ".join(f"{step.name}={step.state} {step.duration_ms:.0f} ms" for step in self._status.steps),
+        )
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Block until the warm-up finished (True) or `timeout` seconds passed (False)."""
+        return self._done.wait(timeout)
+
+    def status(self) -> WarmupStatus:
+        """Snapshot of the warm-up progress, safe to render from any thread."""
+        with self._lock:
+            return WarmupStatus(
+                steps=[WarmupStep(s.name, s.state, s.duration_ms, s.detail) for s in self._status.steps],
+                started=self._status.started,
+                finished=self._status.finished,
+                total_ms=self._status.total_ms,
+            )
+
+
+@lru_cache(maxsize=1)
+def get_warmup() -> Warmup:
+    return Warmup()
+
+
+def start_warmup() -> Warmup:
+    """Start the process-wide warm-up (unless WARMUP_ENABLED=false) and return it."""
+    warmup = get_warmup()
+    if WARMUP_ENABLED:
+        warmup.start()
+    return warmup
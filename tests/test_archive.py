@@ -0,0 +1,70 @@
+from rag.archive import ConversationArchive
+from rag.conversations import ConversationStore
+
+
+def _age(store: ConversationStore, conversation_id: str, updated_at: str) -> None:
+    with store._connect() as conn:
+        conn.execute(
+            "UPDATE conversations SET updated_at = ? WHERE conversation_id = ?", (updated_at, conversation_id)
+        )
+
+
+def test_archive_idle_moves_old_conversations_and_restores_them(tmp_path) -> None:
+    store = ConversationStore(tmp_path / "conversations.sqlite3")
+    archive = ConversationArchive(store, tmp_path / "archive")
+    old = store.create_conversation("Ancienne")
+    store.add_exchange(
+        old.conversation_id, "Pénalités ?", "Trois fois le taux légal [1].", sources=[{"doc_id": "d1"}]
+    )
+    _age(store, old.conversation_id, "2024-01-15T10:00:00Z")
+    recent = store.create_conversation("Récente")
+
+    assert archive.archive_idle(older_than_days=30) == 1
+    with store._connect() as conn:
+        assert conn.execute("PRAGMA freelist_count;").fetchone()[0] == 0  # freed pages released
+
+    assert [c.conversation_id for c in store.list_conversations()] == [recent.conversation_id]
+    assert store.count_conversations() == 1
+    assert store.search_messages("pénalités") == []
+    assert (tmp_path / "archive" / "conversations-2024-01.jsonl.gz").exists()
+    assert archive.is_archived(old.conversation_id)
+    assert [c.title for c in archive.list_archived()] == ["Ancienne"]
+
+    restored = archive.restore(old.conversation_id)
+
+    assert restored is not None and restored.title == "Ancienne"
+    assert not archive.is_archived(old.conversation_id)
+    messages = store.list_messages(old.conversation_id)
+    assert [m.content for m in messages] == ["Pénalités ?", "Trois fois le taux légal [1]."]
+    assert messages[1].sources == [{"doc_id": "d1"}]
+    assert store.get_summary(old.conversation_id).startswith("User: Pénalités ?")
+    assert len(store.search_messages("pénalités")) == 1
+    assert archive.archive_idle(older_than_days=30) == 0  # reopening counts as activity
+    assert archive.restore("missing") is None
+
+
+def test_store_enables_incremental_vacuum_and_updated_at_index(tmp_path) -> None:
+    store = ConversationStore(tmp_path / "conversations.sqlite3")
+    with store._connect() as conn:
+        assert conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2  # INCREMENTAL
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT conversation_id FROM conversations ORDER BY updated_at DESC"
+        ).fetchall()
+    assert "idx_conversations_updated_at" in str(plan)
+
+
+def test_existing_database_enables_incremental_vacuum_only_on_request(tmp_path) -> None:
+    import sqlite3
+
+    path = tmp_path / "conversations.sqlite3"
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE legacy (id INTEGER)")
+
+    store = ConversationStore(path)  # startup never rewrites an existing file
+    with store._connect() as conn:
+        assert conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 0
+
+    assert store.enable_incremental_vacuum() is True
+    assert store.enable_incremental_vacuum() is False
+    with store._connect() as conn:
+        assert conn.execute("PRAGMA auto_vacuum;").fetchone()[0] == 2
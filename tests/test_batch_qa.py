@@ -0,0 +1,89 @@
+import json
+
+from rag import batch_qa
+from rag.telemetry import stage
+
+
+def _fake_answer(question, top_k, history, filters):
+    with stage("generation"):
+        pass
+    if "boom" in question:
+        raise RuntimeError("provider down")
+    return f"Réponse à {question} [1]", [{"doc_id": (filters or {}).get("doc_id")}]
+
+
+def _write_questions(path, rows):
+    path.write_text("\n".join(json.dumps(row) for row in rows) + "\n", encoding="utf-8")
+
+
+def _read_results(path):
+    return {row["id"]: row for row in map(json.loads, path.read_text(encoding="utf-8").splitlines())}
+
+
+def test_batch_streams_results_with_timings_and_errors(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(batch_qa, "answer_question", _fake_answer)
+    source = tmp_path / "questions.jsonl"
+    _write_questions(
+        source,
+        [
+            {"id": "a", "question": "Délai de paiement ?", "filters": {"doc_id": "d1"}},
+            {"question": "boom"},
+            {"id": "c", "question": "Pénalités ?", "history": [{"role": "user", "content": "Bonjour"}]},
+        ],
+    )
+    output = tmp_path / "answers.jsonl"
+
+    summary = batch_qa.run_batch(source, output, concurrency=2)
+
+    results = _read_results(output)
+    assert summary["done"] == 3 and summary["errors"] == 1
+    assert results["a"]["sources"] == [{"doc_id": "d1"}]
+    assert set(results["a"]["timings_ms"]) == {"sanitize", "generation"}
+    assert results["2"]["error"].startswith("RuntimeError")
+
+
+def test_resume_skips_successful_ids_and_retries_failures(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(batch_qa, "answer_question", _fake_answer)
+    source = tmp_path / "questions.jsonl"
+    _write_questions(source, [{"id": "a", "question": "Délai ?"}, {"id": "b", "question": "boom"}])
+    output = tmp_path / "answers.jsonl"
+    batch_qa.run_batch(source, output, concurrency=1)
+
+    _write_questions(source, [{"id": "a", "question": "Délai ?"}, {"id": "b", "question": "Pénalités ?"}])
+    summary = batch_qa.run_batch(source, output, concurrency=1, resume=True)
+
+    assert summary["skipped"] == 1 and summary["done"] == 1
+    lines = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert sorted(line["id"] for line in lines[:2]) == ["a", "b"]
+    assert lines[-1]["id"] == "b" and lines[-1]["error"] is None
+
+
+def test_resume_drops_a_truncated_last_line(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(batch_qa, "answer_question", _fake_answer)
+    source = tmp_path / "questions.jsonl"
+    _write_questions(source, [{"id": "a", "question": "Délai ?"}, {"id": "b", "question": "Pénalités ?"}])
+    output = tmp_path / "answers.jsonl"
+    batch_qa.run_batch(source, output, concurrency=1)
+    first, second = output.read_text(encoding="utf-8").splitlines()
+    output.write_text(first + "\n" + second[: len(second) // 2], encoding="utf-8")  # killed mid-write
+
+    summary = batch_qa.run_batch(source, output, concurrency=1, resume=True)
+
+    assert summary["skipped"] == 1 and summary["done"] == 1
+    results = _read_results(output)  # every line parses again
+    assert sorted(results) == ["a", "b"] and results["b"]["error"] is None
+
+
+def test_duplicate_ids_are_reported_not_answered_twice(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(batch_qa, "answer_question", _fake_answer)
+    source = tmp_path / "questions.jsonl"
+    # The implicit id of line 2 is "2", already taken by the explicit id of line 1.
+    _write_questions(source, [{"id": "2", "question": "Délai ?"}, {"question": "Pénalités ?"}])
+    output = tmp_path / "answers.jsonl"
+
+    summary = batch_qa.run_batch(source, output, concurrency=1)
+
+    lines = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert summary["done"] == 2 and summary["errors"] == 1
+    assert [line["error"] is None for line in lines if line.get("line") is None] == [True]
+    assert [line["line"] for line in lines if line.get("error")] == [2]
@@ -17,3 +17,18 @@ def test_chunk_text_splits_at_legal_headings() -> None:
 
 def test_chunk_text_returns_empty_for_blank_input() -> None:
     assert chunk_text("", chunk_size=50, overlap=0, use_tiktoken=False) == []
+
+
+def test_chunk_byte_spans_and_token_estimate() -> None:
+    from rag.chunking import chunk_byte_spans, count_tokens
+
+    text = "Été : article 1. Déjà payé. Été : article 1."
+    chunks = ["Été : article 1.", "Déjà payé.", "Été : article 1.", "absent"]
+
+    spans = chunk_byte_spans(text, chunks)
+
+    raw = text.encode("utf-8")
+    assert [raw[start:end].decode("utf-8") for start, end in spans[:3]] == chunks[:3]
+    assert spans[0] != spans[2]
+    assert spans[3] is None
+    assert count_tokens("abcdefgh", use_tiktoken=False) == 2
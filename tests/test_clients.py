@@ -0,0 +1,157 @@
+import httpx
+import openai
+import pytest
+
+from rag import clients
+from rag.clients import AdaptiveConcurrencyLimiter, ClientPool, PoolSettings, PooledChatOpenAI, TokenBucket
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _rate_limit_error() -> openai.RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    response = httpx.Response(429, request=request)
+    return openai.RateLimitError("rate limited", response=response, body=None)
+
+
+def test_token_bucket_waits_for_refill() -> None:
+    clock = _FakeClock()
+    bucket = TokenBucket(60, capacity=2, clock=clock, sleep=clock.sleep)
+
+    bucket.acquire()
+    bucket.acquire()
+    bucket.acquire()
+
+    assert clock.sleeps == [pytest.approx(1.0)]
+
+
+def test_token_bucket_raises_past_deadline() -> None:
+    clock = _FakeClock()
+    bucket = TokenBucket(60, capacity=1, clock=clock, sleep=clock.sleep)
+    bucket.acquire()
+
+    with pytest.raises(TimeoutError):
+        bucket.acquire(deadline=0.5)
+
+
+def test_pool_retries_throttled_calls_and_shrinks_concurrency() -> None:
+    clock = _FakeClock()
+    pool = ClientPool(
+        PoolSettings(requests_per_minute=600, tokens_per_minute=0, max_concurrency=8, max_retries=3),
+        clock=clock,
+        sleep=clock.sleep,
+    )
+    attempts = []
+
+    def flaky(timeout):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _rate_limit_error()
+        return "ok"
+
+    assert pool.call(flaky) == "ok"
+    assert len(attempts) == 3
+    assert pool.concurrency.limit < 8
+    assert pool.concurrency.in_flight == 0
+
+
+def test_pool_gives_up_after_max_retries() -> None:
+    clock = _FakeClock()
+    pool = ClientPool(
+        PoolSettings(requests_per_minute=600, tokens_per_minute=0, max_retries=1),
+        clock=clock,
+        sleep=clock.sleep,
+    )
+
+    def always_throttled(timeout):
+        raise _rate_limit_error()
+
+    with pytest.raises(openai.RateLimitError):
+        pool.call(always_throttled)
+
+
+def test_concurrency_limit_recovers_additively() -> None:
+    limiter = AdaptiveConcurrencyLimiter(4)
+    limiter.acquire()
+    limiter.release(throttled=True)
+    assert limiter.limit == 2
+
+    for _ in range(10):
+        limiter.acquire()
+        limiter.release()
+    assert 2 < limiter.limit <= 4
+
+
+def test_each_attempt_gets_the_time_left_before_the_deadline() -> None:
+    clock = _FakeClock()
+    pool = ClientPool(
+        PoolSettings(requests_per_minute=0, tokens_per_minute=0, max_retries=3, base_delay=4, timeout=10),
+        clock=clock,
+        sleep=clock.sleep,
+    )
+    attempts: list[tuple[float, float]] = []
+
+    def slow_then_throttled(timeout):
+        attempts.append((clock.now, timeout))
+        clock.now += 3  # time spent in the failed request
+        raise _rate_limit_error()
+
+    with pytest.raises(openai.RateLimitError):
+        pool.call(slow_then_throttled, timeout=20)
+
+    assert len(attempts) > 1
+    assert attempts[0][1] == 10  # capped at the pool's request timeout
+    for started, timeout in attempts:
+        assert timeout == pytest.approx(min(10, 20 - started))
+
+
+def test_chat_model_streams_and_async_calls_through_the_pool(monkeypatch) -> None:
+    import asyncio
+    from functools import partial
+
+    from langchain_core.language_models.chat_models import generate_from_stream
+    from langchain_core.messages import AIMessageChunk, HumanMessage
+    from langchain_core.outputs import ChatGenerationChunk
+    from langchain_openai import ChatOpenAI
+
+    pool = ClientPool(PoolSettings(requests_per_minute=0, tokens_per_minute=0, max_concurrency=1, timeout=7))
+    monkeypatch.setattr(clients, "get_client_pool", lambda name: pool)
+    seen: list[tuple[int, float]] = []
+
+    def fake_stream(self, messages, stop=None, run_manager=None, **kwargs):
+        for word in ("bon", "jour"):
+            seen.append((pool.concurrency.in_flight, kwargs["timeout"]))
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+    def fake_generate(self, messages, stop=None, run_manager=None, **kwargs):
+        # Like ChatOpenAI: a streaming model collects its own (pooled) `_stream`.
+        stream = self._stream if self.streaming else partial(fake_stream, self)
+        return generate_from_stream(stream(messages, stop, run_manager, **kwargs))
+
+    monkeypatch.setattr(ChatOpenAI, "_stream", fake_stream)
+    monkeypatch.setattr(ChatOpenAI, "_generate", fake_generate)
+    model = PooledChatOpenAI(api_key="sk-test", model="gpt-test", streaming=True)
+    messages = [HumanMessage(content="Bonjour ?")]
+
+    assert "".join(chunk.content for chunk in model.stream(messages)) == "bonjour"
+
+    async def run_async() -> str:
+        parts = [chunk.content async for chunk in model.astream(messages)]
+        return "".join(parts) + "|" + (await model.ainvoke(messages)).content
+
+    assert asyncio.run(run_async()) == "bonjour|bonjour"
+    plain = PooledChatOpenAI(api_key="sk-test", model="gpt-test")
+    assert asyncio.run(plain.ainvoke(messages)).content == "bonjour"
+    assert seen and all(in_flight == 1 and 0 < timeout <= 7 for in_flight, timeout in seen)
+    assert pool.concurrency.in_flight == 0
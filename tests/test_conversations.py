@@ -44,3 +44,102 @@ def test_delete_conversation_removes_messages(tmp_path) -> None:
     assert store.list_messages(conv.conversation_id) == []
     assert store.get_conversation(conv.conversation_id) is None
     assert store.delete_conversation("missing") is False
+
+
+def test_list_messages_keyset_pagination(tmp_path) -> None:
+    store = ConversationStore(tmp_path / "conversations.sqlite3")
+    conv = store.create_conversation("Long")
+    other = store.create_conversation("Other")
+    ids = [store.add_message(conv.conversation_id, "user", f"m{idx}").message_id for idx in range(7)]
+    store.add_message(other.conversation_id, "user", "elsewhere")
+
+    latest = store.list_messages(conv.conversation_id, limit=3)
+    assert [m.content for m in latest] == ["m4", "m5", "m6"]
+
+    older = store.list_messages(conv.conversation_id, before=latest[0].message_id, limit=3)
+    assert [m.content for m in older] == ["m1", "m2", "m3"]
+    assert store.has_messages_before(conv.conversation_id, older[0].message_id) is True
+    assert store.has_messages_before(conv.conversation_id, ids[0]) is False
+
+    newer = store.list_messages(conv.conversation_id, after=ids[4])
+    assert [m.content for m in newer] == ["m5", "m6"]
+    assert [m.content for m in store.list_messages(conv.conversation_id, after=ids[1], limit=2)] == ["m2", "m3"]
+    assert len(store.list_messages(conv.conversation_id)) == 7
+
+
+def test_rolling_summary_condenses_old_messages_within_budget(tmp_path) -> None:
+    store = ConversationStore(tmp_path / "conversations.sqlite3")
+    conv = store.create_conversation("Long")
+    store.add_message(conv.conversation_id, "user", "Quel est le délai de paiement du contrat Durand ?")
+    for idx in range(40):
+        store.add_message(conv.conversation_id, "assistant", f"Réponse {idx} " + "détail " * 60)
+
+    summary = store.get_summary(conv.conversation_id)
+    lines = summary.splitlines()
+    assert len(summary) <= 1200
+    assert lines[-1].startswith("Assistant: Réponse 39")
+    assert len(lines[0]) <= 100  # older lines are condensed before being dropped
+    assert store.get_summary("missing") == ""
+
+
+def test_roll_summary_is_incremental() -> None:
+    from rag.conversations import roll_summary
+
+    summary = ""
+    for role, content in [("user", "Bonjour"), ("assistant", "  Bonjour,\n comment puis-je aider ? "), ("user", "")]:
+        summary = roll_summary(summary, role, content, max_chars=200)
+    assert summary == "User: Bonjour\nAssistant: Bonjour, comment puis-je aider ?"
+    assert len(roll_summary(summary, "user", "x" * 500, max_chars=60)) <= 60
+
+
+def test_search_messages_ranks_snippets_and_follows_deletes(tmp_path) -> None:
+    store = ConversationStore(tmp_path / "conversations.sqlite3")
+    durand = store.create_conversation("Durand")
+    other = store.create_conversation("Autre")
+    store.add_message(durand.conversation_id, "user", "Quelles pénalités de retard pour Durand ?")
+    store.add_message(durand.conversation_id, "assistant", "Les pénalités sont de trois fois le taux légal [1].")
+    store.add_message(other.conversation_id, "user", "Délai de préavis du bail ?")
+
+    hits = store.search_messages("penalites")
+    assert {hit.conversation_id for hit in hits} == {durand.conversation_id}
+    assert "**pénalités**" in hits[0].snippet
+    assert hits[0].conversation_title == "Durand"
+    assert [hit.role for hit in store.search_messages("préav")] == ["user"]  # prefix match
+    assert store.search_messages("  ") == []
+    assert store.search_messages('"OR (') == []
+
+    store.delete_conversation(durand.conversation_id)
+    assert store.search_messages("pénalités") == []
+
+
+def test_add_exchange_writes_pair_and_trace_in_one_transaction(tmp_path) -> None:
+    from rag.telemetry import StageRecord, TelemetryStore, Trace
+
+    store = ConversationStore(tmp_path / "conversations.sqlite3")
+    conv = store.create_conversation()
+    trace = Trace(stages=[StageRecord("generation", 12.5, prompt_tokens=100)])
+
+    user_msg, assistant_msg = store.add_exchange(
+        conv.conversation_id, "Délai ?", "30 jours [1].", sources=[{"doc_id": "d1"}], trace=trace
+    )
+
+    assert assistant_msg.message_id == user_msg.message_id + 1
+    messages = store.list_messages(conv.conversation_id)
+    assert [(m.role, m.content) for m in messages] == [("user", "Délai ?"), ("assistant", "30 jours [1].")]
+    assert messages[1].sources == [{"doc_id": "d1"}]
+    assert store.get_summary(conv.conversation_id) == "User: Délai ?\nAssistant: 30 jours [1]."
+    stages = TelemetryStore(store.path).stages_for_message(assistant_msg.message_id)
+    assert [(s.stage, s.prompt_tokens) for s in stages] == [("generation", 100)]
+
+
+def test_conversation_counter_tracks_creates_and_deletes(tmp_path) -> None:
+    store = ConversationStore(tmp_path / "conversations.sqlite3")
+    first = store.create_conversation()
+    second = store.create_conversation()
+    assert (first.title, second.title) == ("Conversation 1", "Conversation 2")
+
+    store.delete_conversation(first.conversation_id)
+    assert store.count_conversations() == 1
+    assert store.create_conversation().title == "Conversation 2"
+    assert store.create_conversation("Nommée").title == "Nommée"
+    assert ConversationStore(store.path).count_conversations() == 3
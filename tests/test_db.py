@@ -0,0 +1,46 @@
+import threading
+
+from rag.conversations import ConversationStore
+from rag.db import get_pool
+from rag.registry import DocumentRecord, DocumentRegistry
+
+
+def test_pool_applies_pragmas_and_reuses_connections(tmp_path) -> None:
+    pool = get_pool(tmp_path / "app.sqlite3")
+
+    with pool.connection() as conn:
+        first = conn
+        assert conn.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous;").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("PRAGMA busy_timeout;").fetchone()[0] > 0
+    with pool.connection() as conn:
+        assert conn is first
+    assert get_pool(tmp_path / "app.sqlite3") is pool
+
+
+def test_concurrent_sessions_do_not_hit_locked_database(tmp_path) -> None:
+    conversations = ConversationStore(tmp_path / "conversations.sqlite3")
+    registry = DocumentRegistry(tmp_path / "registry.sqlite3")
+    errors: list[BaseException] = []
+
+    def session(worker: int) -> None:
+        try:
+            conv = conversations.create_conversation(f"Session {worker}")
+            for turn in range(20):
+                conversations.add_message(conv.conversation_id, "user", f"question {turn}")
+                conversations.list_conversations()
+                conversations.list_messages(conv.conversation_id)
+                registry.list()
+            registry.add(DocumentRecord(f"doc{worker}", "a.txt", "/tmp/a.txt", "txt", [f"doc{worker}_c1"]))
+        except BaseException as err:  # noqa: BLE001 - surfaced through the assertion below
+            errors.append(err)
+
+    threads = [threading.Thread(target=session, args=(idx,)) for idx in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert conversations.count_conversations() == 12
+    assert len(registry.list()) == 12
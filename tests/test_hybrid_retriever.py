@@ -1,5 +1,10 @@
+import numpy as np
+
+from rag.numpy_store import NumpyVectorStore
+from rag.pipeline import hybrid_retriever
 from rag.pipeline.hybrid_retriever import HybridRetriever
 from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
 
 
 def test_hybrid_retriever_fallback_dense_only(monkeypatch):
@@ -33,3 +38,199 @@ def test_notify_docs_changed_marks_bm25_stale():
     HybridRetriever.notify_docs_changed()
     assert HybridRetriever._bm25_stale is True
     assert HybridRetriever._bm25_ready is False
+
+
+class _KeywordEmbeddings(Embeddings):
+    vocabulary = ("contrat", "facture", "article", "cassation")
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(text.lower().count(word)) + 0.01 for word in self.vocabulary]
+
+
+def _numpy_backed_retriever(tmp_path, monkeypatch):
+    store = NumpyVectorStore(tmp_path, _KeywordEmbeddings())
+    store.add_texts(
+        [
+            "contrat de prestation article 3",
+            "facture impayée client Z",
+            "article L.225-1 du code de commerce",
+            "arrêt de cassation chambre commerciale",
+        ],
+        metadatas=[{"chunk_id": f"c{idx}", "doc_id": f"d{idx}", "chunk_index": 0} for idx in range(4)],
+        ids=[f"c{idx}" for idx in range(4)],
+    )
+    monkeypatch.setattr(hybrid_retriever, "init_vector_store", lambda: store)
+    HybridRetriever.notify_docs_changed()
+    return HybridRetriever(dense_k=2, lexical_k=2, lexical_weight=0.5)
+
+
+def test_notify_during_rebuild_leaves_index_stale(tmp_path, monkeypatch):
+    retriever = _numpy_backed_retriever(tmp_path, monkeypatch)
+    store = hybrid_retriever.init_vector_store()
+    read_corpus = store.get
+
+    def get_then_change_corpus(*args, **kwargs):
+        data = read_corpus(*args, **kwargs)
+        HybridRetriever.notify_docs_changed()  # e.g. an ingestion finishing mid-rebuild
+        return data
+
+    monkeypatch.setattr(store, "get", get_then_change_corpus)
+    retriever._ensure_bm25()
+
+    assert HybridRetriever._bm25_needs_rebuild()
+    assert HybridRetriever._bm25 is None
+
+    monkeypatch.setattr(store, "get", read_corpus)
+    retriever._ensure_bm25()
+    assert not HybridRetriever._bm25_needs_rebuild()
+    HybridRetriever.notify_docs_changed()
+
+
+def test_batch_matches_individual_invocations(tmp_path, monkeypatch):
+    retriever = _numpy_backed_retriever(tmp_path, monkeypatch)
+    monkeypatch.setattr(hybrid_retriever, "init_quantized_index", lambda: None)
+    # BM25 scores stay small on a four-chunk corpus; lets "article L.225-1" take the lexical route.
+    monkeypatch.setattr(hybrid_retriever.query_router, "min_score", 0.1)
+    queries = ["facture client", "article cassation", "contrat", "article L.225-1"]
+
+    def ids(docs):
+        return [d.metadata["chunk_id"] for d in docs]
+
+    for filters in (None, {"doc_id": ["d0", "d2", "d3"]}):
+        hybrid_retriever.query_router.reset()
+        batched = retriever.batch(queries, k=2, filters=filters)
+        assert hybrid_retriever.query_router.report()["lexical"]["count"] == 1
+
+        assert len(batched) == len(queries)
+        for query, docs in zip(queries, batched):
+            assert ids(docs) == ids(retriever.invoke(query, k=2, filters=filters)), (query, filters)
+    HybridRetriever.notify_docs_changed()
+
+
+def test_batch_matches_invoke_with_ties_and_unmatched_chunks(tmp_path, monkeypatch):
+    # Far more chunks than the lexical_k * 2 candidates, many sharing the same text (tied BM25
+    # scores) and many matching no query term (zero scores).
+    templates = [
+        "pénalités de retard du contrat",
+        "facture impayée client Z",
+        "clause de confidentialité",
+        "article L.225-1 du code de commerce",
+        "arrêt de cassation chambre commerciale",
+        "annexe technique",
+    ]
+    texts = [templates[idx % len(templates)] for idx in range(60)]
+    store = NumpyVectorStore(tmp_path, _KeywordEmbeddings())
+    store.add_texts(
+        texts,
+        metadatas=[{"chunk_id": f"c{idx}", "doc_id": f"d{idx % 7}", "chunk_index": idx} for idx in range(60)],
+        ids=[f"c{idx}" for idx in range(60)],
+    )
+    monkeypatch.setattr(hybrid_retriever, "init_vector_store", lambda: store)
+    monkeypatch.setattr(hybrid_retriever, "init_quantized_index", lambda: None)
+    HybridRetriever.notify_docs_changed()
+    retriever = HybridRetriever(dense_k=3, lexical_k=3, lexical_weight=0.5)
+    queries = ["pénalités de retard", "facture client", "cassation", "annexe", "délai de paiement"]
+
+    def ids(docs):
+        return [d.metadata["chunk_id"] for d in docs]
+
+    for filters in (None, {"doc_id": ["d1", "d2", "d5"]}):
+        batched = retriever.batch(queries, k=6, filters=filters)
+        for query, docs in zip(queries, batched):
+            assert ids(docs) == ids(retriever.invoke(query, k=6, filters=filters)), (query, filters)
+    HybridRetriever.notify_docs_changed()
+
+
+def test_vectorized_lexical_scores_match_rank_bm25(tmp_path, monkeypatch):
+    retriever = _numpy_backed_retriever(tmp_path, monkeypatch)
+    retriever._ensure_bm25()
+    query = "article de cassation"
+
+    scores = HybridRetriever._lexical_scores([query])[0]
+    expected = HybridRetriever._bm25.vectorizer.get_scores(query.split())
+
+    assert [round(float(v), 4) for v in scores] == [round(float(v), 4) for v in expected]
+    HybridRetriever.notify_docs_changed()
+
+
+def test_query_router_recognizes_legal_references():
+    router = hybrid_retriever.QueryRouter()
+
+    assert router.reference_kind("article L.225-1") == "article"
+    assert router.reference_kind("arrêt Cass. com. 2023 n° 21-12.345") == "case_number"
+    assert router.reference_kind("facture FAC-2024-017 du client Z") == "invoice_or_client"
+    assert router.reference_kind("client n° A12") == "invoice_or_client"
+    assert router.reference_kind("dossier du client C-1042") == "invoice_or_client"
+    assert router.reference_kind("Quelles sont les pénalités de retard prévues ?") is None
+
+
+def test_query_router_leaves_free_text_client_and_invoice_questions_alone():
+    router = hybrid_retriever.QueryRouter()
+
+    for question in (
+        "Le client a-t-il payé la facture ?",
+        "Quelles factures du client Dupont sont en retard ?",
+        "Comment relancer un client nouveau ?",
+        "facture de prestation",
+    ):
+        assert router.reference_kind(question) is None, question
+
+
+def test_query_router_is_not_confident_without_positive_scores():
+    router = hybrid_retriever.QueryRouter(min_score=0.0)
+
+    assert router.is_confident(np.zeros(3, dtype=np.float32)) is False
+    assert router.is_confident(np.array([0.0, 2.0, 0.5], dtype=np.float32)) is True
+
+
+def test_reference_query_skips_dense_branch_when_lexical_is_confident(tmp_path, monkeypatch):
+    retriever = _numpy_backed_retriever(tmp_path, monkeypatch)
+
+    class FailingDense:
+        def invoke(self, query):
+            raise AssertionError("dense branch should be skipped")
+
+    retriever._dense = FailingDense()  # type: ignore
+    monkeypatch.setattr(hybrid_retriever, "init_quantized_index", lambda: None)
+    # BM25 scores stay small on a four-chunk corpus.
+    monkeypatch.setattr(hybrid_retriever.query_router, "min_score", 0.1)
+    hybrid_retriever.query_router.reset()
+
+    docs = retriever.invoke("article L.225-1", k=2)
+
+    assert docs[0].metadata["chunk_id"] == "c2"
+    assert hybrid_retriever.query_router.report()["lexical"]["count"] == 1
+    HybridRetriever.notify_docs_changed()
+
+
+def test_invoke_records_each_stage_once_per_trace(tmp_path, monkeypatch):
+    from rag.telemetry import start_trace
+
+    retriever = _numpy_backed_retriever(tmp_path, monkeypatch)
+    monkeypatch.setattr(hybrid_retriever, "init_quantized_index", lambda: None)
+
+    with start_trace() as trace:
+        retriever.invoke("facture FAC-2024-017", k=2)  # a reference query that is not routed
+    with start_trace() as warm_trace:
+        retriever.invoke("facture FAC-2024-017", k=2)
+
+    # The lazy BM25 rebuild is its own stage, recorded only when it runs.
+    assert [record.stage for record in trace.stages] == ["bm25_index", "route", "dense", "bm25", "fusion"]
+    assert [record.stage for record in warm_trace.stages] == ["route", "dense", "bm25", "fusion"]
+    HybridRetriever.notify_docs_changed()
+
+
+def test_filters_restrict_dense_and_lexical_results(tmp_path, monkeypatch):
+    retriever = _numpy_backed_retriever(tmp_path, monkeypatch)
+    monkeypatch.setattr(hybrid_retriever, "init_quantized_index", lambda: None)
+    HybridRetriever.notify_docs_changed()
+
+    docs = retriever.invoke("facture client", k=4, filters={"doc_id": ["d1", "d3"]})
+    batched = retriever.batch(["facture client"], k=4, filters={"doc_id": ["d1", "d3"]})[0]
+
+    assert {doc.metadata["doc_id"] for doc in docs} == {"d1", "d3"}
+    assert docs[0].metadata["doc_id"] == "d1"
+    assert [doc.page_content for doc in batched] == [doc.page_content for doc in docs]
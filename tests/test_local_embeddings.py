@@ -0,0 +1,40 @@
+import numpy as np
+
+from rag import vector_store
+from rag.local_embeddings import HashingEmbeddings
+
+
+def test_hashing_embeddings_are_deterministic_and_normalized() -> None:
+    embedder = HashingEmbeddings(dim=64)
+
+    first = embedder.embed_documents(["Pénalités de retard", "Article 3 du contrat"])
+    again = HashingEmbeddings(dim=64).embed_documents(["Pénalités de retard", "Article 3 du contrat"])
+
+    assert np.allclose(first, again)
+    assert np.allclose(np.linalg.norm(first, axis=1), 1.0)
+    assert len(embedder.embed_query("")) == 64
+
+
+def test_hashing_embeddings_rank_related_text_first() -> None:
+    embedder = HashingEmbeddings(dim=256)
+    docs = embedder.embed_array(
+        [
+            "Les pénalités de retard sont égales à trois fois le taux d'intérêt légal.",
+            "Tout litige relève du tribunal de commerce de Lyon.",
+        ]
+    )
+    query = embedder.embed_array(["penalites de retard"])[0]
+
+    assert docs[0] @ query > docs[1] @ query
+
+
+def test_init_embedder_selects_local_provider(monkeypatch) -> None:
+    monkeypatch.setattr(vector_store, "EMBEDDINGS_PROVIDER", "local")
+    monkeypatch.setattr(vector_store, "LOCAL_EMBEDDINGS_DIM", 32)
+    vector_store.init_embedder.cache_clear()
+    try:
+        embedder = vector_store.init_embedder()
+        assert isinstance(embedder, HashingEmbeddings)
+        assert embedder.dim == 32
+    finally:
+        vector_store.init_embedder.cache_clear()
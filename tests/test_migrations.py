@@ -0,0 +1,92 @@
+import sqlite3
+
+import pytest
+
+from rag.migrations import Migration, backfill_registry, current_version, deferred_versions, migrate
+from rag.registry import DocumentRegistry
+
+
+def test_migrate_applies_pending_steps_once_in_order(tmp_path) -> None:
+    conn = sqlite3.connect(tmp_path / "app.sqlite3")
+    calls = []
+    steps = [
+        Migration(1, "one", lambda c: calls.append(1)),
+        Migration(2, "two", lambda c: calls.append(2)),
+    ]
+
+    assert migrate(conn, "demo", steps) == [1, 2]
+    assert migrate(conn, "demo", steps) == []
+    assert migrate(conn, "demo", [*steps, Migration(3, "three", lambda c: calls.append(3))]) == [3]
+    assert calls == [1, 2, 3]
+    assert current_version(conn, "demo") == 3
+    assert current_version(conn, "other") == 0
+    with pytest.raises(ValueError):
+        migrate(conn, "bad", [steps[1], steps[0]])
+
+
+def test_unavailable_step_is_deferred_and_retried(tmp_path) -> None:
+    conn = sqlite3.connect(tmp_path / "app.sqlite3")
+    available = {"fts": False}
+    calls = []
+    steps = [
+        Migration(1, "one", lambda c: calls.append(1)),
+        Migration(2, "needs an extension", lambda c: available["fts"]),
+        Migration(3, "three", lambda c: calls.append(3)),
+    ]
+
+    assert migrate(conn, "demo", steps) == [1, 3]
+    assert (current_version(conn, "demo"), deferred_versions(conn, "demo")) == (3, {2})
+    assert migrate(conn, "demo", steps) == []
+
+    available["fts"] = True
+    assert migrate(conn, "demo", steps) == [2]
+    assert deferred_versions(conn, "demo") == set() and calls == [1, 3]
+
+
+def test_failed_step_rolls_back_with_the_transaction(tmp_path) -> None:
+    conn = sqlite3.connect(tmp_path / "app.sqlite3")
+
+    def boom(c):
+        c.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("step failed")
+
+    def ddl(c):
+        c.execute("CREATE TABLE first_step (id INTEGER)")
+
+    with pytest.raises(RuntimeError), conn:
+        migrate(conn, "demo", [Migration(1, "ddl", ddl), Migration(2, "boom", boom)])
+    assert current_version(conn, "demo") == 0
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name IN ('first_step', 'half_done')").fetchall() == []
+
+
+class _FakeVectorStore:
+    def get(self, include=None, **_kwargs):
+        return {
+            "ids": ["d1_chunk_0001", "d1_chunk_0000", "known_chunk_0000"],
+            "documents": ["second", "first", "other"],
+            "metadatas": [
+                {"doc_id": "d1", "chunk_index": 1, "original_name": "bail.pdf", "doc_format": "pdf"},
+                {"doc_id": "d1", "chunk_index": 0, "original_name": "bail.pdf", "doc_format": "pdf"},
+                {"doc_id": "known", "chunk_index": 0},
+            ],
+        }
+
+
+def test_backfill_registry_restores_documents_from_vector_metadata(tmp_path) -> None:
+    from rag.registry import DocumentRecord
+
+    uploads = tmp_path / "uploads"
+    uploads.mkdir()
+    (uploads / "d1_bail.pdf").write_bytes(b"%PDF")
+    registry = DocumentRegistry(tmp_path / "registry.sqlite3")
+    registry.add(DocumentRecord("known", "k.txt", "/tmp/k.txt", "txt", ["known_chunk_0000"]))
+
+    assert backfill_registry(registry, _FakeVectorStore(), uploads) == 1
+    assert backfill_registry(registry, _FakeVectorStore(), uploads) == 0
+
+    restored = registry.get("d1")
+    assert (restored.original_name, restored.ext) == ("bail.pdf", "pdf")
+    assert restored.stored_path == str(uploads / "d1_bail.pdf")
+    assert restored.chunk_ids == ["d1_chunk_0000", "d1_chunk_0001"]
+    assert all(chunk.content_hash for chunk in registry.get_chunks("d1"))
+    assert (restored.size_bytes, restored.preview) == (4, "first")
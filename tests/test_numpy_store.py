@@ -0,0 +1,157 @@
+import json
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag.numpy_store import NumpyVectorStore
+
+
+class _KeywordEmbeddings(Embeddings):
+    """Counts a few keywords so similarity is predictable in tests."""
+
+    vocabulary = ("contrat", "facture", "article", "cassation")
+
+    def _embed(self, text: str) -> list[float]:
+        lowered = text.lower()
+        return [float(lowered.count(word)) + 0.01 for word in self.vocabulary]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def _store(tmp_path) -> NumpyVectorStore:
+    store = NumpyVectorStore(tmp_path, _KeywordEmbeddings())
+    store.add_texts(
+        ["contrat contrat signé", "facture impayée", "article L.225-1", "arrêt de cassation"],
+        metadatas=[{"doc_id": "a"}, {"doc_id": "b"}, {"doc_id": "c"}, {"doc_id": "c"}],
+        ids=["a_0", "b_0", "c_0", "c_1"],
+    )
+    return store
+
+
+def test_similarity_search_returns_best_match_first(tmp_path) -> None:
+    store = _store(tmp_path)
+
+    hits = store.similarity_search_with_score("facture", k=2)
+
+    assert hits[0][0].metadata["doc_id"] == "b"
+    assert hits[0][1] >= hits[1][1]
+    assert len(store.similarity_search("contrat", k=10)) == 4
+
+
+def test_batched_search_matches_single_queries(tmp_path) -> None:
+    store = _store(tmp_path)
+    queries = ["contrat", "cassation"]
+
+    batched = store.similarity_search_batch(queries, k=1)
+
+    assert [docs[0].page_content for docs in batched] == [
+        store.similarity_search(query, k=1)[0].page_content for query in queries
+    ]
+
+
+def test_filter_delete_and_reload_from_disk(tmp_path) -> None:
+    store = _store(tmp_path)
+
+    filtered = store.similarity_search("contrat", k=4, filter={"doc_id": "c"})
+    assert {doc.metadata["doc_id"] for doc in filtered} == {"c"}
+
+    store.delete(where={"doc_id": "c"})
+    store.delete(ids=["a_0"])
+
+    reloaded = NumpyVectorStore(tmp_path, _KeywordEmbeddings())
+    data = reloaded.get(include=["documents", "metadatas", "embeddings"])
+    assert data["ids"] == ["b_0"]
+    assert data["documents"] == ["facture impayée"]
+    assert data["embeddings"].shape == (1, 4)
+
+
+def test_add_texts_upserts_existing_ids(tmp_path) -> None:
+    store = _store(tmp_path)
+
+    store.add_texts(["facture facture"], metadatas=[{"doc_id": "b"}], ids=["b_0"])
+
+    assert len(store) == 4
+    assert store.get(ids=["b_0"])["documents"] == ["facture facture"]
+
+
+def test_appends_are_incremental_and_committed_by_the_manifest(tmp_path) -> None:
+    store = _store(tmp_path)
+    directory = tmp_path / "documents"
+    generation = json.loads((directory / "manifest.json").read_text())["generation"]
+
+    store.add_texts(["nouveau contrat"], metadatas=[{"doc_id": "d"}], ids=["d_0"])
+    manifest = json.loads((directory / "manifest.json").read_text())
+    assert manifest["generation"] == generation and manifest["rows"] == 5  # appended, not rewritten
+
+    # A crash after the data files were appended but before the manifest moved: the tail is ignored.
+    with (directory / f"vectors.{generation}.f32").open("ab") as handle:
+        handle.write(np.ones(4, dtype=np.float32).tobytes()[:6])
+    with (directory / f"metadata.{generation}.jsonl").open("ab") as handle:
+        handle.write(b'{"id": "partial", "docu')
+
+    reloaded = NumpyVectorStore(tmp_path, _KeywordEmbeddings())
+    assert reloaded.get()["ids"] == ["a_0", "b_0", "c_0", "c_1", "d_0"]
+    reloaded.add_texts(["facture"], ids=["e_0"])
+    again = NumpyVectorStore(tmp_path, _KeywordEmbeddings())
+    assert again.get()["ids"][-2:] == ["d_0", "e_0"]
+    assert len(again) == 6 and again.get(ids=["e_0"])["documents"] == ["facture"]
+
+
+def test_writers_sharing_a_directory_do_not_overwrite_each_other(tmp_path) -> None:
+    # Two instances stand in for two app workers: each holds its own in-memory state and
+    # thread lock, so only the file lock and the manifest reload keep their writes apart.
+    first = _store(tmp_path)
+    second = NumpyVectorStore(tmp_path, _KeywordEmbeddings())
+
+    def ingest(store: NumpyVectorStore, prefix: str) -> None:
+        for idx in range(10):
+            texts = [f"{prefix} contrat {idx}", f"{prefix} facture {idx}"]
+            store.add_texts(texts, ids=[f"{prefix}{idx}a", f"{prefix}{idx}b"])
+
+    threads = [
+        threading.Thread(target=ingest, args=(store, prefix)) for store, prefix in ((first, "x"), (second, "y"))
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    second.delete(ids=["a_0"])
+    first.add_texts(["facture"])  # generated id, after the other instance's delete
+
+    reloaded = NumpyVectorStore(tmp_path, _KeywordEmbeddings())
+    data = reloaded.get()
+    assert len(reloaded) == 4 - 1 + 40 + 1 == len(set(data["ids"]))
+    assert data["documents"][data["ids"].index("y9b")] == "y facture 9"
+    full = reloaded.get(include=["documents", "embeddings"])
+    expected = np.array(_KeywordEmbeddings().embed_documents(full["documents"]), dtype=np.float32)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    assert np.allclose(full["embeddings"], expected, atol=1e-6)  # every vector still sits on its own row
+
+
+def test_repeated_ids_in_one_batch_are_stored_once(tmp_path) -> None:
+    store = _store(tmp_path)
+
+    store.add_texts(["contrat", "facture", "contrat signé"], ids=["d_0", "d_1", "d_0"])
+
+    reloaded = NumpyVectorStore(tmp_path, _KeywordEmbeddings())
+    assert reloaded.get()["ids"] == ["a_0", "b_0", "c_0", "c_1", "d_0", "d_1"]
+    assert reloaded.get(ids=["d_0"])["documents"] == ["contrat signé"]
+
+
+def test_legacy_single_file_layout_is_migrated(tmp_path) -> None:
+    directory = tmp_path / "documents"
+    directory.mkdir()
+    np.asarray([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32).tofile(directory / "vectors.f32")
+    (directory / "metadata.json").write_text(
+        json.dumps({"dim": 2, "ids": ["x", "y"], "documents": ["X", "Y"], "metadatas": [{}, {"k": 1}]})
+    )
+
+    store = NumpyVectorStore(tmp_path, _KeywordEmbeddings())
+
+    assert store.get(ids=["y"])["metadatas"] == [{"k": 1}]
+    assert not (directory / "vectors.f32").exists() and (directory / "manifest.json").exists()
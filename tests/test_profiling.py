@@ -0,0 +1,47 @@
+from rag import profiling
+
+
+def _work(size: int) -> int:
+    return sum(len(str(value)) for value in range(size))
+
+
+def test_profiling_off_writes_nothing(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(profiling, "PROFILES_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "off")
+
+    assert profiling.profiled("work")(_work)(100) == _work(100)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_sampled_profiles_are_written_and_rotated(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(profiling, "PROFILES_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "both")
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(profiling, "PROFILE_MAX_FILES", 3)
+    work = profiling.profiled("work")(_work)
+
+    for _ in range(4):
+        work(1000)
+
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert len(files) == 3
+    assert any(name.endswith(".prof") for name in files)
+    assert any(name.endswith(".mem.txt") for name in files)
+    latest = max(tmp_path.glob("*.prof"), key=lambda path: path.stat().st_mtime)
+    assert "_work" in profiling.summarize(latest)
+
+
+def test_nested_calls_profile_once_and_force_overrides_sampling(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(profiling, "PROFILES_DIR", tmp_path)
+    monkeypatch.setattr(profiling, "PROFILE_MODE", "cprofile")
+    monkeypatch.setattr(profiling, "PROFILE_SAMPLE_RATE", 0.0)
+    inner = profiling.profiled("inner")(_work)
+    outer = profiling.profiled("outer")(lambda: inner(500))
+
+    outer()
+    assert list(tmp_path.iterdir()) == []
+
+    with profiling.force_profiling("cprofile"):
+        outer()
+    names = [path.name for path in tmp_path.iterdir()]
+    assert len(names) == 1 and "_outer_" in names[0]
@@ -1,9 +1,12 @@
 from types import SimpleNamespace
 
+import pytest
 from langchain.schema import Document
 from langchain_core.runnables import RunnableLambda
 
 from rag.pipeline import qa
+from rag.resources import ResourceManager
+from rag.telemetry import token_usage
 
 
 class _DummyRetriever:
@@ -14,12 +17,15 @@ class _DummyRetriever:
         return self._docs
 
 
+def _use_retriever(monkeypatch, docs):
+    # answer_question asks the shared manager for its top_k=1 retriever.
+    manager = ResourceManager()
+    manager.register("retrievers", lambda: {1: _DummyRetriever(docs)})
+    monkeypatch.setattr(qa, "get_resource_manager", lambda: manager)
+
+
 def test_answer_question_no_docs_returns_message(monkeypatch):
-    monkeypatch.setattr(
-        qa,
-        "HybridRetriever",
-        lambda dense_k, lexical_k: _DummyRetriever([]),
-    )
+    _use_retriever(monkeypatch, [])
     dummy_llm = RunnableLambda(lambda _msgs: SimpleNamespace(content="unused"))
 
     answer, sources = qa.answer_question("Question ?", top_k=1, history=[], llm=dummy_llm)
@@ -30,14 +36,59 @@ def test_answer_question_no_docs_returns_message(monkeypatch):
 
 def test_answer_question_requires_citations(monkeypatch):
     docs = [Document(page_content="Context", metadata={"doc_id": "doc1", "chunk_id": "doc1::0"})]
-    monkeypatch.setattr(
-        qa,
-        "HybridRetriever",
-        lambda dense_k, lexical_k: _DummyRetriever(docs),
-    )
+    _use_retriever(monkeypatch, docs)
     dummy_llm = RunnableLambda(lambda _msgs: "Réponse sans citation")
 
     answer, sources = qa.answer_question("Question ?", top_k=1, history=[], llm=dummy_llm)
 
     assert "citation" in answer.lower()
     assert sources == []
+
+
+def test_answer_question_uses_stable_system_prefix_and_reports_cached_tokens(monkeypatch):
+    from langchain_core.messages import AIMessage
+
+    docs = [Document(page_content="Paiement à 30 jours", metadata={"doc_id": "doc1", "chunk_id": "doc1::0"})]
+    _use_retriever(monkeypatch, docs)
+    seen = []
+
+    def fake_llm(prompt_value):
+        seen.append(prompt_value.to_messages())
+        return AIMessage(
+            content="Paiement à 30 jours [1].",
+            response_metadata={
+                "token_usage": {
+                    "prompt_tokens": 1200,
+                    "completion_tokens": 12,
+                    "prompt_tokens_details": {"cached_tokens": 1024},
+                }
+            },
+        )
+
+    answer, sources = qa.answer_question("Délai ?", top_k=1, history=[], llm=RunnableLambda(fake_llm))
+
+    assert answer == "Paiement à 30 jours [1]."
+    assert sources[0]["doc_id"] == "doc1"
+    system, user = seen[0]
+    assert system.content == qa.QA_SYSTEM_PROMPT
+    assert user.content.startswith("Context:\n[1] Paiement à 30 jours")
+    assert user.content.endswith("Question: Délai ?")
+    usage = token_usage(AIMessage(content="", response_metadata={"token_usage": {"prompt_tokens": 5}}))
+    assert usage == {"prompt_tokens": 5, "completion_tokens": 0, "cached_tokens": 0}
+
+
+def test_answer_question_uses_stored_history_summary(monkeypatch):
+    docs = [Document(page_content="Paiement à 30 jours", metadata={"doc_id": "doc1", "chunk_id": "doc1::0"})]
+    _use_retriever(monkeypatch, docs)
+    monkeypatch.setattr(qa, "contextualize_history", lambda _history: pytest.fail("summary recomputed"))
+    seen = []
+
+    def fake_llm(prompt_value):
+        seen.append(prompt_value.to_messages())
+        return "Paiement à 30 jours [1]."
+
+    qa.answer_question(
+        "Délai ?", top_k=1, history=[], llm=RunnableLambda(fake_llm), history_summary="User: contrat Durand"
+    )
+
+    assert "Conversation summary:\nUser: contrat Durand\n" in seen[0][1].content
@@ -0,0 +1,93 @@
+import numpy as np
+
+from rag.quantized_index import QuantizedIndex, array_lookup, exact_search, recall_report
+
+
+def _clustered_vectors(count: int = 600, dim: int = 64) -> np.ndarray:
+    rng = np.random.default_rng(7)
+    centers = rng.normal(size=(12, dim))
+    labels = rng.integers(0, len(centers), size=count)
+    return (centers[labels] + 0.3 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def test_int8_index_matches_exact_top1(tmp_path) -> None:
+    vectors = _clustered_vectors()
+    ids = [f"chunk_{idx}" for idx in range(len(vectors))]
+    index = QuantizedIndex(tmp_path, mode="int8", rescore_multiplier=4, lookup=array_lookup(ids, vectors))
+    index.build(ids, vectors)
+
+    hits = index.search(vectors[:20], k=1)
+
+    assert [hit[0][0] for hit in hits] == ids[:20]
+    assert index.memory_bytes()["codes"] * 4 == index.memory_bytes()["float32"]
+    # Rescoring reads the store's vectors: the index keeps no float32 copy of its own.
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert files == ["codes_int8.npy", "index_int8.json", "scales.npy"]
+
+
+def test_binary_index_reloads_and_reports_recall(tmp_path) -> None:
+    vectors = _clustered_vectors()
+    ids = [f"chunk_{idx}" for idx in range(len(vectors))]
+    QuantizedIndex(tmp_path, mode="binary", rescore_multiplier=8).build(ids, vectors)
+
+    index = QuantizedIndex(tmp_path, mode="binary", rescore_multiplier=8, lookup=array_lookup(ids, vectors))
+    assert index.load() is True
+
+    report = recall_report(index, vectors, vectors[:30], k=5)
+    assert report["vectors"] == len(ids)
+    assert report["recall_at_k"] >= 0.8
+    assert report["compression_ratio"] == 32.0
+
+
+def test_index_notices_rebuild_and_clear_by_another_process(tmp_path) -> None:
+    vectors = _clustered_vectors(count=50)
+    ids = [f"chunk_{idx}" for idx in range(len(vectors))]
+    QuantizedIndex(tmp_path, mode="int8").build(ids, vectors)
+    index = QuantizedIndex(tmp_path, mode="int8")
+    assert index.load() and index.is_current()
+
+    QuantizedIndex(tmp_path, mode="int8").build(ids[:10], vectors[:10])
+    assert not index.is_current()
+    assert index.load() and len(index) == 10
+
+    QuantizedIndex(tmp_path, mode="int8").clear()
+    assert not index.is_current()
+
+
+def test_init_quantized_index_reopens_after_external_invalidation(tmp_path, monkeypatch) -> None:
+    from rag import vector_store
+    from rag.pipeline.hybrid_retriever import HybridRetriever
+
+    vectors = _clustered_vectors(count=40)
+    ids = [f"chunk_{idx}" for idx in range(len(vectors))]
+    built: list[int] = []
+
+    def build(store):
+        built.append(len(ids))
+        index = QuantizedIndex(tmp_path, mode="int8", lookup=array_lookup(ids, vectors))
+        index.build(ids, vectors)
+        return index
+
+    monkeypatch.setattr(vector_store, "QUANTIZED_INDEX_MODE", "int8")
+    monkeypatch.setattr(vector_store, "QUANTIZED_DIR", tmp_path)
+    monkeypatch.setattr(vector_store, "init_vector_store", lambda: None)
+    monkeypatch.setattr(vector_store, "build_quantized_index", build)
+    vector_store.close_quantized_index()
+    try:
+        first = vector_store.init_quantized_index()
+        assert vector_store.init_quantized_index() is first and built == [40]
+
+        QuantizedIndex(tmp_path, mode="int8").clear()  # another worker ingested a document
+        assert vector_store.init_quantized_index() is not first and built == [40, 40]
+
+        current = vector_store.init_quantized_index()
+        HybridRetriever.notify_docs_changed()
+        assert vector_store.init_quantized_index() is not current and built == [40, 40]  # reopened from disk
+    finally:
+        vector_store.close_quantized_index()
+
+
+def test_exact_search_orders_by_similarity() -> None:
+    vectors = np.eye(3, dtype=np.float32)
+    top = exact_search(vectors, [[0.9, 0.1, 0.0]], k=2)
+    assert top.tolist() == [[0, 1]]
@@ -32,3 +32,104 @@ def test_registry_remove_unknown_returns_none(tmp_path) -> None:
     registry = DocumentRegistry(db_path)
 
     assert registry.remove("missing-doc") is None
+
+
+def test_registry_lists_chunk_counts_and_queries_chunks(tmp_path) -> None:
+    from rag.registry import ChunkRecord
+
+    registry = DocumentRegistry(tmp_path / "registry.sqlite3")
+    record = DocumentRecord(doc_id="doc-1", original_name="a.txt", stored_path="/tmp/a.txt", ext="txt")
+    chunks = [
+        ChunkRecord("doc-1_chunk_0000", "doc-1", 0, content_hash="h0", token_count=12, start_byte=0, end_byte=40),
+        ChunkRecord("doc-1_chunk_0001", "doc-1", 1, content_hash="h1", token_count=9, start_byte=30, end_byte=70),
+    ]
+    registry.add(record, chunks)
+
+    (listed,) = registry.list()
+    assert listed.chunk_count == 2 and listed.chunk_ids == []
+    assert registry.get("doc-1").chunk_ids == ["doc-1_chunk_0000", "doc-1_chunk_0001"]
+    assert registry.get_chunks("doc-1") == chunks
+    assert [c.chunk_id for c in registry.find_chunks(["h1", "missing"])] == ["doc-1_chunk_0001"]
+
+    registry.remove("doc-1")
+    assert registry.get_chunks("doc-1") == []
+
+
+def test_registry_migrates_json_chunk_ids_without_data_loss(tmp_path) -> None:
+    import json
+    import sqlite3
+
+    db_path = tmp_path / "registry.sqlite3"
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        """
+        CREATE TABLE documents (
+            doc_id TEXT PRIMARY KEY, original_name TEXT NOT NULL, stored_path TEXT NOT NULL,
+            ext TEXT NOT NULL, chunk_ids TEXT NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        "INSERT INTO documents VALUES (?, ?, ?, ?, ?)",
+        ("old", "old.pdf", "/tmp/old.pdf", "pdf", json.dumps(["old_chunk_0000", "old_chunk_0001"])),
+    )
+    conn.commit()
+    conn.close()
+
+    registry = DocumentRegistry(db_path)
+
+    (listed,) = registry.list()
+    assert (listed.doc_id, listed.chunk_count) == ("old", 2)
+    assert registry.get("old").chunk_ids == ["old_chunk_0000", "old_chunk_0001"]
+    assert DocumentRegistry(db_path).list()[0].chunk_count == 2  # migration is idempotent
+
+
+def test_registry_stores_document_stats_and_pages(tmp_path) -> None:
+    from rag.registry import ChunkRecord
+
+    registry = DocumentRegistry(tmp_path / "registry.sqlite3")
+    for idx in range(5):
+        record = DocumentRecord(
+            doc_id=f"doc-{idx}",
+            original_name=f"doc{idx}.txt",
+            stored_path=f"/missing/doc{idx}.txt",
+            ext="txt",
+            size_bytes=100 * idx,
+            preview=f"Aperçu {idx}",
+            ingested_at="2026-01-01T00:00:00Z",
+        )
+        registry.add(record, [ChunkRecord(f"doc-{idx}_c0", f"doc-{idx}", 0, token_count=7)])
+
+    pages = [registry.list(limit=2, offset=offset) for offset in (0, 2, 4)]
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [d.doc_id for page in pages for d in page] == [f"doc-{idx}" for idx in range(4, -1, -1)]
+    first = pages[0]
+    assert registry.count() == 5
+    assert (first[0].size_bytes, first[0].token_count, first[0].preview) == (400, 7, "Aperçu 4")
+    assert first[0].ingested_at == "2026-01-01T00:00:00Z"
+
+
+def test_registry_backfills_stats_for_existing_rows(tmp_path) -> None:
+    import sqlite3
+
+    stored = tmp_path / "old.txt"
+    stored.write_text("contenu existant", encoding="utf-8")
+    db_path = tmp_path / "registry.sqlite3"
+    DocumentRegistry(db_path)
+    conn = sqlite3.connect(db_path)
+    # Simulate a registry left at schema v2, before the stats columns existed.
+    for column in ("size_bytes", "token_count", "preview", "ingested_at"):
+        conn.execute(f"ALTER TABLE documents DROP COLUMN {column}")
+    conn.execute("UPDATE schema_version SET version = 2 WHERE component = 'registry'")
+    conn.execute("INSERT INTO documents VALUES ('old', 'old.txt', ?, 'txt', 2)", (str(stored),))
+    conn.executemany(
+        "INSERT INTO chunks (chunk_id, doc_id, chunk_index, token_count) VALUES (?, 'old', ?, ?)",
+        [("old_c0", 0, 5), ("old_c1", 1, 4)],
+    )
+    conn.commit()
+    conn.close()
+
+    (listed,) = DocumentRegistry(db_path).list()
+    assert (listed.size_bytes, listed.token_count) == (stored.stat().st_size, 9)
+    assert listed.preview == ""
+    assert listed.ingested_at is None
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from rag.pipeline.hybrid_retriever import HybridRetriever
+from rag.resources import ResourceManager
+
+
+def test_resources_are_created_once_and_shared_across_threads() -> None:
+    created: list[object] = []
+
+    def factory() -> object:
+        time.sleep(0.02)
+        created.append(object())
+        return created[-1]
+
+    manager = ResourceManager()
+    manager.register("store", factory)
+    results: list[object] = []
+    threads = [threading.Thread(target=lambda: results.append(manager.get("store"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(result is created[0] for result in results)
+
+
+def test_health_reset_and_close_lifecycle() -> None:
+    closed: list[str] = []
+    manager = ResourceManager()
+    manager.register("ok", lambda: "ok", health=lambda value: f"{value} ready", close=closed.append)
+    manager.register("broken", lambda: "broken", health=lambda value: 1 / 0)
+    manager.register("idle", lambda: "idle")
+
+    manager.get("ok"), manager.get("broken")
+    health = {check.name: check for check in manager.health()}
+    assert (health["ok"].state, health["ok"].detail) == ("ok", "ok ready")
+    assert health["broken"].state == "error" and "ZeroDivisionError" in health["broken"].detail
+    assert health["idle"].state == "idle" and not manager.is_created("idle")
+
+    manager.reset("ok")
+    assert closed == ["ok"] and not manager.is_created("ok")
+    assert manager.get("ok") == "ok"
+    manager.close()
+    assert closed == ["ok", "ok"]
+    assert not any(manager.is_created(name) for name in ("ok", "broken", "idle"))
+
+
+def test_retriever_is_shared_per_top_k(monkeypatch) -> None:
+    from rag.pipeline import hybrid_retriever
+
+    monkeypatch.setattr(hybrid_retriever, "init_vector_store", lambda: _FakeStore())
+    manager = ResourceManager()
+    manager.register("retrievers", dict)
+
+    first = manager.retriever(3)
+    assert isinstance(first, HybridRetriever)
+    assert manager.retriever(3) is first
+    assert manager.retriever(5) is not first
+    manager.reset("retrievers")
+    assert manager.retriever(3) is not first
+
+
+def test_registry_is_not_backfilled_from_an_empty_vector_store(tmp_path, monkeypatch) -> None:
+    from rag import resources, vector_store
+
+    monkeypatch.setattr(resources, "REGISTRY_DB_PATH", tmp_path / "registry.sqlite3")
+    monkeypatch.setattr(vector_store, "CHROMA_DIR", tmp_path / "chroma")
+    manager = ResourceManager()
+    manager.register("vector_store", lambda: pytest.fail("vector store opened on a fresh install"))
+    manager.register("registry", lambda: resources._create_registry(manager))
+
+    assert manager.registry.count() == 0
+    assert not manager.is_created("vector_store")
+    assert vector_store.has_stored_vectors("chroma") is False
+
+
+class _FakeStore:
+    def as_retriever(self, search_kwargs):
+        return search_kwargs
+
+
+def test_rebuild_vector_store_reopens_store_and_retrievers(monkeypatch) -> None:
+    from rag import vector_store
+
+    monkeypatch.setattr(vector_store, "rebuild_collection", lambda **kwargs: 7)
+    manager = ResourceManager()
+    manager.register("vector_store", object)
+    manager.register("retrievers", dict)
+    manager.get("vector_store"), manager.get("retrievers")
+
+    assert manager.rebuild_vector_store(name="documents") == 7
+    assert not manager.is_created("vector_store") and not manager.is_created("retrievers")
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import httpx
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from rag import resources, vector_store
+from rag.numpy_store import NumpyVectorStore
+from rag.pipeline import hybrid_retriever
+from rag.pipeline.hybrid_retriever import HybridRetriever
+from rag.resources import ResourceManager
+from rag.retrieval_service import (
+    RemoteRetriever,
+    RetrievalServiceError,
+    broadcast_docs_changed,
+    start_retrieval_service,
+)
+
+
+class _KeywordEmbeddings(Embeddings):
+    vocabulary = ("contrat", "facture", "article", "cassation")
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return [float(text.lower().count(word)) + 0.01 for word in self.vocabulary]
+
+
+@pytest.fixture
+def service_url(tmp_path, monkeypatch):
+    store = NumpyVectorStore(tmp_path, _KeywordEmbeddings())
+    store.add_texts(
+        ["contrat de prestation article 3", "facture impayée client Z", "arrêt de cassation"],
+        metadatas=[{"chunk_id": f"c{idx}", "doc_id": f"d{idx}", "chunk_index": 0} for idx in range(3)],
+        ids=[f"c{idx}" for idx in range(3)],
+    )
+    monkeypatch.setattr(hybrid_retriever, "init_vector_store", lambda: store)
+    HybridRetriever.notify_docs_changed()
+    server, _service = start_retrieval_service()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+    HybridRetriever.notify_docs_changed()
+
+
+def test_remote_retriever_matches_in_process_results(service_url) -> None:
+    remote = RemoteRetriever(service_url, dense_k=2, lexical_k=2)
+    local = HybridRetriever(dense_k=2, lexical_k=2)
+    queries = ["facture client", "contrat article", "cassation"]
+
+    def ids(docs):
+        return [doc.metadata["chunk_id"] for doc in docs]
+
+    for query in queries:
+        assert ids(remote.invoke(query, k=2)) == ids(local.invoke(query, k=2))
+    assert [ids(docs) for docs in remote.batch(queries, k=2)] == [
+        ids(docs) for docs in local.batch(queries, k=2)
+    ]
+    assert ids(remote.invoke("contrat", k=2, filters={"doc_id": "d1"})) == ["c1"]
+    assert remote.health()["bm25_chunks"] == 3
+
+
+def test_invalidate_reopens_store_and_drops_bm25(service_url, monkeypatch) -> None:
+    reloads: list[bool] = []
+    monkeypatch.setattr(vector_store, "reload_vector_store", lambda: reloads.append(True))
+    remote = RemoteRetriever(service_url, dense_k=2, lexical_k=2)
+    remote.invoke("facture", k=2)
+
+    broadcast_docs_changed(service_url)
+
+    assert reloads == [True]
+    assert remote.health()["bm25_ready"] is False
+    assert remote.invoke("facture", k=1)[0].metadata["chunk_id"] == "c1"  # rebuilt on demand
+
+
+def test_invalidate_waits_for_queries_in_flight(service_url, monkeypatch) -> None:
+    store = hybrid_retriever.init_vector_store()
+    search = store.similarity_search
+    open_store = {"value": True}
+    errors: list[str] = []
+
+    def slow_search(*args, **kwargs):
+        if not open_store["value"]:
+            errors.append("query started on a closed store")
+        time.sleep(0.02)
+        if not open_store["value"]:
+            errors.append("store closed under a running query")
+        return search(*args, **kwargs)
+
+    def reload_vector_store():
+        # Stands in for Chroma stopping its system before the new store is opened.
+        open_store["value"] = False
+        time.sleep(0.01)
+        open_store["value"] = True
+
+    monkeypatch.setattr(store, "similarity_search", slow_search)
+    monkeypatch.setattr(vector_store, "reload_vector_store", reload_vector_store)
+    remote = RemoteRetriever(service_url, dense_k=2, lexical_k=2)
+
+    def query() -> None:
+        for _ in range(5):
+            try:
+                if remote.invoke("facture", k=1)[0].metadata["chunk_id"] != "c1":
+                    errors.append("wrong result")
+            except Exception as err:
+                errors.append(repr(err))
+
+    threads = [threading.Thread(target=query) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for _ in range(3):
+        time.sleep(0.015)
+        broadcast_docs_changed(service_url)
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+
+
+def test_service_errors(service_url) -> None:
+    assert httpx.post(f"{service_url}/retrieve", json={"k": 2}).status_code == 400
+    assert httpx.post(f"{service_url}/unknown", json={}).status_code == 404
+    with pytest.raises(RetrievalServiceError):
+        RemoteRetriever("http://127.0.0.1:9").invoke("contrat", k=2)
+    broadcast_docs_changed("http://127.0.0.1:9")  # logged, never raised: the ingestion succeeded
+
+
+def test_resource_manager_hands_out_remote_retriever(monkeypatch) -> None:
+    monkeypatch.setattr(resources, "RETRIEVAL_SERVICE_URL", "http://127.0.0.1:8765")
+    manager = ResourceManager()
+    manager.register("retrievers", dict)
+
+    retriever = manager.retriever(4)
+    assert isinstance(retriever, RemoteRetriever) and retriever.dense_k == 4
+    assert manager.retriever(4) is retriever
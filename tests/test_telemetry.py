@@ -0,0 +1,44 @@
+from langchain.schema import AIMessage
+
+from rag.telemetry import TelemetryStore, Trace, current_trace, record_usage, stage, start_trace
+
+
+def test_stages_recorded_only_inside_trace() -> None:
+    with stage("orphan"):
+        pass
+    assert current_trace() is None
+
+    with start_trace() as trace:
+        with stage("dense"):
+            pass
+        with stage("generation"):
+            record_usage(
+                AIMessage(
+                    content="ok",
+                    response_metadata={"token_usage": {"prompt_tokens": 40, "completion_tokens": 5}},
+                )
+            )
+
+    assert [record.stage for record in trace.stages] == ["dense", "generation"]
+    assert trace.stages[1].prompt_tokens == 40
+    assert trace.stages[1].completion_tokens == 5
+    assert set(trace.timings()) == {"dense", "generation"}
+    assert current_trace() is None
+
+
+def test_store_links_stages_to_message_and_reports_percentiles(tmp_path) -> None:
+    store = TelemetryStore(tmp_path / "conversations.sqlite3")
+    for message_id, durations in enumerate([(10.0, 100.0), (20.0, 300.0)], start=1):
+        trace = Trace()
+        with start_trace(trace):
+            for name, duration in zip(("bm25", "generation"), durations):
+                with stage(name) as record:
+                    pass
+                record.duration_ms = duration
+        store.record(trace, message_id=message_id)
+
+    assert [record.stage for record in store.stages_for_message(2)] == ["bm25", "generation"]
+    report = {row["stage"]: row for row in store.stage_percentiles(days=1, by_day=False)}
+    assert report["bm25"]["count"] == 2
+    assert report["bm25"]["p50_ms"] == 15.0
+    assert report["generation"]["p95_ms"] == 290.0
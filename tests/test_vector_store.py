@@ -0,0 +1,51 @@
+import chromadb
+
+from rag.vector_store import hnsw_drift, hnsw_settings, rebuild_collection, recover_interrupted_rebuild
+
+
+def test_hnsw_drift_treats_missing_metadata_as_chroma_defaults() -> None:
+    desired = hnsw_settings(space="l2", construction_ef=100, search_ef=10, m=16)
+    assert hnsw_drift(None, desired) == {}
+
+    desired = hnsw_settings(space="cosine", construction_ef=100, search_ef=50, m=16)
+    assert hnsw_drift({"hnsw:space": "l2"}, desired) == {
+        "hnsw:space": ("l2", "cosine"),
+        "hnsw:search_ef": (10, 50),
+    }
+
+
+def test_rebuild_collection_applies_settings_and_keeps_vectors(tmp_path) -> None:
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    collection = client.create_collection("documents")
+    collection.add(
+        ids=["a", "b", "c"],
+        embeddings=[[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]],
+        documents=["A", "B", "C"],
+        metadatas=[{"doc_id": "1"}, {"doc_id": "2"}, {"doc_id": "3"}],
+    )
+    settings = hnsw_settings(space="cosine", construction_ef=200, search_ef=64, m=32)
+
+    copied = rebuild_collection("documents", directory=tmp_path, settings=settings, batch_size=2)
+
+    rebuilt = client.get_collection("documents")
+    assert copied == 3
+    assert hnsw_drift(rebuilt.metadata, settings) == {}
+    assert sorted(rebuilt.get()["documents"]) == ["A", "B", "C"]
+    assert {c.name for c in client.list_collections()} == {"documents"}
+
+
+def test_recover_interrupted_rebuild_restores_or_drops_leftovers(tmp_path) -> None:
+    client = chromadb.PersistentClient(path=str(tmp_path))
+    # Crash between the two renames: only the backup and the finished copy remain.
+    client.create_collection("documents-backup").add(ids=["a"], embeddings=[[1.0, 0.0]], documents=["A"])
+    client.create_collection("documents-rebuild").add(ids=["a"], embeddings=[[1.0, 0.0]], documents=["A"])
+
+    assert recover_interrupted_rebuild(client, "documents") is not None
+    assert {c.name for c in client.list_collections()} == {"documents"}
+    assert client.get_collection("documents").get()["documents"] == ["A"]
+
+    # Crash after the swap: the live collection is complete, the backup is dropped.
+    client.create_collection("documents-backup")
+    recover_interrupted_rebuild(client, "documents")
+    assert {c.name for c in client.list_collections()} == {"documents"}
+    assert recover_interrupted_rebuild(client, "documents") is None
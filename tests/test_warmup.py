@@ -0,0 +1,87 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from rag import warmup as warmup_module
+from rag.pipeline.hybrid_retriever import HybridRetriever
+from rag.warmup import SkipStep, Warmup
+
+
+def test_warmup_runs_steps_in_background_and_reports_status() -> None:
+    release = threading.Event()
+    calls: list[str] = []
+
+    def slow() -> str:
+        release.wait(5)
+        calls.append("slow")
+        return "ok"
+
+    def broken() -> str:
+        raise RuntimeError("boom")
+
+    def skipped() -> str:
+        raise SkipStep("not configured")
+
+    warmup = Warmup([("slow", slow), ("broken", broken), ("skipped", skipped), ("after", lambda: "")])
+    warmup.start()
+    warmup.start()  # idempotent
+
+    status = warmup.status()
+    assert status.started and not status.ready
+    release.set()
+    assert warmup.wait(5)
+
+    status = warmup.status()
+    assert status.ready and status.progress == 1.0
+    assert calls == ["slow"]
+    assert [(s.name, s.state) for s in status.steps] == [
+        ("slow", "done"),
+        ("broken", "failed"),
+        ("skipped", "skipped"),
+        ("after", "done"),
+    ]
+    assert status.steps[1].detail == "RuntimeError: boom"
+    assert status.steps[0].duration_ms >= 0 and status.total_ms >= status.steps[0].duration_ms
+
+
+def test_concurrent_bm25_warmup_and_request_rebuild_once(monkeypatch) -> None:
+    rebuilds: list[int] = []
+
+    def fake_rebuild(cls, lexical_k: int) -> None:
+        rebuilds.append(lexical_k)
+        time.sleep(0.05)
+        cls._bm25, cls._bm25_docs = SimpleNamespace(k=0), ["doc"]
+        cls._bm25_ready, cls._bm25_stale = True, False
+
+    monkeypatch.setattr(HybridRetriever, "_rebuild_bm25_index", classmethod(fake_rebuild))
+    HybridRetriever.notify_docs_changed()
+    retriever = HybridRetriever.__new__(HybridRetriever)  # skip __post_init__ (no vector store needed)
+    retriever.lexical_k = 2
+
+    threads = [threading.Thread(target=retriever._ensure_bm25) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert rebuilds == [2]
+    HybridRetriever.notify_docs_changed()
+
+
+def test_archive_step_archives_idle_conversations_off_the_render_path(monkeypatch) -> None:
+    from rag import resources
+
+    calls: list[int] = []
+    fake_archive = SimpleNamespace(archive_idle=lambda days: calls.append(days) or 3)
+    monkeypatch.setattr(resources, "get_resource_manager", lambda: SimpleNamespace(archive=fake_archive))
+    monkeypatch.setattr(warmup_module, "ARCHIVE_AFTER_DAYS", 30)
+
+    warmup = Warmup([("archive", warmup_module._archive_idle)])
+    warmup.start()
+    assert warmup.wait(5)
+    assert calls == [30] and warmup.status().steps[0].detail.startswith("3 conversations")
+
+    monkeypatch.setattr(warmup_module, "ARCHIVE_AFTER_DAYS", 0)
+    disabled = Warmup([("archive", warmup_module._archive_idle)])
+    disabled.start()
+    assert disabled.wait(5) and disabled.status().steps[0].state == "skipped"